@@ -34,21 +34,49 @@ IF (NOT JPI_INIT)
      NOT DEVICE_DESCRIPTOR_HEADER_TEMPLATE OR
      NOT DEVICE_DESCRIPTOR_HEADER OR
      NOT DEVICE_DESCRIPTOR_SOURCE_TEMPLATE OR
-     NOT DEVICE_DESCRIPTOR_SOURCE)
+     NOT DEVICE_DESCRIPTOR_SOURCE OR
+     NOT DEVICE_DESCRIPTOR_STATS OR
+     NOT DEVICE_DESCRIPTOR_DEPFILE OR
+     NOT DEVICE_DESCRIPTOR_DIGEST OR
+     NOT DEVICE_DESCRIPTOR_CACHE)
   MESSAGE(FATAL_ERROR "To use the GENERATE_DEVICE_DESCRIPTOR extension you must set these variables:\n"
           "DEVICE_DESCRIPTOR_DATABASE: the 'database' that will be converted to the final Device Descriptor\n"
           "DEVICE_DESCRIPTOR_HEADER_TEMPLATE: a template to be included at the beginning of the generated header\n"
           "DEVICE_DESCRIPTOR_HEADER: the path to the generated header file\n"
           "DEVICE_DESCRIPTOR_SOURCE_TEMPLATE: a template to be included at the beginning of the generated source\n"
-          "DEVICE_DESCRIPTOR_SOURCE: the path to the generated source file\n")
+          "DEVICE_DESCRIPTOR_SOURCE: the path to the generated source file\n"
+          "DEVICE_DESCRIPTOR_STATS: the path to the generated JSON report of the placement quality\n"
+          "DEVICE_DESCRIPTOR_DEPFILE: the path to the depfile that lists the included YAML files and the templates\n"
+          "DEVICE_DESCRIPTOR_DIGEST: the path to the digest of the inputs, used to skip an unchanged generation\n"
+          "DEVICE_DESCRIPTOR_CACHE: the directory of the parse cache of the YAML files\n")
  ENDIF ()
  SET(JPI_INIT ON CACHE INTERNAL "GENERATE_DEVICE_DESCRIPTOR initialized status")
 ENDIF ()
 
+SET_AND_EXPORT(DEVICE_DESCRIPTOR_BACKEND "hashmap" STRING "hashmap"
+               "The lookup code generator of the descriptor: 'hashmap' or 'decision-tree'.")
+SET(DEVICE_DESCRIPTOR_BENCHMARK_COMPILER "cc" CACHE STRING
+    "The host C compiler used to benchmark the Device Descriptor.")
 SET_AND_EXPORT(DEVICE_DESCRIPTOR_HASH_BITS "6U" STRING "6U"
                "The number of bits to be used to generate and calculate the hash table for the JSON properties.")
 SET_AND_EXPORT(DEVICE_DESCRIPTOR_HASH_FORESEE "3U" STRING "3U"
                "The number of positions to seek around the calculated hash in the event of collision.")
+SET_AND_EXPORT(DEVICE_DESCRIPTOR_HASH_FAMILY "rotate-xor" STRING "rotate-xor"
+               "The family of the hashes of the table: 'rotate-xor', 'fnv-1a' or 'multiply-xorshift'.")
+SET_AND_EXPORT(DEVICE_DESCRIPTOR_SIZING "power-of-two" STRING "power-of-two"
+               "How the length of the hash table is computed: 'power-of-two' or 'multiply-shift'.")
+SET_AND_EXPORT(DEVICE_DESCRIPTOR_LOAD_FACTOR "0.75" STRING "0.75"
+               "The maximum load factor of the hash table when the 'multiply-shift' sizing is used.")
+SET_AND_EXPORT(DEVICE_DESCRIPTOR_LAYOUT "table" STRING "table"
+               "The memory layout of the hash table: 'table' or 'indexed'.")
+SET_AND_EXPORT(DEVICE_DESCRIPTOR_FINGERPRINT_BITS "0" STRING "0"
+               "The bits of the key fingerprints (0, 8 or 16). When not zero, the table is a struct of arrays.")
+SET_AND_EXPORT(DEVICE_DESCRIPTOR_FILTER_RATE "0" STRING "0"
+               "The false positive rate of the Bloom filter of the keys (0 disables the filter).")
+SET_AND_EXPORT(DEVICE_DESCRIPTOR_PROFILE "" STRING ""
+               "A key-frequency profile (lines of 'count key'), to place the most frequent keys in their home slots.")
+SET_AND_EXPORT(DEVICE_DESCRIPTOR_NEIGHBORHOODS OFF BOOL OFF
+               "Emit the Hopscotch neighborhood bitmaps of the hash table, so lookups only compare the candidate keys.")
 
 # Compile a JSON properties file in a C source code file and a header that can be used as a Hash Table to access
 # properties that may be undiscoverable, but are not wise or useful to embed in the source code itself. This way,
@@ -60,11 +88,69 @@ FUNCTION( GENERATE_DEVICE_DESCRIPTOR )
      "--header" "${DEVICE_DESCRIPTOR_HEADER}"
      "--source-template" "${DEVICE_DESCRIPTOR_SOURCE_TEMPLATE}"
      "--source" "${DEVICE_DESCRIPTOR_SOURCE}"
+     "--backend" "${DEVICE_DESCRIPTOR_BACKEND}"
      "--bits" "${DEVICE_DESCRIPTOR_HASH_BITS}"
      "--foresee" "${DEVICE_DESCRIPTOR_HASH_FORESEE}"
+     "--hash-family" "${DEVICE_DESCRIPTOR_HASH_FAMILY}"
+     "--sizing" "${DEVICE_DESCRIPTOR_SIZING}"
+     "--load-factor" "${DEVICE_DESCRIPTOR_LOAD_FACTOR}"
+     "--layout" "${DEVICE_DESCRIPTOR_LAYOUT}"
+     "--fingerprint-bits" "${DEVICE_DESCRIPTOR_FINGERPRINT_BITS}"
+     "--filter-rate" "${DEVICE_DESCRIPTOR_FILTER_RATE}"
+     "--stats" "${DEVICE_DESCRIPTOR_STATS}"
+     "--depfile" "${DEVICE_DESCRIPTOR_DEPFILE}"
+     "--digest" "${DEVICE_DESCRIPTOR_DIGEST}"
+     "--cache" "${DEVICE_DESCRIPTOR_CACHE}"
      "--api-struct-name" "deviceProperty"
      "--api-table-name" "deviceDescriptor")
+ IF (DEVICE_DESCRIPTOR_PROFILE)
+  LIST(APPEND CMD_ARGS "--profile" "${DEVICE_DESCRIPTOR_PROFILE}")
+ ENDIF ()
+ IF (DEVICE_DESCRIPTOR_NEIGHBORHOODS)
+  LIST(APPEND CMD_ARGS "--neighborhoods")
+ ENDIF ()
+ IF (CMAKE_SIZEOF_VOID_P)
+  LIST(APPEND CMD_ARGS "--pointer-size" "${CMAKE_SIZEOF_VOID_P}")
+ ENDIF ()
+ # The first generation happens at configure time, so the header exists for every target. The digest makes it exit
+ # immediately when none of the YAML files, the templates or the options changed
  RUN_PYTHON3_SCRIPT("${DEVICE_DESCRIPTOR_PYTHON_HELPER}" "${TREE_DEVICE_DESCRIPTOR_PATH}" "${CMD_ARGS}")
  MESSAGE(STATUS "Generated Device Descriptor header file in '${DEVICE_DESCRIPTOR_HEADER}'")
  MESSAGE(STATUS "Generated Device Descriptor source file in '${DEVICE_DESCRIPTOR_SOURCE}'")
+ MESSAGE(STATUS "Generated Device Descriptor placement report in '${DEVICE_DESCRIPTOR_STATS}'")
+ # Then, regenerate the Device Descriptor during the build when any of the (transitively) included YAML files changes,
+ # as listed by the depfile. Only Ninja understands depfiles before CMake 3.20
+ IF (CMAKE_GENERATOR MATCHES "Ninja" OR NOT CMAKE_VERSION VERSION_LESS 3.20)
+  # The unchanged outputs are not rewritten, so the digest (which is touched by every run) is the output that is
+  # checked against the dependencies. Otherwise, the generators without restat would run the command on every build
+  ADD_CUSTOM_COMMAND(OUTPUT "${DEVICE_DESCRIPTOR_DIGEST}"
+                     BYPRODUCTS "${DEVICE_DESCRIPTOR_SOURCE}" "${DEVICE_DESCRIPTOR_HEADER}" "${DEVICE_DESCRIPTOR_STATS}"
+                     COMMAND "${Python3_EXECUTABLE}" "${DEVICE_DESCRIPTOR_PYTHON_HELPER}" ${CMD_ARGS}
+                     DEPENDS "${DEVICE_DESCRIPTOR_PYTHON_HELPER}"
+                     DEPFILE "${DEVICE_DESCRIPTOR_DEPFILE}"
+                     WORKING_DIRECTORY "${TREE_DEVICE_DESCRIPTOR_PATH}"
+                     COMMENT "Generating the Device Descriptor..."
+                     VERBATIM)
+ ELSE ()
+  MESSAGE(STATUS "The '${CMAKE_GENERATOR}' generator does not support depfiles, the Device Descriptor is only "
+          "generated at configure time")
+ ENDIF ()
+ # Generate the Device Descriptors of every board (e.g. for CI), parsing the common files once for all the boards
+ ADD_CUSTOM_TARGET(DeviceDescriptorMatrix
+                   COMMAND "${Python3_EXECUTABLE}" "${DEVICE_DESCRIPTOR_BATCH_HELPER}"
+                   "--directory" "${TREE_DEVICE_DESCRIPTOR_PATH}"
+                   "--output-directory" "${DEVICE_DESCRIPTOR_MATRIX_PATH}"
+                   WORKING_DIRECTORY "${TREE_DEVICE_DESCRIPTOR_PATH}"
+                   COMMENT "Generating the Device Descriptors of every board..."
+                   USES_TERMINAL)
+ # Benchmark the lookups of the Device Descriptor with the host compiler, across several settings of the generator
+ ADD_CUSTOM_TARGET(DeviceDescriptorBenchmark
+                   COMMAND "${Python3_EXECUTABLE}" "${DEVICE_DESCRIPTOR_BENCHMARK_HELPER}"
+                   "--yaml-file" "${DEVICE_DESCRIPTOR_DATABASE}"
+                   "--bits" "${DEVICE_DESCRIPTOR_HASH_BITS}" "--bits" "8U" "--bits" "16U"
+                   "--foresee" "${DEVICE_DESCRIPTOR_HASH_FORESEE}" "--foresee" "1U"
+                   "--compiler" "${DEVICE_DESCRIPTOR_BENCHMARK_COMPILER}"
+                   WORKING_DIRECTORY "${TREE_DEVICE_DESCRIPTOR_PATH}"
+                   COMMENT "Benchmarking the lookups of the Device Descriptor with the host compiler..."
+                   USES_TERMINAL)
 ENDFUNCTION()
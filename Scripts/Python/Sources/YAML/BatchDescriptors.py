@@ -0,0 +1,147 @@
+# ===-- BatchDescriptors.py - Generate the Device Descriptors of Many Boards at Once -----------------*- Python -*-=== #
+#
+# Copyright (c) 2020 Oever González
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file except in compliance with
+#  the License. You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+#  an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+#  specific language governing permissions and limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# ===--------------------------------------------------------------------------------------------------------------=== #
+# /
+# / \file
+# / This file will generate the Device Descriptors of many boards in a single run. The YAML files of all the boards are
+# / flattened first, sharing the documents of the included files (so every common file is parsed once), and then the
+# / placement and the emission of every board run in parallel, in a pool of processes.
+# /
+# ===--------------------------------------------------------------------------------------------------------------=== #
+
+import os
+import shlex
+import sys
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from logging import DEBUG, basicConfig, getLogger
+from pathlib import Path
+
+# noinspection PyUnresolvedReferences
+import HashTableFromYaml
+
+program_logger = getLogger(__name__)
+templates_path: Path = Path(__file__).resolve().parents[3].joinpath("CMake", "Templates")
+
+
+def parse_args(args: []):
+    """
+    Parse the arguments of the batch generation.
+
+    :param args: arguments from command line
+
+    :return: the parsed arguments
+    """
+    parser = ArgumentParser(description="Generate the Device Descriptors of many boards in a single run, parsing the "
+                                        "common included files once and generating the boards in parallel.")
+    parser.add_argument('yaml_files',
+                        action='store', type=str, nargs='*', metavar='yaml',
+                        help="The YAML files of the boards.")
+    parser.add_argument('-d', '--directory',
+                        action='append', type=str, metavar='directory',
+                        help="A directory of Device Descriptors, whose boards are the YAML files of every architecture "
+                             "(the files at '<directory>/<architecture>/<board>.yaml'), it can be repeated.")
+    parser.add_argument('-o', '--output-directory',
+                        action='store', type=str, metavar='output', required=True,
+                        help="The directory where the descriptors are generated, as "
+                             "'<output>/<architecture>/<board>/DeviceDescriptor.{h,c}'.")
+    parser.add_argument('-x', '--generator-args',
+                        action='store', type=str, metavar='args', default="",
+                        help="Extra arguments for the generator, common to all the boards (e.g. '--bits 8U'). The "
+                             "options of the YAML loading ('--loader', '--cache' and '--include-jobs') also apply to "
+                             "the flattening of the boards, while '--from-ir' is not allowed.")
+    parser.add_argument('-j', '--jobs',
+                        action='store', type=int, metavar='jobs', default=os.cpu_count(),
+                        help="The number of boards that are generated in parallel. (default: %(default)s).")
+    parser.add_argument('-v', '--verbose',
+                        action='store_true',
+                        help="Using this flag will print debug-level messages from the logger to the console.")
+    return parser.parse_args(args)
+
+
+def board_files(parsed) -> []:
+    """
+    Collect the YAML files of all the boards, from the files and the directories of the arguments.
+
+    :param parsed: the parsed arguments of the batch generation
+
+    :return: a sorted list with the paths to the YAML files of the boards, without duplicates
+    """
+    files: [] = [Path(yaml_file) for yaml_file in parsed.yaml_files]
+    for directory in parsed.directory or []:
+        files.extend(Path(directory).glob("*/*.yaml"))
+    if not files:
+        raise SystemExit("No YAML files of boards were given.")
+    return sorted(set(files))
+
+
+def generate_board(generator_args: [], properties: {}, included_files: []) -> str:
+    """
+    Generate the Device Descriptor of a single board, from its flattened properties. This runs in a worker process.
+
+    :param generator_args: the arguments of the generator for the board
+    :param properties: the flattened properties of the board
+    :param included_files: the YAML files that were included to flatten the properties
+
+    :return: the path to the generated source
+    """
+    HashTableFromYaml.input_files[:] = included_files
+    HashTableFromYaml.main(generator_args, properties)
+    return generator_args[generator_args.index('--source') + 1]
+
+
+def main(args: []):
+    """
+    Main program (entry point).
+
+    :param args: arguments from command line
+    """
+    parsed = parse_args(args)
+    if parsed.verbose:
+        basicConfig(level=DEBUG)
+    yaml_files: [] = board_files(parsed)
+    common_args: [] = ['--header-template', str(templates_path.joinpath("DeviceDescriptor.in")),
+                       '--source-template', str(templates_path.joinpath("DeviceDescriptor.c.in")),
+                       '--api-struct-name', "deviceProperty", '--api-table-name', "deviceDescriptor",
+                       *shlex.split(parsed.generator_args)]
+    # The boards are flattened here, so the options of the YAML loading must be applied before (the generator rejects
+    # '--from-ir' next to the YAML file of a board)
+    common = HashTableFromYaml.parse_args(['--yaml-file', str(yaml_files[0]), *common_args])
+    for opened_file in (common.yaml_file, common.header_template, common.source_template, common.profile):
+        if opened_file is not None:
+            opened_file.close()
+    HashTableFromYaml.apply_parse_options(common)
+    # Every included file is parsed once, and its documents are shared by all the boards
+    HashTableFromYaml.parsed_documents = {}
+    jobs: [] = []
+    for yaml_file in yaml_files:
+        output: Path = Path(parsed.output_directory).joinpath(yaml_file.parent.name, yaml_file.stem)
+        output.mkdir(parents=True, exist_ok=True)
+        generator_args: [] = ['--yaml-file', str(yaml_file),
+                              '--header', str(output.joinpath("DeviceDescriptor.h")),
+                              '--source', str(output.joinpath("DeviceDescriptor.c")),
+                              *common_args]
+        with open(yaml_file) as open_yaml:
+            properties: {} = HashTableFromYaml.flatten_dictionary(open_yaml)
+        jobs.append((generator_args, properties, list(HashTableFromYaml.input_files)))
+    program_logger.info(f"Flattened {len(jobs)} boards from {len(HashTableFromYaml.parsed_documents)} YAML files")
+    with ProcessPoolExecutor(max_workers=parsed.jobs) as executor:
+        for source in executor.map(generate_board, *zip(*jobs)):
+            program_logger.info(f"Generated '{source}'")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,267 @@
+# ===-- DescriptorBenchmark.py - Benchmark the Lookups of the Generated Device Descriptor ------------*- Python -*-=== #
+#
+# Copyright (c) 2020 Oever González
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file except in compliance with
+#  the License. You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+#  an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+#  specific language governing permissions and limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# ===--------------------------------------------------------------------------------------------------------------=== #
+# /
+# / \file
+# / This file will benchmark the lookups of the generated Device Descriptor with the host compiler. For every setting
+# / of the generator, the generated source and header are compiled along with a small driver, which times the lookups
+# / of the keys that are in their home slot, the keys that were displaced (the worst case of the lookup) and absent
+# / keys. The size of the read-only data and the code of the generated source is also reported.
+# /
+# ===--------------------------------------------------------------------------------------------------------------=== #
+
+import os
+import subprocess
+import sys
+from argparse import REMAINDER, ArgumentParser
+from contextlib import redirect_stdout
+from io import StringIO
+from logging import ERROR
+from itertools import product
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+# noinspection PyUnresolvedReferences
+import HashTableFromYaml
+
+compiler_magic_path: Path = Path(__file__).resolve().parents[4].joinpath("Library", "CompilerSupport", "CompilerMagic")
+templates_path: Path = Path(__file__).resolve().parents[3].joinpath("CMake", "Templates")
+driver_program: str = '''
+#include <DeviceDescriptor.h>
+#include <stdio.h>
+#include <string.h>
+#include <time.h>
+
+size_t __strlen(const char *string) {{ return strlen(string); }}
+int __strcmp(const char *first, const char *second) {{ return strcmp(first, second); }}
+
+static const char *const homeKeys[] = {{{home_keys}NULL}};
+static const char *const displacedKeys[] = {{{displaced_keys}NULL}};
+static const char *const absentKeys[] = {{{absent_keys}NULL}};
+
+// Time the lookups of a NULL-terminated list of keys, and check that the lookups find (or miss) every key
+static double timeLookups(const char *const *keys, const int expected) {{
+ size_t count = 0x00;
+ for (; keys[count] != NULL; count++) {{
+  if ((getDeviceDescriptorProperty(keys[count]) != NULL) != expected) {{
+   fprintf(stderr, "Wrong lookup result for key #%zu\\n", count);
+   return -1.0;
+  }}
+ }}
+ if (count == 0x00) {{ return 0.0; }}
+ volatile size_t sink = 0x00;
+ struct timespec start, end;
+ clock_gettime(CLOCK_MONOTONIC, &start);
+ for (unsigned round = 0x00; round < {rounds}U; round++) {{
+  for (size_t i = 0x00; i < count; i++) {{ sink += (size_t) getDeviceDescriptorProperty(keys[i]); }}
+ }}
+ clock_gettime(CLOCK_MONOTONIC, &end);
+ (void) sink;
+ const double elapsed = (double) (end.tv_sec - start.tv_sec) * 1e9 + (double) (end.tv_nsec - start.tv_nsec);
+ return elapsed / ((double) count * {rounds});
+}}
+
+int main(void) {{
+ printf("%f %f %f\\n", timeLookups(homeKeys, 1), timeLookups(displacedKeys, 1), timeLookups(absentKeys, 0));
+ return 0;
+}}
+'''
+
+
+def parse_args(args: []):
+    """
+    Parse the arguments of the benchmark.
+
+    :param args: arguments from command line
+
+    :return: the parsed arguments
+    """
+    parser = ArgumentParser(description="Benchmark the lookups of the generated Device Descriptor with the host "
+                                        "compiler, across several settings of the generator.")
+    parser.add_argument('-y', '--yaml-file',
+                        action='store', type=str, required=True,
+                        help="The YAML file of the Device Descriptor.")
+    parser.add_argument('-b', '--bits',
+                        action='append', type=str, metavar='bits',
+                        help="A number of bits of the hashes, it can be repeated. (default: 6U and 8U).")
+    parser.add_argument('-f', '--foresee',
+                        action='append', type=str, metavar='foresee',
+                        help="A foresee of the linear lookup, it can be repeated. (default: 1U and 3U).")
+    parser.add_argument('-g', '--backend',
+                        action='append', type=str, metavar='backend', choices=HashTableFromYaml.backends,
+                        help="A backend of the generator, it can be repeated. (default: all the backends).")
+    parser.add_argument('-x', '--generator-args',
+                        action='store', nargs=REMAINDER, metavar='args', default=[],
+                        help="Extra arguments for the generator, common to all the settings, which take all the "
+                             "remaining arguments, so it must be the last option (e.g. '-x --layout indexed').")
+    parser.add_argument('-c', '--compiler',
+                        action='store', type=str, metavar='cc', default="cc",
+                        help="The host C compiler. (default: %(default)s).")
+    parser.add_argument('-s', '--size',
+                        action='store', type=str, metavar='size', default="size",
+                        help="The host 'size' tool, used to measure the sections. (default: %(default)s).")
+    parser.add_argument('-r', '--rounds',
+                        action='store', type=int, metavar='rounds', default=20000,
+                        help="The number of times that every list of keys is looked up. (default: %(default)s).")
+    return parser.parse_args(args)
+
+
+def c_literal(key: bytes) -> str:
+    """
+    Convert the bytes of a key to a C string literal, escaping every byte.
+
+    :param key: the bytes of the key
+
+    :return: the C string literal
+    """
+    return "\"" + "".join(f"\\x{character:02x}" for character in key) + "\""
+
+
+def classify_keys(generator_args: []) -> ([], []):
+    """
+    Generate the table again (without writing the output) to classify the keys into the keys that are in their
+    `Hash1` home slot and the keys that were displaced. With the decision tree backend, all the keys are home keys.
+
+    :param generator_args: the arguments of the generator, whose settings are already active
+
+    :return: a tuple with the list of home keys and the list of displaced keys
+    """
+    parsed = HashTableFromYaml.parse_args(generator_args + ['--header', os.devnull, '--source', os.devnull])
+    hashmap: [] = HashTableFromYaml.create_hashmap(parsed, HashTableFromYaml.load_properties(parsed))
+    home_keys: [] = []
+    displaced_keys: [] = []
+    for index, value_at_index in enumerate(hashmap):
+        if value_at_index is None:
+            continue
+        key: str = value_at_index[0]
+        home: int = HashTableFromYaml.reduce_hash(HashTableFromYaml.calculate_hash(key), len(hashmap))
+        if HashTableFromYaml.backend == "hashmap" and home != index:
+            displaced_keys.append(HashTableFromYaml.c_string_bytes(key))
+        else:
+            home_keys.append(HashTableFromYaml.c_string_bytes(key))
+    return home_keys, displaced_keys
+
+
+def absent_keys(keys: []) -> []:
+    """
+    Derive absent keys from the keys of the table, by flipping their last character and by prefixing them.
+
+    :param keys: the bytes of the keys
+
+    :return: a list with the bytes of the absent keys
+    """
+    present: set = set(keys)
+    candidates: [] = [key[:-1] + bytes([key[-1] ^ 0x01]) for key in keys if key] + [b"absent" + key for key in keys]
+    return [key for key in dict.fromkeys(candidates) if key not in present and b"\x00" not in key]
+
+
+def section_sizes(size_tool: str, object_file: Path) -> (int, int):
+    """
+    Measure the read-only data and the code of an object file.
+
+    :param size_tool: the host 'size' tool
+    :param object_file: the object file
+
+    :return: a tuple with the bytes of the read-only data sections and the bytes of the code sections
+    """
+    rodata: int = 0
+    text: int = 0
+    output: str = subprocess.run([size_tool, "-A", str(object_file)], check=True, capture_output=True, text=True).stdout
+    for line in output.splitlines():
+        fields: [] = line.split()
+        if len(fields) < 2 or not fields[1].isdigit():
+            continue
+        if fields[0].startswith(".rodata"):
+            rodata += int(fields[1])
+        elif fields[0].startswith(".text"):
+            text += int(fields[1])
+    return rodata, text
+
+
+def run_setting(parsed, build_directory: Path, backend: str, bits: str, foresee: str) -> str:
+    """
+    Generate, compile and run the benchmark of a single setting of the generator.
+
+    :param parsed: the parsed arguments of the benchmark
+    :param build_directory: a directory for the generated and compiled files
+    :param backend: the backend of the generator
+    :param bits: the number of bits of the hashes
+    :param foresee: the foresee of the linear lookup
+
+    :return: a line of the report
+    """
+    generator_args: [] = ['--yaml-file', parsed.yaml_file,
+                          '--header-template', str(templates_path.joinpath("DeviceDescriptor.in")),
+                          '--source-template', str(templates_path.joinpath("DeviceDescriptor.c.in")),
+                          '--backend', backend, '--bits', bits, '--foresee', foresee,
+                          '--api-struct-name', "deviceProperty", '--api-table-name', "deviceDescriptor",
+                          *parsed.generator_args]
+    header: Path = build_directory.joinpath("DeviceDescriptor.h")
+    source: Path = build_directory.joinpath("DeviceDescriptor.c")
+    setting: str = f"{backend:<15}{bits:>6}{foresee:>9}"
+    try:
+        # The generator reports the collisions that it solves, which is not a part of the report
+        with redirect_stdout(StringIO()):
+            HashTableFromYaml.main(generator_args + ['--header', str(header), '--source', str(source)])
+            home_keys, displaced_keys = classify_keys(generator_args)
+    except SystemExit as e:
+        return f"{setting}  generator failed: {e}"
+    build_directory.joinpath("config.h").write_text(f"#define DEVICE_DESCRIPTOR_HASH_BITS {bits}\n"
+                                                    f"#define DEVICE_DESCRIPTOR_HASH_FORESEE {foresee}\n")
+    driver: Path = build_directory.joinpath("driver.c")
+    driver.write_text(driver_program.format(home_keys="".join(f"{c_literal(key)}, " for key in home_keys),
+                                            displaced_keys="".join(f"{c_literal(key)}, " for key in displaced_keys),
+                                            absent_keys="".join(f"{c_literal(key)}, " for key in
+                                                                absent_keys(home_keys + displaced_keys)),
+                                            rounds=parsed.rounds))
+    flags: [] = ["-std=gnu11", "-O2", "-fcommon", f"-I{build_directory}", f"-I{compiler_magic_path}"]
+    object_file: Path = build_directory.joinpath("DeviceDescriptor.o")
+    program: Path = build_directory.joinpath("benchmark")
+    subprocess.run([parsed.compiler, *flags, "-fno-pic", "-c", str(source), "-o", str(object_file)], check=True)
+    subprocess.run([parsed.compiler, *flags, str(source), str(driver), "-o", str(program)], check=True)
+    rodata, text = section_sizes(parsed.size, object_file)
+    home_ns, displaced_ns, absent_ns = subprocess.run([str(program)], check=True, capture_output=True,
+                                                      text=True).stdout.split()
+    if min(float(home_ns), float(displaced_ns), float(absent_ns)) < 0:
+        raise AssertionError(f"The lookups of the setting '{setting.split()}' returned wrong results.")
+    return (f"{setting}{len(home_keys):>6}{float(home_ns):>9.2f}{len(displaced_keys):>6}{float(displaced_ns):>9.2f}"
+            f"{float(absent_ns):>9.2f}{rodata:>9}{text:>8}")
+
+
+def main(args: []):
+    """
+    Main program (entry point).
+
+    :param args: arguments from command line
+    """
+    parsed = parse_args(args)
+    HashTableFromYaml.program_logger.setLevel(ERROR)
+    print(f"{'backend':<15}{'bits':>6}{'foresee':>9}{'home':>6}{'ns':>9}{'moved':>6}{'ns':>9}{'miss ns':>9}"
+          f"{'.rodata':>9}{'.text':>8}")
+    settings: [] = []
+    for backend, bits, foresee in product(parsed.backend or HashTableFromYaml.backends, parsed.bits or ["6U", "8U"],
+                                          parsed.foresee or ["1U", "3U"]):
+        # The decision tree does not depend on the bits or the foresee, so it only runs once
+        if backend == "decision-tree" and any(setting[0] == backend for setting in settings):
+            continue
+        settings.append((backend, bits, foresee))
+    with TemporaryDirectory() as build_directory:
+        for backend, bits, foresee in settings:
+            print(run_setting(parsed, Path(build_directory), backend, bits, foresee), flush=True)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,360 @@
+# ===-- DescriptorImage.py - Binary Image of the Device Descriptor and its Reader --------------------*- Python -*-=== #
+#
+# Copyright (c) 2020 Oever González
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file except in compliance with
+#  the License. You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+#  an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+#  specific language governing permissions and limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# ===--------------------------------------------------------------------------------------------------------------=== #
+# /
+# / \file
+# / This file defines the binary image of a generated Hash Table, and a reader which maps the image in memory and looks
+# / up the properties with the same algorithm as the C code (the `Hash1` pass and then the `Hash2` pass, each one over
+# / the home slot and its foresee window, or over its neighborhood bitmap). The keys and values are returned as slices
+# / of the mapped image, without copying them. The integer values (the unsigned and signed tags, like pointers and ID's)
+# / are also stored decoded, in an array for every type.
+# /
+# / All the integers of the image are little-endian. The image starts with a header, followed by the sections at the
+# / offsets recorded in the header (every section is aligned to 8 bytes):
+# /
+# /  - slots: one 32-bit entry index for every slot of the table (0xFFFFFFFF for the empty slots).
+# /  - neighborhoods: one 64-bit bitmap for every slot of the table, only when the neighborhoods were generated.
+# /  - entries: six 32-bit fields for every property, the offset and the length of the key in the string pool, the
+# /    offset and the length of the value in the string pool, the index of the type of the value, and the index of the
+# /    value in the array of its type (0 when the type has no array).
+# /  - types: five 32-bit fields for every type, the offset and the length of its name in the string pool, the kind of
+# /    its array (0 for no array, 1 for unsigned and 2 for signed integers), and the offset and the length of its array.
+# /  - values: the arrays of the types, one 64-bit integer for every property of the type (in the order of the entries).
+# /  - strings: the string pool, with the bytes of the keys, the values and the names of the types (as the C compiler
+# /    stores them, without the NUL terminator).
+# /
+# ===--------------------------------------------------------------------------------------------------------------=== #
+
+import mmap
+import struct
+import sys
+from argparse import ArgumentParser
+
+# noinspection PyUnresolvedReferences
+from HashFamilies import HashFamily, hash_families
+# noinspection PyUnresolvedReferences
+from YamlTags import SignedCType, UnsignedCType
+
+empty_slot: int = 0xFFFFFFFF
+entry_format: struct.Struct = struct.Struct("<6I")
+header_format: struct.Struct = struct.Struct("<8sHHBBBBIIIQ32s7I")
+image_magic: bytes = b"YAMLHASH"
+image_version: int = 2
+neighborhood_format: struct.Struct = struct.Struct("<Q")
+section_alignment: int = 8
+sizing_modes: [] = ["power-of-two", "multiply-shift"]
+slot_format: struct.Struct = struct.Struct("<I")
+type_format: struct.Struct = struct.Struct("<5I")
+value_formats: [] = [None, struct.Struct("<Q"), struct.Struct("<q")]
+
+
+def align(offset: int) -> int:
+    """
+    Align an offset of the image to the alignment of the sections.
+
+    :param offset: the offset
+
+    :return: the aligned offset
+    """
+    return (offset + section_alignment - 1) // section_alignment * section_alignment
+
+
+def value_kind(value) -> int:
+    """
+    Get the kind of the array that stores the values of the type of a value.
+
+    :param value: the value
+
+    :return: the index of the format of the array in `value_formats`
+    """
+    if isinstance(value, SignedCType):
+        return 2
+    return 1 if isinstance(value, UnsignedCType) else 0
+
+
+def build_image(slots: [], neighborhoods: [], bits: int, foresee: int, sizing_mode: str, family: HashFamily,
+                pattern: int) -> bytes:
+    """
+    Build the binary image of a Hash Table.
+
+    :param slots: the slots of the table, every one is None or a tuple with the bytes of the key, the bytes of the
+                  value and the value itself
+    :param neighborhoods: the neighborhood bitmap of every slot, or None when the neighborhoods are not generated
+    :param bits: the number of bits of the hashes
+    :param foresee: the foresee of the linear lookup
+    :param sizing_mode: the sizing mode of the table
+    :param family: the hash family of `Hash1` and `Hash2`
+    :param pattern: the pattern (seed) of the hashes
+
+    :return: the bytes of the image
+    """
+    pool: bytearray = bytearray()
+    pooled: {} = {}
+
+    def pool_string(string: bytes) -> (int, int):
+        """
+        Store a string in the string pool, once for all its occurrences.
+
+        :param string: the bytes of the string
+
+        :return: a tuple with the offset and the length of the string in the pool
+        """
+        if string not in pooled:
+            pooled[string] = len(pool)
+            pool.extend(string)
+        return pooled[string], len(string)
+
+    type_indexes: {} = {}
+    type_values: {} = {}
+    slot_indexes: [] = []
+    entries: [] = []
+    for slot in slots:
+        if slot is None:
+            slot_indexes.append(empty_slot)
+            continue
+        key, value_bytes, value = slot
+        type_index: int = type_indexes.setdefault(type(value).__name__, len(type_indexes))
+        values: [] = type_values.setdefault(type(value).__name__, [])
+        slot_indexes.append(len(entries))
+        entries.append((*pool_string(key), *pool_string(value_bytes), type_index,
+                        len(values) if value_kind(value) else 0))
+        values.append(value)
+    slots_offset: int = align(header_format.size)
+    neighborhoods_offset: int = align(slots_offset + len(slots) * slot_format.size) if neighborhoods else 0
+    entries_offset: int = align((neighborhoods_offset + len(slots) * neighborhood_format.size) if neighborhoods else
+                                (slots_offset + len(slots) * slot_format.size))
+    types_offset: int = align(entries_offset + len(entries) * entry_format.size)
+    values_offset: int = align(types_offset + len(type_values) * type_format.size)
+    types: [] = []
+    arrays_offset: int = values_offset
+    for type_name, values in type_values.items():
+        kind: int = value_kind(values[0])
+        types.append((*pool_string(type_name.encode("ASCII")), kind, arrays_offset if kind else 0,
+                      len(values) if kind else 0))
+        arrays_offset += len(values) * value_formats[kind].size if kind else 0
+    strings_offset: int = align(arrays_offset)
+    image: bytearray = bytearray(strings_offset + len(pool))
+    header_format.pack_into(image, 0, image_magic, image_version, header_format.size, bits, foresee,
+                            sizing_modes.index(sizing_mode), 0x01 if neighborhoods else 0x00, len(slots), len(entries),
+                            len(types), pattern, family.name.encode("ASCII"), slots_offset, neighborhoods_offset,
+                            entries_offset, types_offset, values_offset, strings_offset, len(pool))
+    for index, slot_index in enumerate(slot_indexes):
+        slot_format.pack_into(image, slots_offset + index * slot_format.size, slot_index)
+    for index, bitmap in enumerate(neighborhoods or []):
+        neighborhood_format.pack_into(image, neighborhoods_offset + index * neighborhood_format.size, bitmap)
+    for index, entry in enumerate(entries):
+        entry_format.pack_into(image, entries_offset + index * entry_format.size, *entry)
+    for index, (type_entry, values) in enumerate(zip(types, type_values.values())):
+        type_format.pack_into(image, types_offset + index * type_format.size, *type_entry)
+        _, _, kind, array_offset, _ = type_entry
+        for value_index, value in enumerate(values if kind else []):
+            value_formats[kind].pack_into(image, array_offset + value_index * value_formats[kind].size, value.integer)
+    image[strings_offset:] = pool
+    return bytes(image)
+
+
+class DescriptorImage:
+    """
+    Read a binary image of a Hash Table, which is mapped in memory. The lookups return slices of the mapped image, so
+    the image must not be closed while they are in use.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as image_file:
+            try:
+                self.mapping: mmap.mmap = mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:
+                raise AssertionError(f"The file '{path}' is not a valid descriptor image.") from e
+        self.image: memoryview = memoryview(self.mapping)
+        try:
+            (magic, version, _, self.bits, self.foresee, sizing_mode, flags, self.length, self.entries_count,
+             types_count, self.pattern, family_name, self.slots_offset, self.neighborhoods_offset, self.entries_offset,
+             self.types_offset, _, self.strings_offset, strings_length) = header_format.unpack_from(self.image, 0)
+            if magic != image_magic or version != image_version:
+                raise AssertionError(f"The file '{path}' is not a descriptor image of version {image_version}.")
+            if self.strings_offset + strings_length > len(self.mapping):
+                raise AssertionError(f"The file '{path}' is not a valid descriptor image, it's truncated.")
+            self.family: HashFamily = hash_families[family_name.rstrip(b"\x00").decode("ASCII")]
+            self.sizing_mode: str = sizing_modes[sizing_mode]
+            self.types: [] = [type_format.unpack_from(self.image, self.types_offset + index * type_format.size)
+                              for index in range(types_count)]
+            self.type_names: [] = [bytes(self.string(name_offset, name_length)).decode("ASCII")
+                                   for name_offset, name_length, _, _, _ in self.types]
+        except AssertionError:
+            self.close()
+            raise
+        except (struct.error, KeyError, IndexError, UnicodeDecodeError) as e:
+            self.close()
+            raise AssertionError(f"The file '{path}' is not a valid descriptor image.") from e
+        self.neighborhoods: bool = bool(flags & 0x01)
+
+    def __contains__(self, key) -> bool:
+        return self.find(key) is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Unmap the image. The slices returned by the lookups must be released before.
+        """
+        self.image.release()
+        self.mapping.close()
+
+    def entry(self, index: int) -> (memoryview, memoryview, str):
+        """
+        Get a property of the image.
+
+        :param index: the index of the entry of the property
+
+        :return: a tuple with the key, the value and the name of the type of the value
+        """
+        key_offset, key_length, value_offset, value_length, type_index, _ = \
+            entry_format.unpack_from(self.image, self.entries_offset + index * entry_format.size)
+        return (self.string(key_offset, key_length), self.string(value_offset, value_length),
+                self.type_names[type_index])
+
+    def find(self, key) -> int:
+        """
+        Find the entry of a key, with the same lookup as `getDeviceDescriptorProperty()`.
+
+        :param key: the key, as bytes (the flatten separator is the 0x1F byte) or as an ASCII string
+
+        :return: the index of the entry of the key, or None when the key is not in the image
+        """
+        key_bytes: bytes = key.encode("ASCII") if isinstance(key, str) else bytes(key)
+        for hashing in (self.family.hash1, self.family.hash2):
+            home: int = hashing(key_bytes, self.bits, self.pattern)
+            if self.sizing_mode == "multiply-shift":
+                home = (home * self.length) >> self.bits
+            for slot in self.probed_slots(home):
+                index: int = self.slot(slot)
+                if index != empty_slot and self.key_matches(index, key_bytes):
+                    return index
+        return None
+
+    def integer(self, index: int) -> int:
+        """
+        Get the decoded value of a property, from the array of its type.
+
+        :param index: the index of the entry of the property
+
+        :return: the integer value, or None when the type of the value is not an integer type
+        """
+        _, _, _, _, type_index, value_index = entry_format.unpack_from(self.image, self.entries_offset +
+                                                                       index * entry_format.size)
+        _, _, kind, array_offset, _ = self.types[type_index]
+        if not kind:
+            return None
+        return value_formats[kind].unpack_from(self.image, array_offset + value_index * value_formats[kind].size)[0]
+
+    def key_matches(self, index: int, key: bytes) -> bool:
+        """
+        Compare the key of an entry against a key.
+
+        :param index: the index of the entry
+        :param key: the bytes of the key
+
+        :return: True if the keys are equal
+        """
+        key_offset, key_length = struct.unpack_from("<2I", self.image, self.entries_offset + index * entry_format.size)
+        return key_length == len(key) and self.string(key_offset, key_length) == key
+
+    def lookup(self, key) -> memoryview:
+        """
+        Look up the value of a key.
+
+        :param key: the key, as bytes (the flatten separator is the 0x1F byte) or as an ASCII string
+
+        :return: the bytes of the value (a slice of the image), or None when the key is not in the image
+        """
+        index: int = self.find(key)
+        return None if index is None else self.entry(index)[1]
+
+    def probed_slots(self, home: int) -> []:
+        """
+        Compute the slots that a pass of `tableLookup()` compares, in order: the slots whose bit is set in the
+        neighborhood bitmap of the home slot, or the home slot and then the clamped foresee window.
+
+        :param home: the home slot of the pass
+
+        :return: the list of slots
+        """
+        if self.neighborhoods:
+            bitmap: int = neighborhood_format.unpack_from(self.image, self.neighborhoods_offset +
+                                                          home * neighborhood_format.size)[0]
+            return [home - self.foresee + bit for bit in range(2 * self.foresee + 1) if bitmap >> bit & 0x01]
+        if self.slot(home) == empty_slot:
+            return []
+        window: range = range(max(home - self.foresee, 0), min(home + self.foresee, self.length - 1) + 1)
+        return [home] + [slot for slot in window if slot != home]
+
+    def slot(self, slot: int) -> int:
+        """
+        Get the index of the entry stored in a slot.
+
+        :param slot: the slot
+
+        :return: the index of the entry, or `empty_slot`
+        """
+        return slot_format.unpack_from(self.image, self.slots_offset + slot * slot_format.size)[0]
+
+    def string(self, offset: int, length: int) -> memoryview:
+        """
+        Get a string of the string pool.
+
+        :param offset: the offset of the string in the pool
+        :param length: the length of the string
+
+        :return: the bytes of the string (a slice of the image)
+        """
+        start: int = self.strings_offset + offset
+        return self.image[start:start + length]
+
+
+def main(args: []):
+    """
+    Main program (entry point), which prints the values of the given keys.
+
+    :param args: arguments from command line
+    """
+    parser = ArgumentParser(description="Look up properties in a binary image of a Device Descriptor, the same way "
+                                        "as the C code does.")
+    parser.add_argument('image',
+                        action='store', type=str,
+                        help="The binary image of the Device Descriptor.")
+    parser.add_argument('keys',
+                        action='store', type=str, nargs='+', metavar='key',
+                        help="The keys to look up, using '::' as the separator (e.g. 'machine::name').")
+    parsed = parser.parse_args(args)
+    with DescriptorImage(parsed.image) as image:
+        for key in parsed.keys:
+            index: int = image.find(key.replace("::", "\x1f"))
+            if index is None:
+                print(f"{key}: not found")
+                continue
+            key_bytes, value, type_name = image.entry(index)
+            integer: int = image.integer(index)
+            print(f"{key}: {bytes(value)!r} ({type_name}" + (")" if integer is None else f", {hex(integer)})"))
+            key_bytes.release()
+            value.release()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
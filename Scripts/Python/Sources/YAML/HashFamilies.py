@@ -0,0 +1,313 @@
+# ===-- HashFamilies.py - Hash Families for the Hash Table Generator ---------------------------------*- Python -*-=== #
+#
+# Copyright (c) 2020 Oever González
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file except in compliance with
+#  the License. You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+#  an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+#  specific language governing permissions and limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# ===--------------------------------------------------------------------------------------------------------------=== #
+# /
+# / \file
+# / This file contains the hash families that can be used by the Hash Table generator. A family is a pair of hashes
+# / (`Hash1` and `Hash2`), and it supplies both the Python implementation that is used to place the keys and the C code
+# / that is emitted in the generated source to look them up, so both implementations live next to each other.
+# /
+# / The C code of a family must have to define the `calculateHash1` and `calculateHash2` functions, which receive a
+# / pointer to the property and its length, and return the hash truncated to `DEVICE_DESCRIPTOR_HASH_BITS` bits.
+# /
+# ===--------------------------------------------------------------------------------------------------------------=== #
+
+from abc import ABC, abstractmethod
+
+mask_32bit: int = 0xFFFFFFFF
+
+
+# ===--------------------------------------------------------------------------------------------------------------=== #
+
+def truncate_mask(positions: int) -> int:
+    """
+    Generate a mask that can be used to truncate numbers to a certain number of relevant bits.
+
+    :param positions: the bits that are relevant
+
+    :return: a mask that if it's and-ed will truncate the number
+    """
+    return (1 << positions) - 1
+
+
+def rotate_left(value: int, positions: int, bits: int) -> int:
+    """
+    Rotate a number to the left by considering only a number of relevant bits.
+
+    :param value: the number to rotate
+    :param positions: the number of positions to rotate
+    :param bits: the number of relevant bits
+
+    :return: the rotated and masked number
+    """
+    truncate_masked: int = truncate_mask(positions)
+    left_shifted: int = value << positions
+    left_shifted &= ~truncate_masked
+    right_shifted: int = value >> (bits - positions)
+    right_shifted &= truncate_masked
+    return (right_shifted | left_shifted) & truncate_mask(bits)
+
+
+def rotate_right(value: int, positions: int, bits: int) -> int:
+    """
+    Rotate a number to the right by considering only a number of relevant bits.
+
+    :param value: the number to rotate
+    :param positions: the number of positions to rotate
+    :param bits: the number of relevant bits
+
+    :return: the rotated and masked number
+    """
+    truncate_masked: int = truncate_mask(bits - positions)
+    right_shifted: int = value >> positions
+    right_shifted &= truncate_masked
+    left_shifted: int = value << (bits - positions)
+    left_shifted &= ~truncate_masked
+    return (right_shifted | left_shifted) & truncate_mask(bits)
+
+
+def top_bits(value: int, bits: int) -> int:
+    """
+    Keep the upper bits of a 32-bit hash, which are the best mixed bits of a multiplicative hash.
+
+    :param value: the 32-bit hash
+    :param bits: the number of bits to keep, up to 32
+
+    :return: the truncated hash
+    """
+    if not 0 < bits <= 32:
+        raise AssertionError(f"This hash family produces up to 32 bits, but {bits} bits were requested.")
+    return (value & mask_32bit) >> (32 - bits)
+
+
+# ===--------------------------------------------------------------------------------------------------------------=== #
+
+class HashFamily(ABC):
+    """
+    Represent a family of two hashes. The hashes receive the bytes of the key as seen by the C program, the number of
+    bits of the hash and the 64-bit pattern that seeds them. A family produces hashes of up to `max_bits` bits.
+    """
+    name: str = ""
+    c_source: str = ""
+    max_bits: int = 32
+
+    @abstractmethod
+    def hash1(self, key: bytes, bits: int, seed: int) -> int:
+        """
+        Compute the `Hash1` of a key, as the `calculateHash1` function of the C code does.
+
+        :param key: the bytes of the key
+        :param bits: the number of bits of the hash
+        :param seed: the 64-bit pattern that seeds the hash
+
+        :return: the hash of the key
+        """
+
+    @abstractmethod
+    def hash2(self, key: bytes, bits: int, seed: int) -> int:
+        """
+        Compute the `Hash2` of a key, as the `calculateHash2` function of the C code does.
+
+        :param key: the bytes of the key
+        :param bits: the number of bits of the hash
+        :param seed: the 64-bit pattern that seeds the hash
+
+        :return: the hash of the key
+        """
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
+class RotateXorFamily(HashFamily):
+    """
+    The original hashes, which rotate the value and mix every character with the length of the key. They perform two
+    rotates and two multiplies per byte, and they support an arbitrary number of bits.
+    """
+    name = "rotate-xor"
+    max_bits = 64
+    c_source = '''
+/// \\brief A pre-computed bit mask that will be used to truncate the results to a certain bit length.
+static const unsigned bitMask = TRUNCATE_MASK(DEVICE_DESCRIPTOR_HASH_BITS);
+
+/// \\brief The pattern that will be the starting point of the hash.
+static const unsigned pattern = DEVICE_DESCRIPTOR_PATTERN & bitMask;
+
+// Calculate the `Hash1` value from a string, given a pointer to the string and it's length.
+static inline unsigned calculateHash1(const char *property, const size_t propertyLength) {
+ // Start the hash rotating to the left by 1 bit the pattern
+ static unsigned rotatedConstant = BRLN(pattern, 0x01U, DEVICE_DESCRIPTOR_HASH_BITS);
+ unsigned value = rotatedConstant;
+ // Initialize the loop index (the index of the current char) and the value of the bit char
+ size_t characterIndex = 0x00;
+ unsigned char character = (unsigned char) property[characterIndex];
+ // Loop to calculate the hash until a null character is found (or the length is depleted)
+ while (characterIndex < propertyLength) {
+  value = (unsigned int) BRLN(value, 0x01U, DEVICE_DESCRIPTOR_HASH_BITS);
+  value ^= ~character * ~propertyLength;
+  value = (unsigned int) BRLN(value, 0x01U, DEVICE_DESCRIPTOR_HASH_BITS);
+  value ^= character * ~propertyLength;
+  // Update the loop variables for the next iteration
+  characterIndex += 0x01;
+  character = (unsigned char) property[characterIndex];
+ }
+ value &= bitMask;
+ return value;
+}
+
+// Calculate the `Hash2` value from a string, given a pointer to the string and it's length.
+static inline unsigned calculateHash2(const char *property, const size_t propertyLength) {
+ // Start the hash rotating to the right by 1 bit the pattern
+ static unsigned rotatedConstant = BRRN(pattern, 0x01U, DEVICE_DESCRIPTOR_HASH_BITS);
+ unsigned value = rotatedConstant;
+ // Initialize the loop index (the index of the current char) and the value of the bit char
+ size_t characterIndex = 0x00;
+ unsigned char character = (unsigned char) property[characterIndex];
+ // Loop to calculate the hash until a null character is found (or the length is depleted)
+ while (characterIndex < propertyLength) {
+  value = (unsigned int) BRRN(value, 0x01U, DEVICE_DESCRIPTOR_HASH_BITS);
+  value ^= character * ~propertyLength;
+  value = (unsigned int) BRRN(value, 0x01U, DEVICE_DESCRIPTOR_HASH_BITS);
+  value ^= ~character * propertyLength;
+  // Update the loop variables for the next iteration
+  characterIndex += 0x01;
+  character = (unsigned char) property[characterIndex];
+ }
+ value &= bitMask;
+ return value;
+}
+'''
+
+    def hash1(self, key: bytes, bits: int, seed: int) -> int:
+        value: int = rotate_left(seed, 1, bits)
+        for character in key:
+            value = rotate_left(value, 1, bits)
+            value ^= ~character * ~len(key)
+            value = rotate_left(value, 1, bits)
+            value ^= character * ~len(key)
+        return value & truncate_mask(bits)
+
+    def hash2(self, key: bytes, bits: int, seed: int) -> int:
+        value: int = rotate_right(seed, 1, bits)
+        for character in key:
+            value = rotate_right(value, 1, bits)
+            value ^= character * ~len(key)
+            value = rotate_right(value, 1, bits)
+            value ^= ~character * len(key)
+        return value & truncate_mask(bits)
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
+class Fnv1aFamily(HashFamily):
+    """
+    Two FNV-1a hashes with different offset basis, derived from the lower and upper halves of the pattern. They
+    perform a single multiply per byte, and the upper bits of the 32-bit value are kept after a final multiplication.
+    """
+    name = "fnv-1a"
+    c_source = '''
+// Calculate the 32-bit FNV-1a hash of a string, starting from the given offset basis.
+static inline uint32_t fnv1a(const char *property, const size_t propertyLength, uint32_t value) {
+ for (size_t characterIndex = 0x00; characterIndex < propertyLength; characterIndex++) {
+  value = (value ^ (unsigned char) property[characterIndex]) * 0x01000193U;
+ }
+ return value;
+}
+
+// Calculate the `Hash1` value from a string, given a pointer to the string and it's length.
+static inline unsigned calculateHash1(const char *property, const size_t propertyLength) {
+ const uint32_t value = fnv1a(property, propertyLength, 0x811C9DC5U ^ (uint32_t) (DEVICE_DESCRIPTOR_PATTERN));
+ return (unsigned) ((uint32_t) (value * 0x9E3779B1U) >> (0x20U - DEVICE_DESCRIPTOR_HASH_BITS));
+}
+
+// Calculate the `Hash2` value from a string, given a pointer to the string and it's length.
+static inline unsigned calculateHash2(const char *property, const size_t propertyLength) {
+ const uint32_t value = fnv1a(property, propertyLength, 0x811C9DC5U ^ (uint32_t) (DEVICE_DESCRIPTOR_PATTERN >> 0x20U));
+ return (unsigned) ((uint32_t) (value * 0x85EBCA6BU) >> (0x20U - DEVICE_DESCRIPTOR_HASH_BITS));
+}
+'''
+
+    @staticmethod
+    def fnv1a(key: bytes, value: int) -> int:
+        for character in key:
+            value = ((value ^ character) * 0x01000193) & mask_32bit
+        return value
+
+    def hash1(self, key: bytes, bits: int, seed: int) -> int:
+        return top_bits(self.fnv1a(key, 0x811C9DC5 ^ (seed & mask_32bit)) * 0x9E3779B1, bits)
+
+    def hash2(self, key: bytes, bits: int, seed: int) -> int:
+        return top_bits(self.fnv1a(key, 0x811C9DC5 ^ ((seed >> 32) & mask_32bit)) * 0x85EBCA6B, bits)
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
+class MultiplyXorshiftFamily(HashFamily):
+    """
+    Two word-at-a-time hashes, seeded by the lower and upper halves of the pattern. Every 4 bytes of the key are
+    assembled in a little-endian word (independent of the endianness of the machine), which is mixed with a single
+    multiply and a xorshift. The upper bits of the 32-bit value are kept after a final mixing round.
+    """
+    name = "multiply-xorshift"
+    c_source = '''
+// Calculate the 32-bit multiply-xorshift hash of a string, 4 bytes at a time, starting from the given seed.
+static inline uint32_t multiplyXorshift(const char *property, const size_t propertyLength, const uint32_t seed) {
+ uint32_t value = seed ^ ((uint32_t) propertyLength * 0x9E3779B1U);
+ for (size_t wordIndex = 0x00; wordIndex < propertyLength; wordIndex += 0x04U) {
+  // Assemble a little-endian word, the tail of the property is padded with zeros
+  uint32_t word = 0x00;
+  for (size_t byteIndex = 0x00; byteIndex < 0x04U && wordIndex + byteIndex < propertyLength; byteIndex++) {
+   word |= (uint32_t) (unsigned char) property[wordIndex + byteIndex] << (byteIndex * 0x08U);
+  }
+  value = (value ^ word) * 0x85EBCA6BU;
+  value ^= value >> 0x0FU;
+ }
+ value *= 0xC2B2AE35U;
+ value ^= value >> 0x10U;
+ return value;
+}
+
+// Calculate the `Hash1` value from a string, given a pointer to the string and it's length.
+static inline unsigned calculateHash1(const char *property, const size_t propertyLength) {
+ const uint32_t value = multiplyXorshift(property, propertyLength, (uint32_t) (DEVICE_DESCRIPTOR_PATTERN));
+ return (unsigned) (value >> (0x20U - DEVICE_DESCRIPTOR_HASH_BITS));
+}
+
+// Calculate the `Hash2` value from a string, given a pointer to the string and it's length.
+static inline unsigned calculateHash2(const char *property, const size_t propertyLength) {
+ const uint32_t value = multiplyXorshift(property, propertyLength, (uint32_t) (DEVICE_DESCRIPTOR_PATTERN >> 0x20U));
+ return (unsigned) (value >> (0x20U - DEVICE_DESCRIPTOR_HASH_BITS));
+}
+'''
+
+    @staticmethod
+    def multiply_xorshift(key: bytes, seed: int) -> int:
+        value: int = (seed ^ (len(key) * 0x9E3779B1)) & mask_32bit
+        for word_index in range(0, len(key), 4):
+            word: int = int.from_bytes(key[word_index:word_index + 4], "little")
+            value = ((value ^ word) * 0x85EBCA6B) & mask_32bit
+            value ^= value >> 15
+        value = (value * 0xC2B2AE35) & mask_32bit
+        value ^= value >> 16
+        return value
+
+    def hash1(self, key: bytes, bits: int, seed: int) -> int:
+        return top_bits(self.multiply_xorshift(key, seed & mask_32bit), bits)
+
+    def hash2(self, key: bytes, bits: int, seed: int) -> int:
+        return top_bits(self.multiply_xorshift(key, (seed >> 32) & mask_32bit), bits)
+
+
+# ===--------------------------------------------------------------------------------------------------------------=== #
+
+default_hash_family: str = RotateXorFamily.name
+hash_families: {} = {family.name: family for family in (RotateXorFamily(), Fnv1aFamily(), MultiplyXorshiftFamily())}
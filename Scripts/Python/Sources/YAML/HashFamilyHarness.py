@@ -0,0 +1,209 @@
+# ===-- HashFamilyHarness.py - Measure the Quality and Speed of the Hash Families --------------------*- Python -*-=== #
+#
+# Copyright (c) 2020 Oever González
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file except in compliance with
+#  the License. You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+#  an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+#  specific language governing permissions and limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# ===--------------------------------------------------------------------------------------------------------------=== #
+# /
+# / \file
+# / This file will measure the hash families of the Hash Table generator over the keys of a YAML file. The distribution
+# / of every family is measured with its Python implementation (collisions and probe lengths at a given load factor),
+# / and the per-byte cost is measured by compiling its C code with the host compiler. The hashes computed by the C code
+# / are checked against the Python implementation, so both implementations are known to agree.
+# /
+# ===--------------------------------------------------------------------------------------------------------------=== #
+
+import subprocess
+import sys
+from argparse import ArgumentParser
+from math import ceil
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+# noinspection PyUnresolvedReferences
+import HashTableFromYaml
+# noinspection PyUnresolvedReferences
+from HashFamilies import HashFamily, hash_families
+
+compiler_support_path: Path = Path(__file__).resolve().parents[4].joinpath("Library", "CompilerSupport",
+                                                                           "CompilerMagic")
+timing_program: str = '''
+#include <CompilerMagic/BitwiseUtils.h>
+#include <stddef.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <string.h>
+#include <time.h>
+
+#define DEVICE_DESCRIPTOR_HASH_BITS {bits}U
+#define DEVICE_DESCRIPTOR_PATTERN {pattern}
+{family_source}
+
+static const char *const keys[] = {{{keys}}};
+static const size_t keysCount = sizeof(keys) / sizeof(keys[0]);
+
+int main(void) {{
+ size_t lengths[sizeof(keys) / sizeof(keys[0])];
+ size_t totalBytes = 0x00;
+ for (size_t i = 0x00; i < keysCount; i++) {{
+  lengths[i] = strlen(keys[i]);
+  totalBytes += lengths[i];
+  printf("%u %u\\n", calculateHash1(keys[i], lengths[i]), calculateHash2(keys[i], lengths[i]));
+ }}
+ volatile unsigned sink = 0x00;
+ struct timespec start, end;
+ clock_gettime(CLOCK_MONOTONIC, &start);
+ for (unsigned round = 0x00; round < {rounds}U; round++) {{
+  for (size_t i = 0x00; i < keysCount; i++) {{
+   sink ^= calculateHash1(keys[i], lengths[i]);
+   sink ^= calculateHash2(keys[i], lengths[i]);
+  }}
+ }}
+ clock_gettime(CLOCK_MONOTONIC, &end);
+ const double elapsed = (double) (end.tv_sec - start.tv_sec) * 1e9 + (double) (end.tv_nsec - start.tv_nsec);
+ printf("%f\\n", elapsed / ((double) totalBytes * 2.0 * {rounds}));
+ (void) sink;
+ return 0;
+}}
+'''
+
+
+def parse_args(args: []):
+    """
+    Parse the arguments of the harness.
+
+    :param args: arguments from command line
+
+    :return: the parsed arguments
+    """
+    parser = ArgumentParser(description="Measure the distribution and the per-byte cost of the hash families of the "
+                                        "Hash Table generator, over the keys of a YAML file.")
+    parser.add_argument('-y', '--yaml-file',
+                        action='store', type=open, required=True,
+                        help="The YAML file whose flattened keys are used to measure the hash families.")
+    parser.add_argument('-b', '--bits',
+                        action='store', type=int, metavar='bits', default=16,
+                        help="The number of bits of the hashes. (default: %(default)s).")
+    parser.add_argument('-l', '--load-factor',
+                        action='store', type=float, metavar='load', default=0.75,
+                        help="The load factor of the simulated table. (default: %(default)s).")
+    parser.add_argument('-f', '--foresee',
+                        action='store', type=int, metavar='foresee', default=3,
+                        help="The linear lookup window around the home slots. (default: %(default)s).")
+    parser.add_argument('-c', '--compiler',
+                        action='store', type=str, metavar='cc', default="cc",
+                        help="The host C compiler used to measure the per-byte cost. (default: %(default)s).")
+    parser.add_argument('-r', '--rounds',
+                        action='store', type=int, metavar='rounds', default=20000,
+                        help="The number of times that all the keys are hashed. (default: %(default)s).")
+    parser.add_argument('-j', '--hash-family',
+                        action='append', type=str, metavar='family', choices=list(hash_families),
+                        help="A hash family to measure, it can be repeated. (default: all the families).")
+    return parser.parse_args(args)
+
+
+def measure_distribution(family: HashFamily, keys: [], bits: int, load_factor: float, foresee: int) -> {}:
+    """
+    Measure the distribution of a hash family, in a table sized for the keys at the given load factor (the hashes are
+    reduced to the table by a multiplication and a shift). The keys are placed in the order of the generator: the
+    `Hash1` home slot, the lookup around it, the `Hash2` home slot and the lookup around it.
+
+    :param family: the hash family
+    :param keys: the bytes of the keys
+    :param bits: the number of bits of the hashes
+    :param load_factor: the load factor of the table
+    :param foresee: the linear lookup window around the home slots
+
+    :return: a dictionary with the measurements
+    """
+    length: int = max(ceil(len(keys) / load_factor), len(keys))
+    homes: [] = [((family.hash1(key, bits, HashTableFromYaml.pattern_64bit) * length) >> bits,
+                  (family.hash2(key, bits, HashTableFromYaml.pattern_64bit) * length) >> bits) for key in keys]
+    table: [] = [False] * length
+    probes: [] = []
+    unplaced: int = 0
+    for home1, home2 in homes:
+        candidates: [] = [home1, *HashTableFromYaml.foresee_range(home1, 1, foresee, length),
+                          home2, *HashTableFromYaml.foresee_range(home2, -1, foresee, length)]
+        for probe, slot in enumerate(dict.fromkeys(candidates), start=1):
+            if not table[slot]:
+                table[slot] = True
+                probes.append(probe)
+                break
+        else:
+            unplaced += 1
+    return {
+        "length": length,
+        "hash1_collisions": len(keys) - len({home1 for home1, _ in homes}),
+        "hash2_collisions": len(keys) - len({home2 for _, home2 in homes}),
+        "double_collisions": len(keys) - len(set(homes)),
+        "mean_probes": sum(probes) / len(probes) if probes else 0.0,
+        "max_probes": max(probes, default=0),
+        "unplaced": unplaced,
+    }
+
+
+def measure_cost(family: HashFamily, keys: [], bits: int, compiler: str, rounds: int) -> float:
+    """
+    Measure the per-byte cost of the C code of a hash family, by compiling it with the host compiler. The hashes of
+    the C code are checked against the Python implementation before measuring.
+
+    :param family: the hash family
+    :param keys: the bytes of the keys
+    :param bits: the number of bits of the hashes
+    :param compiler: the host C compiler
+    :param rounds: the number of times that all the keys are hashed
+
+    :return: the cost in nanoseconds per byte
+    """
+    c_keys: str = ", ".join("\"" + "".join(f"\\x{character:02x}" for character in key) + "\"" for key in keys)
+    with TemporaryDirectory() as build_directory:
+        source: Path = Path(build_directory).joinpath("harness.c")
+        program: Path = Path(build_directory).joinpath("harness")
+        source.write_text(timing_program.format(bits=bits, pattern=hex(HashTableFromYaml.pattern_64bit),
+                                                family_source=family.c_source, keys=c_keys, rounds=rounds))
+        subprocess.run([compiler, "-std=gnu11", "-O2", f"-I{compiler_support_path}", str(source), "-o", str(program)],
+                       check=True)
+        output: [] = subprocess.run([str(program)], check=True, capture_output=True, text=True).stdout.split()
+    for index, key in enumerate(keys):
+        expected: () = (family.hash1(key, bits, HashTableFromYaml.pattern_64bit),
+                        family.hash2(key, bits, HashTableFromYaml.pattern_64bit))
+        if (int(output[2 * index]), int(output[2 * index + 1])) != expected:
+            raise AssertionError(f"The C and Python implementations of '{family.name}' disagree for key {key}.")
+    return float(output[-1])
+
+
+def main(args: []):
+    """
+    Main program (entry point).
+
+    :param args: arguments from command line
+    """
+    parsed = parse_args(args)
+    with parsed.yaml_file as yaml_file:
+        keys: [] = [HashTableFromYaml.c_string_bytes(key) for key in HashTableFromYaml.flatten_dictionary(yaml_file)]
+    print(f"{len(keys)} keys, {parsed.bits} bits, load factor {parsed.load_factor}, foresee {parsed.foresee}")
+    print(f"{'family':<20}{'length':>8}{'h1 coll':>9}{'h2 coll':>9}{'both':>6}{'mean':>7}{'max':>5}{'lost':>6}"
+          f"{'ns/byte':>9}")
+    for name in parsed.hash_family or hash_families:
+        family: HashFamily = hash_families[name]
+        distribution: {} = measure_distribution(family, keys, parsed.bits, parsed.load_factor, parsed.foresee)
+        cost: float = measure_cost(family, keys, parsed.bits, parsed.compiler, parsed.rounds)
+        print(f"{name:<20}{distribution['length']:>8}{distribution['hash1_collisions']:>9}"
+              f"{distribution['hash2_collisions']:>9}{distribution['double_collisions']:>6}"
+              f"{distribution['mean_probes']:>7.2f}{distribution['max_probes']:>5}{distribution['unplaced']:>6}"
+              f"{cost:>9.3f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
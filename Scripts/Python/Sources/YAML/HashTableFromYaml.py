@@ -23,36 +23,80 @@
 # /
 # ===--------------------------------------------------------------------------------------------------------------=== #
 
+import codecs
+import hashlib
+import json
+import pickle
 import sys
 from logging import DEBUG, basicConfig, getLogger
-from math import ceil, log2
+from math import ceil, exp, log, log2
 
 import base36
 import re
 # noinspection PyUnresolvedReferences
-from YamlMerging import FileMarkedValue, GetYamlMerger
+from DescriptorImage import build_image
 # noinspection PyUnresolvedReferences
-from YamlTags import FileMarker, InitializeIncludeTags, InitializeStronglyTypedTags, StringCType, YamlInclude
-from argparse import ArgumentParser, FileType, Namespace
+from HashFamilies import HashFamily, default_hash_family, hash_families, truncate_mask
+# noinspection PyUnresolvedReferences
+from YamlMerging import FileMarkedValue, YamlLayers
+# noinspection PyUnresolvedReferences
+from YamlTags import CType, FileMarker, InitializeIncludeTags, InitializeStronglyTypedTags, Range, StringCType, \
+    YamlInclude
+from argparse import ArgumentParser, ArgumentTypeError, FileType, Namespace
+from concurrent.futures import ProcessPoolExecutor
 from io import StringIO, TextIOWrapper
-from os import getcwd
+from os import getcwd, replace
 from pathlib import Path
 from ruamel.yaml import YAML
 from stringcase import constcase
+from tempfile import NamedTemporaryFile
+from time import time
+
+try:
+    # noinspection PyUnresolvedReferences
+    from _ruamel_yaml import CParser
+except ImportError:
+    CParser = None
 
+backend: str = "hashmap"
+backends: [] = ["hashmap", "decision-tree"]
 bits: int = 8
 buffer_size: int = 64 * 1024  # 64kib
+cache_directory: Path = None
+cache_max_age: int = 30 * 24 * 60 * 60  # 30 days
 collision_foresee: int = 1
+default_backend: str = "hashmap"
 default_db_filename: str = "properties.yaml"
+default_filter_rate: float = 0.0
 default_header_filename: str = "YamlPropertyHashTable.h"
 default_header_template: str = "template.h"
+default_layout: str = "table"
+default_load_factor: float = 0.75
+default_pointer_size: int = 4
+default_sizing_mode: str = "power-of-two"
 default_source_filename: str = "YamlPropertyHashTable.c"
 default_source_template: str = "template.c.h"
+default_yaml_loader: str = "auto"
+filter_rate: float = default_filter_rate
+fingerprint_basis: int = 0x811C9DC5
+fingerprint_bits: int = 0
+fingerprint_prime: int = 0x01000193
 flatten_separator: str = "\\x1f"
 flatten_separator_api: str = "PS"
+flatten_separator_byte: str = "\x1f"
+generator_modules: [] = [Path(__file__).with_name(f"{module}.py") for module in
+                         ("DescriptorImage", "HashFamilies", "HashTableFromYaml", "YamlMerging", "YamlTags")]
+hash_family: HashFamily = hash_families[default_hash_family]
+hash_family_placeholder: str = "@HASH_FAMILY@"
+include_jobs: int = 0
 include_multiplicity: int = 1
+input_files: [] = []
+ir_schema_version: int = 1
+load_factor: float = default_load_factor
 max_64bit: int = 0xFFFFFFFFFFFFFFFF
+neighborhoods: bool = False
 parsed_arguments = None
+parsed_documents: {} = None
 pattern_64bit: int = 0x8192A3B4C5D6E7F8 ^ 0x5A5A5A5A5A5A5A5A
 places_binary: int = bits
 places_decimal: int = ceil(bits / log2(10))
@@ -62,13 +106,36 @@ precomputed_mask: int = 0
 print_separator: str = "::"
 program_logger = getLogger(__name__)
 program_parser = None
+sizing_mode: str = default_sizing_mode
+sizing_modes: [] = ["power-of-two", "multiply-shift"]
+table_layout: str = default_layout
+table_layouts: [] = ["table", "indexed"]
 testing_property_key: str = "testing" + flatten_separator + "lookup"
 testing_property_value: StringCType = StringCType("working")
-yaml_merger = GetYamlMerger()
-yaml_parser = YAML(typ="safe")
+yaml_loader: str = default_yaml_loader
+yaml_loaders: [] = ["auto", "libyaml", "python"]
+
+
+def create_yaml_parser(loader: str) -> YAML:
+    """
+    Create the YAML parser, with the custom tags. The 'libyaml' loader scans and parses the files with the C extension
+    of ruamel.yaml, while the nodes are still constructed by the custom constructors (the tags, the ASCII strings and
+    the marks of the sequences), so both loaders construct the same documents. The 'auto' loader uses the C extension
+    when it's installed, and falls back to the 'python' loader otherwise.
 
-InitializeIncludeTags(yaml_parser)
-InitializeStronglyTypedTags(yaml_parser)
+    :param loader: the name of the loader
+
+    :return: the YAML parser
+    """
+    if loader == "libyaml" and CParser is None:
+        raise AssertionError("The 'libyaml' loader requires the C extension of ruamel.yaml (ruamel.yaml.clib).")
+    created_parser: YAML = YAML(typ="safe", pure=loader == "python" or CParser is None)
+    InitializeIncludeTags(created_parser)
+    InitializeStronglyTypedTags(created_parser)
+    return created_parser
+
+
+yaml_parser: YAML = create_yaml_parser(default_yaml_loader)
 
 
 def parse_args(args: []):
@@ -92,15 +159,35 @@ def parse_args(args: []):
                    "collision solving algorithm. The linear lookup is defined by the foresee, and the hashes used to "
                    "compute values are custom hashing designed by the author. Those hashes support arbitrary length "
                    "output and are pretty well behaved for ASCII strings. The hash table is not resizable and no "
-                   "re-hashing is made, and that makes the lookup O(1). However, it does require a power of 2 for the "
-                   "storage of the index, and it does not scale well under load. Anyway, users can overestimate the "
-                   "foresee to give up to the O(1) lookup time in order to keep the table as tidy as possible.")
+                   "re-hashing is made, and that makes the lookup O(1). By default, it does require a power of 2 for "
+                   "the storage of the index, and it does not scale well under load. Anyway, users can overestimate "
+                   "the foresee to give up to the O(1) lookup time in order to keep the table as tidy as possible. "
+                   "The 'multiply-shift' sizing mode lifts the power of 2 requirement: the hash is mapped to an "
+                   "arbitrary table length by a multiplication and a shift, so the table grows linearly with the "
+                   "number of properties.\n"
+                   "The 'decision-tree' backend does not hash the properties at all: it generates a switch on the "
+                   "length of the property and then on the bytes that tell the keys apart, which selects a single "
+                   "candidate that is compared against the property. The table of key-value pairs has no slack.")
+    parser.add_argument('-g', '--backend',
+                        action='store', type=str, metavar='backend', default=default_backend, choices=backends,
+                        help="Select the lookup code generator. The 'hashmap' backend generates the hash table. The "
+                             "'decision-tree' backend generates a switch on the key length and on the discriminating "
+                             "bytes of the keys, ending in a single comparison. (default: %(default)s).")
     parser.add_argument('-y', '--yaml-file',
                         action='store',
-                        default=default_db_filename,
+                        default=None,
                         help="This is the input file that will be used to generate the lookup table based on the YAML "
-                             "properties of the objects in this file.",
+                             f"properties of the objects in this file. (default: {default_db_filename}).",
                         type=FileType(bufsize=buffer_size))
+    parser.add_argument('-E', '--emit-ir',
+                        action='store', type=str, metavar='ir', default=None,
+                        help="Write the flattened properties (the keys and their typed values) in the given file, as "
+                             "JSON lines which start with the version of the schema and the digests of the YAML files. "
+                             "The file can be given to '--from-ir' to generate the table again without the YAML files.")
+    parser.add_argument('-I', '--from-ir',
+                        action='store', type=str, metavar='ir', default=None,
+                        help="Read the flattened properties from a file written by '--emit-ir', instead of parsing, "
+                             "including, merging and flattening the YAML file.")
     parser.add_argument('-e', '--header-template',
                         action='store',
                         default=default_header_template,
@@ -110,7 +197,7 @@ def parse_args(args: []):
                         action='store',
                         default=default_header_filename,
                         help="The output file where the header will be generated.",
-                        type=FileType(mode='w', bufsize=buffer_size))
+                        type=str)
     parser.add_argument('-s', '--source-template',
                         action='store',
                         default=default_source_template,
@@ -120,7 +207,7 @@ def parse_args(args: []):
                         action='store',
                         default=default_source_filename,
                         help="The output file where the source code will be generated.",
-                        type=FileType(mode='w', bufsize=buffer_size))
+                        type=str)
     parser.add_argument('-b', '--bits',
                         action='store', type=str, metavar='bits', default="8",
                         help="Define the number of bits that are used to generate the hash.")
@@ -128,6 +215,98 @@ def parse_args(args: []):
                         action='store', type=str, metavar='foresee', default="1",
                         help="Define the linear lookup window to perform stores and lookups around the calculated hash "
                              "to resolve collisions.")
+    parser.add_argument('-j', '--hash-family',
+                        action='store', type=str, metavar='family', default=default_hash_family,
+                        choices=list(hash_families),
+                        help="Select the family of the `Hash1` and `Hash2` hashes. Every family supplies both the "
+                             "implementation used to place the keys and the C code used to look them up. "
+                             "(default: %(default)s).")
+    parser.add_argument('-z', '--sizing',
+                        action='store', type=str, metavar='sizing', default=default_sizing_mode, choices=sizing_modes,
+                        help="Select how the length of the table is computed. The 'power-of-two' mode uses a table of "
+                             "2^bits entries and truncates the hash to the number of bits. The 'multiply-shift' mode "
+                             "picks the smallest table length that can hold all the properties at the given load "
+                             "factor, and reduces the hash to the table length by multiplying it by the length and "
+                             "shifting the result by the number of bits. (default: %(default)s).")
+    parser.add_argument('-l', '--load-factor',
+                        action='store', type=float, metavar='load', default=default_load_factor,
+                        help="The maximum load factor used to compute the initial table length when using the "
+                             "'multiply-shift' sizing mode. The table will grow one entry at a time until all "
+                             "collisions are resolved. (default: %(default)s).")
+    parser.add_argument('-t', '--layout',
+                        action='store', type=str, metavar='layout', default=default_layout, choices=table_layouts,
+                        help="Select the memory layout of the generated table. The 'table' layout stores a key-value "
+                             "pair in every slot of the table. The 'indexed' layout stores a small index (8 or 16 "
+                             "bits per slot, depending on the number of properties) which points to a dense array of "
+                             "key-value pairs, so empty slots are cheap. (default: %(default)s).")
+    parser.add_argument('-k', '--fingerprint-bits',
+                        action='store', type=int, metavar='bits', default=0, choices=[0, 8, 16],
+                        help="When it's not zero, store the table as a struct of arrays: the keys and values are kept "
+                             "in separate arrays of pointers, next to a compact array of fingerprints of the keys (of "
+                             "the given number of bits) and an array of their lengths. Most mismatched keys are "
+                             "rejected by comparing the fingerprint and the length, before comparing the strings. "
+                             "(default: %(default)s).")
+    parser.add_argument('-n', '--neighborhoods',
+                        action='store_true',
+                        help="Emit a Hopscotch neighborhood bitmap for every slot of the table, which records the "
+                             "slots around it that hold keys whose hash is that slot. Lookups only compare the keys in "
+                             "the neighborhood, and misses are resolved by reading a single bitmap.")
+    parser.add_argument('-q', '--profile',
+                        action='store',
+                        default=None,
+                        help="A key-frequency profile, with a line for every key that contains the number of lookups "
+                             "of the key and the key itself (using the '::' separator), e.g. gathered from a boot "
+                             "trace. The most frequent keys are inserted first, so they resolve on the first probe.",
+                        type=FileType(bufsize=buffer_size))
+    parser.add_argument('-r', '--filter-rate',
+                        action='store', type=float, metavar='rate', default=default_filter_rate,
+                        help="When it's not zero, emit a Bloom filter over all the keys, sized for the given false "
+                             "positive rate. Most of the lookups for absent keys are rejected by the filter before "
+                             "probing the table. (default: %(default)s).")
+    parser.add_argument('-x', '--stats',
+                        action='store',
+                        default=None,
+                        help="Write a JSON report of the placement quality to the given file: the load factor, the "
+                             "number of keys placed in their home slot, in the window, in the Hash2 slot and in the "
+                             "Hash2 window, the histogram of the key compares of every lookup, the expected and worst "
+                             "number of compares of hits and misses, and the bytes of the emitted table.",
+                        type=str)
+    parser.add_argument('-B', '--image',
+                        action='store', type=str, metavar='image', default=None,
+                        help="Write the generated table as a binary image to the given file: a header, the slots, the "
+                             "entries, the types of the values, the arrays of the integer values of every type and a "
+                             "pool with the bytes of the keys and the values, at fixed offsets. The image can be "
+                             "queried with 'DescriptorImage.py', which performs the same lookup as the C code. It "
+                             "requires the 'hashmap' backend.")
+    parser.add_argument('-w', '--pointer-size',
+                        action='store', type=int, metavar='bytes', default=default_pointer_size, choices=[2, 4, 8],
+                        help="The size of a pointer (and 'size_t') on the target, used to compute the bytes of the "
+                             "emitted table in the report of the placement quality. (default: %(default)s).")
+    parser.add_argument('-d', '--depfile',
+                        action='store', type=str, metavar='depfile', default=None,
+                        help="Write a Make/Ninja depfile, which lists every YAML file that was included (transitively) "
+                             "and the templates as the dependencies of the generated files.")
+    parser.add_argument('-c', '--digest',
+                        action='store', type=str, metavar='digest', default=None,
+                        help="Keep a digest of the contents of all the inputs and the options in the given file. When "
+                             "the digest did not change and all the outputs exist, the program exits immediately "
+                             "without touching the outputs. The digest file itself is touched by every run, so it "
+                             "can be the output (stamp) that the build system checks.")
+    parser.add_argument('-u', '--cache',
+                        action='store', type=str, metavar='directory', default=None,
+                        help="Keep the parsed YAML documents in the given directory, keyed by the path, size, "
+                             "modification time and contents of every file. Unchanged files (e.g. the common files of "
+                             "an architecture) are loaded from the cache instead of being parsed again.")
+    parser.add_argument('-m', '--include-jobs',
+                        action='store', type=int, metavar='jobs', default=0,
+                        help="When it's not zero, the included YAML files are parsed in a pool of processes of the "
+                             "given size. The includes of every file are parsed ahead, while the files are merged in "
+                             "the same order as without the pool. (default: %(default)s).")
+    parser.add_argument('-L', '--loader',
+                        action='store', type=str, metavar='loader', default=default_yaml_loader, choices=yaml_loaders,
+                        help="The loader of the YAML files: 'libyaml' parses them with the C extension of ruamel.yaml, "
+                             "'python' with the pure Python parser, and 'auto' uses the C extension when it's "
+                             "installed. All the loaders produce the same outputs. (default: %(default)s).")
     parser.add_argument('-p', '--api-struct-name',
                         action='store', type=str, metavar='struct', default="yamlPropertyValue",
                         help="This is the name of the 'struct' that is exposed in the Header File (the API).")
@@ -141,9 +320,150 @@ def parse_args(args: []):
     global parsed_arguments
     program_parser = parser
     parsed_arguments = parser.parse_args(args)
+    if parsed_arguments.yaml_file is not None and parsed_arguments.from_ir is not None:
+        parser.error("argument -I/--from-ir: not allowed with argument -y/--yaml-file")
+    if parsed_arguments.yaml_file is None and parsed_arguments.from_ir is None:
+        try:
+            parsed_arguments.yaml_file = FileType(bufsize=buffer_size)(default_db_filename)
+        except ArgumentTypeError as e:
+            parser.error(f"argument -y/--yaml-file: {e}")
     return parsed_arguments
 
 
+def load_documents(properties_file_path: str, prefetched: {} = None, memo: {} = None) -> []:
+    """
+    Load all the documents of a YAML file. When a memo is given (e.g. `parsed_documents`, which is shared by all the
+    files of a run), every file is loaded once. When the parse cache is enabled, the documents are loaded from the
+    cache if the size, the modification time and the contents of the file did not change; otherwise, the file is
+    parsed and the documents are stored in the cache (replacing the stale entry of the file).
+
+    The documents are not modified while they are included and merged, so the memo shares them without copies.
+
+    :param properties_file_path: the absolute path to the YAML file
+    :param prefetched: a dictionary with the futures of the files that are being loaded ahead, by their path
+    :param memo: a dictionary with the documents of the files that were already loaded, by their path
+
+    :return: a list with the documents of the file
+    """
+    if memo is not None and properties_file_path in memo:
+        return memo[properties_file_path]
+    if prefetched and properties_file_path in prefetched:
+        documents: [] = prefetched.pop(properties_file_path).result()
+    else:
+        documents: [] = load_cached_documents(properties_file_path)
+    if memo is not None:
+        memo[properties_file_path] = documents
+    return documents
+
+
+def load_cached_documents(properties_file_path: str) -> []:
+    """
+    Load all the documents of a YAML file, through the parse cache when it's enabled.
+
+    :param properties_file_path: the absolute path to the YAML file
+
+    :return: a list with the documents of the file
+    """
+    if cache_directory is None:
+        with open(properties_file_path) as open_yaml:
+            return list(yaml_parser.load_all(open_yaml))
+    file_stat = Path(properties_file_path).stat()
+    contents_digest: str = hashlib.sha256(Path(properties_file_path).read_bytes()).hexdigest()
+    cache_key: str = hashlib.sha256(properties_file_path.encode()).hexdigest()
+    cache_file: Path = cache_directory.joinpath(f"{cache_key}.pickle")
+    entry_key: () = (properties_file_path, file_stat.st_size, file_stat.st_mtime_ns, contents_digest,
+                     cache_tags_digest())
+    try:
+        with open(cache_file, "rb") as open_cache:
+            cached_key, cached_documents = pickle.load(open_cache)
+        if cached_key == entry_key:
+            program_logger.debug(f"Loaded the documents of '{properties_file_path}' from the parse cache")
+            cache_file.touch()
+            return cached_documents
+    except (OSError, EOFError, AttributeError, ImportError, ValueError, pickle.UnpicklingError):
+        pass
+    with open(properties_file_path) as open_yaml:
+        documents: [] = list(yaml_parser.load_all(open_yaml))
+    cache_directory.mkdir(parents=True, exist_ok=True)
+    # The entry is written aside and moved in place, so concurrent runs never read a partially written entry
+    with NamedTemporaryFile("wb", dir=cache_directory, suffix=".tmp", delete=False) as open_cache:
+        try:
+            pickle.dump((entry_key, documents), open_cache, protocol=pickle.HIGHEST_PROTOCOL)
+        except BaseException:
+            open_cache.close()
+            Path(open_cache.name).unlink()
+            raise
+    replace(open_cache.name, cache_file)
+    program_logger.debug(f"Stored the documents of '{properties_file_path}' in the parse cache")
+    return documents
+
+
+def initialize_include_worker(loader: str, cache: Path):
+    """
+    Set up a process of the pool that parses the included files with the loader and the parse cache of the run, as
+    the processes do not inherit them when they are spawned instead of forked (e.g. on macOS and Windows).
+
+    :param loader: the name of the loader
+    :param cache: the directory of the parse cache, or None when it's disabled
+    """
+    global cache_directory
+    global yaml_loader
+    global yaml_parser
+    cache_directory = cache
+    if loader != yaml_loader:
+        yaml_loader = loader
+        yaml_parser = create_yaml_parser(yaml_loader)
+
+
+def cache_tags_digest() -> str:
+    """
+    Compute the digest of the module that constructs the tags, so the cached documents are discarded when the classes
+    of the tags change.
+
+    :return: the hexadecimal digest
+    """
+    return hashlib.sha256(Path(__file__).with_name("YamlTags.py").read_bytes()).hexdigest()
+
+
+def evict_stale_cache():
+    """
+    Remove the entries of the parse cache which were not used for a long time (e.g. the files of a deleted board).
+    """
+    if cache_directory is None or not cache_directory.is_dir():
+        return
+    for cache_file in cache_directory.glob("*.pickle"):
+        if time() - cache_file.stat().st_mtime > cache_max_age:
+            program_logger.debug(f"Evicting the stale entry '{cache_file}' of the parse cache")
+            cache_file.unlink()
+
+
+def include_path(inferred_path: Path, include_type: str, properties_path_absolute: str) -> str:
+    """
+    Compute the canonical path to an included file (absolute, without symbolic links and '..' components), so a file
+    is the same node of the include graph no matter how it's included.
+
+    :param inferred_path: the path of the include tag
+    :param include_type: the type of the include tag: 'abs', 'cwd' or 'rel'
+    :param properties_path_absolute: the absolute path to the file which includes the file
+
+    :return: the canonical path to the included file
+    """
+    if include_type == "abs":
+        computed_path: str = str(inferred_path.resolve())
+        program_logger.debug(f"Found an absolute path include: '{computed_path}'")
+    elif include_type == "cwd":
+        working_directory = Path(getcwd())
+        computed_path: str = str(working_directory.joinpath(inferred_path).resolve())
+        program_logger.debug(f"Found an include relative to working directory: '{computed_path}'")
+    elif include_type == "rel":
+        included_dir = Path(properties_path_absolute).parent
+        computed_path: str = str(included_dir.joinpath(inferred_path).resolve())
+        program_logger.debug(f"Found an include relative to the current file: '{computed_path}'")
+    else:
+        raise AssertionError("Can not determine the type of file included.")
+    return computed_path
+
+
 def flatten_dictionary(input_properties_file: TextIOWrapper) -> {}:
     """
     Flatten a YAML file into strings.
@@ -153,156 +473,403 @@ def flatten_dictionary(input_properties_file: TextIOWrapper) -> {}:
     :return: a dictionary which represents the flatten YAML
     """
     result_dictionary = {}
+    include_chain: [] = []
+    include_counts: {} = {}
+    include_executor: ProcessPoolExecutor = None
+    memo: {} = parsed_documents if parsed_documents is not None else {}
+    prefetched: {} = {}
+    warned_includes: set = set()
 
-    def include_recurse(properties_file_path: str, file_carry: {}, main_dict: {}) -> {}:
+    def prefetch_includes(properties_documents: [], properties_path_absolute: str):
+        """
+        Start loading the files included by all the documents of a file in the pool of processes, before they are
+        needed. The files are still merged by `include_recurse()`, in the same order as without the pool; any error
+        of the include lists is reported there.
+
+        :param properties_documents: the documents of the file
+        :param properties_path_absolute: the absolute path to the file
+        """
+        for properties_object in properties_documents:
+            try:
+                include_list: [] = properties_object.get(StringCType("$INCLUDE"), None) or []
+                for include in include_list:
+                    if isinstance(include, YamlInclude):
+                        computed_path: str = include_path(include.path, include.type, properties_path_absolute)
+                        if computed_path not in prefetched and computed_path not in memo:
+                            prefetched[computed_path] = include_executor.submit(load_cached_documents,
+                                                                                computed_path)
+            except (AttributeError, TypeError, AssertionError):
+                continue
+
+    def include_recurse(properties_file_path: str, merge_order: []):
         """
         Perform a recursive inclusion of other YAML files, from tags inside the YAML files, which can be either
         relative to the working directory (by using the '$$' tag), relative to the file which included it (by using
         the '$@' tag) or an absolute file path (by using the '$+' tag). Files are automatically "guarded",
-        so they will be included only once per file. The first leaf file is included first, and the root file is
-        included the latest. All properties that appear in more than one file or document will be replaced to the
-        latest definition (so it depends on which order the files are included, and that means that the latest
-        document of the root file will always override all previous definitions of a property or object).
+        so every document includes a file only once, and a file that includes itself (through any chain of files)
+        is reported and ignored. The first leaf file is included first, and the root file is included the latest.
+        All properties that appear in more than one file or document will be replaced to the latest definition (so it
+        depends on which order the files are included, and that means that the latest document of the root file will
+        always override all previous definitions of a property or object).
 
-        Generally speaking, you should call this function with two empty dictionaries, unless you have a list of
-        absolute paths to exclude or a dictionary which holds pre-defined values. Note that those pre-defined values
-        will have the lowest precedence.
+        This function walks the include graph, whose nodes are the canonical paths of the files: the documents are
+        appended to the merge order, but they are merged by the caller. Every file is parsed once per run.
 
         :param properties_file_path: a string which is a path to a YAML file
-        :param file_carry: a dictionary which holds all the absolute paths to file that should not be processed
-        :param main_dict: a dictionary which holds the result of the processed files
-
-        :return: the computed dictionary which is the combination of the files as described
+        :param merge_order: a list where the documents are appended (with their path and index) in merge order
         """
-        with open(properties_file_path) as open_yaml:
-            properties_documents = yaml_parser.load_all(open_yaml)
-            properties_path_absolute: str = str(Path(properties_file_path).absolute())
-            document_index: int = 0
-            for properties_object in properties_documents:
-                document_index += 1
-                program_logger.debug(f"Processing document #{document_index} from file "
-                                     f"'{properties_path_absolute}' for include directives...")
-                file_and_document: str = f"{properties_path_absolute}#{document_index}"
-                per_document_includes: {} = file_carry.pop(file_and_document, {})
-                try:
-                    include_list: [] = properties_object.pop(StringCType("$INCLUDE"), [])
-                except TypeError:
-                    program_logger.debug("Could not find the include list, the file probably does not include files.")
-                    include_list = []
-                except AttributeError as e:
-                    if properties_object is None:
-                        raise AssertionError("Empty documents are not allowed.") from e
-                    raise e
-                try:
-                    for include in include_list:
-                        try:
-                            inferred_path: Path = include.path
-                            include_type: str = include.type
-                        except AttributeError:
-                            if type(include) is not FileMarker:
-                                raise AssertionError("Invalid tag inside the include sequence.")
-                            continue
-                        if include_type == "abs":
-                            computed_path: str = str(inferred_path.absolute())
-                            program_logger.debug(f"Found an absolute path include: '{computed_path}'")
-                        elif include_type == "cwd":
-                            working_directory = Path(getcwd())
-                            computed_path: str = str(working_directory.joinpath(inferred_path).absolute())
-                            program_logger.debug(f"Found an include relative to working directory: '{computed_path}'")
-                        elif include_type == "rel":
-                            included_dir = Path(properties_path_absolute).parent
-                            computed_path: str = str(included_dir.joinpath(inferred_path).absolute())
-                            program_logger.debug(f"Found an include relative to the current file: '{computed_path}'")
-                        else:
-                            raise AssertionError("Can not determine the type of file included.")
-                        warned_path: str = f"{computed_path}:warning"
-                        warned_file: bool = per_document_includes.pop(warned_path, True)
-                        included_times: int = per_document_includes.pop(computed_path, 0) + 1
-                        per_document_includes[computed_path]: int = included_times
-                        per_document_includes[warned_path]: bool = warned_file
-                        file_carry[file_and_document] = per_document_includes
-                        if included_times <= include_multiplicity:
-                            program_logger.debug(f"Total number of attempts to include: {included_times}")
-                            program_logger.debug(f"Including file '{computed_path}' from '{file_and_document}'...")
-                            include_recurse(computed_path, file_carry, main_dict)
-                            program_logger.info(f"Included file '{computed_path}' from '{file_and_document}'")
-                        elif warned_file:
+        properties_path_absolute: str = str(Path(properties_file_path).resolve())
+        if properties_path_absolute not in input_files:
+            input_files.append(properties_path_absolute)
+        include_chain.append(properties_path_absolute)
+        properties_documents: [] = load_documents(properties_path_absolute, prefetched, memo)
+        if include_executor is not None:
+            prefetch_includes(properties_documents, properties_path_absolute)
+        for document_index, properties_object in enumerate(properties_documents, start=1):
+            program_logger.debug(f"Processing document #{document_index} from file "
+                                 f"'{properties_path_absolute}' for include directives...")
+            file_and_document: str = f"{properties_path_absolute}#{document_index}"
+            # The includes of a document are counted for the whole run, so they are followed only the first time
+            per_document_includes: {} = include_counts.setdefault((properties_path_absolute, document_index), {})
+            if isinstance(properties_object, dict):
+                # The documents are shared by the run, so the include list is removed from a shallow copy
+                properties_object = dict(properties_object)
+            try:
+                include_list: [] = properties_object.pop(StringCType("$INCLUDE"), [])
+            except TypeError:
+                program_logger.debug("Could not find the include list, the file probably does not include files.")
+                include_list = []
+            except AttributeError as e:
+                if properties_object is None:
+                    raise AssertionError("Empty documents are not allowed.") from e
+                raise e
+            try:
+                for include in include_list:
+                    try:
+                        inferred_path: Path = include.path
+                        include_type: str = include.type
+                    except AttributeError:
+                        if type(include) is not FileMarker:
+                            raise AssertionError("Invalid tag inside the include sequence.")
+                        continue
+                    computed_path: str = include_path(inferred_path, include_type, properties_path_absolute)
+                    include_edge: () = (properties_path_absolute, document_index, computed_path)
+                    if computed_path in include_chain:
+                        if include_edge not in warned_includes:
+                            chain: str = "\n--~\t\t".join(f"'{path}'" for path in
+                                                          include_chain[include_chain.index(computed_path):])
                             program_logger.warning(
-                                    f"--! The file:\n"
-                                    f"--~\t\t'{properties_path_absolute}',\n"
-                                    f"--! Inside the document: #{document_index}; included the file:\n"
+                                    f"--! Found an include cycle, the file:\n"
+                                    f"--~\t\t{chain},\n"
+                                    f"--! Inside the document: #{document_index}; includes the file:\n"
                                     f"--~\t\t'{computed_path}',\n"
-                                    f"--! More than {include_multiplicity} times. "
-                                    "Subsequent includes will be ignored.")
-                            program_logger.debug(f"Will warn about include multiplicity?: {warned_file}")
-                            per_document_includes[warned_path] = False
-                        file_carry[file_and_document] = per_document_includes
-                except TypeError as e:
-                    if include_list is None:
-                        raise AssertionError("Empty include lists are not allowed.") from e
-                    raise e
-                # Note that merging lists is not part of the YAML specification, so if a list is found in two files or
-                # documents, the latest one found will replace the previous definitions.
-                yaml_merger.merge(main_dict, properties_object)
-                program_logger.info(f"Merged file '{properties_path_absolute}#{document_index}' into the dictionary")
-        yaml_merger.merge(main_dict, main_dict)
-        return main_dict
-
-    def flatten(reducible: {}, prefix: str = ""):
+                                    "--! Which is already being included. The include will be ignored.")
+                            warned_includes.add(include_edge)
+                        continue
+                    included_times: int = per_document_includes.get(computed_path, 0) + 1
+                    per_document_includes[computed_path] = included_times
+                    if included_times <= include_multiplicity:
+                        program_logger.debug(f"Total number of attempts to include: {included_times}")
+                        program_logger.debug(f"Including file '{computed_path}' from '{file_and_document}'...")
+                        include_recurse(computed_path, merge_order)
+                        program_logger.info(f"Included file '{computed_path}' from '{file_and_document}'")
+                    elif include_edge not in warned_includes:
+                        program_logger.warning(
+                                f"--! The file:\n"
+                                f"--~\t\t'{properties_path_absolute}',\n"
+                                f"--! Inside the document: #{document_index}; included the file:\n"
+                                f"--~\t\t'{computed_path}',\n"
+                                f"--! More than {include_multiplicity} times. "
+                                "Subsequent includes will be ignored.")
+                        warned_includes.add(include_edge)
+            except TypeError as e:
+                if include_list is None:
+                    raise AssertionError("Empty include lists are not allowed.") from e
+                raise e
+            merge_order.append((file_and_document, properties_object))
+        include_chain.pop()
+
+    def merge_documents(merge_order: []) -> {}:
         """
-        The recursive call to flatten the dictionary, which accepts a Python dictionary as input and deeply flattens it
-        by converting it to a composed string with the properties separated by a string separator.
+        Merge the documents of the included files, in the order computed by `include_recurse()`.
 
-        :param reducible: a dictionary to add the flatten objects
-        :param prefix: a prefix to prepend to properties
+        :param merge_order: a list with the documents (with their path and index) in merge order
 
-        :return: the flatten Python dictionary
+        :return: the computed dictionary which is the combination of the documents
         """
-        fixed_key: str = prefix[:-len(flatten_separator)]
-        printable_fixed_key: str = fixed_key.replace(flatten_separator, print_separator)
-        if type(reducible) is dict:
-            for key in reducible:
-                flatten(reducible[key], f"{prefix}{key}{flatten_separator}")
-        elif type(reducible) is list:
-            indexes_mapping: {} = {}
-            for value in reducible:
-                if type(value) is FileMarkedValue:
-                    value = value.contents
-                else:
-                    if isinstance(value, YamlInclude):
-                        raise AssertionError("Found include tags outside of the include sequence.\n\t"
-                                             f"Offending key path: '{printable_fixed_key}'")
-                    raise AssertionError("Internal: Invalid encapsulation inside the YAML sequence.")
-                if type(value) is dict:
-                    computed_prefix = f"{prefix}{flatten_separator}{next(iter(value))}"
-                else:
-                    computed_prefix = prefix
-                index = indexes_mapping.pop(computed_prefix, 0)
-                max_36 = "3W5E11264SGSF"
-                max_index = int(max_36, 36)
-                if index > max_index:
-                    raise AssertionError(f"Maximum elements for table reached: {max_index + 1}.\n\t"
-                                         f"Offending key path: '{printable_fixed_key}'")
-                printable_index = base36.dumps(index).upper().rjust(len(max_36), "0")
-                flatten(value, prefix + printable_index + flatten_separator)
-                indexes_mapping[computed_prefix] = index + 1
-        else:
-            try:
-                fixed_key.encode("ASCII")
-            except UnicodeEncodeError as e:
-                raise AssertionError(f"Can not interpret key '{printable_fixed_key}' as an ASCII string.") from e
-            if fixed_key not in result_dictionary:
-                result_dictionary[fixed_key] = reducible
-            else:
-                raise AssertionError("Unrecoverable collision detected while building the key-value mappings.\n\t"
-                                     f"Offending key path: '{printable_fixed_key}'.")
+        layers: YamlLayers = YamlLayers()
+        for file_and_document, properties_object in merge_order:
+            # Note that merging lists is not part of the YAML specification, so if a list is found in two files or
+            # documents, the items of the latest one found are appended to the previous definitions.
+            layers.add(properties_object)
+            program_logger.info(f"Merged file '{file_and_document}' into the dictionary")
+        # The layers are resolved in a single traversal, which also encapsulates the sequences of a single document
+        return layers.resolve()
 
-    reduced_dictionary = include_recurse(input_properties_file.name, {}, {})
-    flatten(reduced_dictionary)
+    input_files.clear()
+    documents_order: [] = []
+    if include_jobs:
+        with ProcessPoolExecutor(max_workers=include_jobs, initializer=initialize_include_worker,
+                                 initargs=(yaml_loader, cache_directory)) as include_executor:
+            include_recurse(input_properties_file.name, documents_order)
+    else:
+        include_recurse(input_properties_file.name, documents_order)
+    reduced_dictionary = merge_documents(documents_order)
+    for key, value in flatten_items(reduced_dictionary):
+        if key in result_dictionary:
+            raise AssertionError("Unrecoverable collision detected while building the key-value mappings.\n\t"
+                                 f"Offending key path: '{key.replace(flatten_separator, print_separator)}'.")
+        result_dictionary[key] = value
     result_dictionary[testing_property_key] = testing_property_value
     return result_dictionary
 
 
+def flatten_items(reducible: {}):
+    """
+    Flatten a merged dictionary, by yielding its properties in order: the keys are composed of the properties of the
+    path, separated by the flatten separator, and the items of the sequences are numbered (the items which are
+    mappings are numbered by their first key). The traversal is iterative, and the path is kept as a tuple of its
+    parts, which are only joined once for every property.
+
+    The mappings and sequences which are reached from more than one path (the YAML aliases) are flattened once, into
+    keys relative to the subtree, which are then prefixed with every path that reaches them.
+
+    :param reducible: the merged dictionary
+
+    :return: a generator of tuples with the key and the value of every property
+    """
+    yield from flatten_subtree((), reducible, shared_nodes(reducible), {})
+
+
+def flatten_subtree(root_parts: (), root, shared: set, subtrees: {}):
+    """
+    Flatten a subtree of a merged dictionary, for `flatten_items()`. The shared subtrees that are found inside it are
+    flattened the first time they are reached (so their errors report that path), and they are stored in `subtrees`.
+
+    :param root_parts: the parts of the path to the subtree
+    :param root: the subtree
+    :param shared: the identities of the subtrees which are reached from more than one path
+    :param subtrees: a dictionary with the relative keys and the values of the flattened shared subtrees (or None while
+                     they are being flattened), by their identity
+
+    :return: a generator of tuples with the key and the value of every property
+    """
+    stack: [] = [iter([(root_parts, root)])]
+    while stack:
+        for parts, value in stack[-1]:
+            if parts is not root_parts and id(value) in shared:
+                key: str = flatten_key(parts)
+                relative_items: [] = subtrees.get(id(value), ())
+                if relative_items is None:
+                    raise AssertionError("Recursive aliases are not allowed.\n\t"
+                                         f"Offending key path: '{key.replace(flatten_separator, print_separator)}'")
+                if id(value) not in subtrees:
+                    subtrees[id(value)] = None
+                    start: int = len(key) + len(flatten_separator)
+                    relative_items = [(subtree_key[start:], subtree_value) for subtree_key, subtree_value in
+                                      flatten_subtree(parts, value, shared, subtrees)]
+                    subtrees[id(value)] = relative_items
+                for relative_key, relative_value in relative_items:
+                    yield key + flatten_separator + relative_key, relative_value
+                continue
+            if type(value) is dict:
+                stack.append(flatten_mapping(parts, value))
+                break
+            if type(value) is list:
+                stack.append(flatten_sequence(parts, value))
+                break
+            yield flatten_key(parts), value
+        else:
+            stack.pop()
+
+
+def flatten_key(parts: ()) -> str:
+    """
+    Join the parts of a path into a key, for `flatten_items()`.
+
+    :param parts: the parts of the path
+
+    :return: the key
+    """
+    key: str = flatten_separator.join(parts)
+    try:
+        key.encode("ASCII")
+    except UnicodeEncodeError as e:
+        raise AssertionError(f"Can not interpret key '{key.replace(flatten_separator, print_separator)}' "
+                             "as an ASCII string.") from e
+    return key
+
+
+def flatten_mapping(parts: (), mapping: {}):
+    """
+    Extend the path with the keys of a merged mapping, for `flatten_items()`.
+
+    :param parts: the parts of the path to the mapping
+    :param mapping: the merged mapping
+
+    :return: a generator of tuples with the parts of the path and the value of every key
+    """
+    for key, value in mapping.items():
+        yield (*parts, str(key)), value
+
+
+def flatten_sequence(parts: (), sequence: []):
+    """
+    Number the items of a merged sequence, for `flatten_items()`.
+
+    :param parts: the parts of the path to the sequence
+    :param sequence: the merged sequence, whose items are marked with their file
+
+    :return: a generator of tuples with the parts of the path and the value of every item
+    """
+    printable_key: str = flatten_separator.join(parts).replace(flatten_separator, print_separator)
+    indexes_mapping: {} = {}
+    max_36 = "3W5E11264SGSF"
+    max_index = int(max_36, 36)
+    for value in sequence:
+        if type(value) is FileMarkedValue:
+            value = value.contents
+        else:
+            if isinstance(value, YamlInclude):
+                raise AssertionError("Found include tags outside of the include sequence.\n\t"
+                                     f"Offending key path: '{printable_key}'")
+            raise AssertionError("Internal: Invalid encapsulation inside the YAML sequence.")
+        if type(value) is dict:
+            if not value:
+                raise AssertionError(f"Empty mappings are not allowed inside sequences.\n\t"
+                                     f"Offending key path: '{printable_key}'")
+            # The mappings are numbered by their first key, and the other values share a single numbering
+            numbering: str = str(next(iter(value)))
+        else:
+            numbering: str = None
+        index = indexes_mapping.get(numbering, 0)
+        if index > max_index:
+            raise AssertionError(f"Maximum elements for table reached: {max_index + 1}.\n\t"
+                                 f"Offending key path: '{printable_key}'")
+        indexes_mapping[numbering] = index + 1
+        yield (*parts, base36.dumps(index).upper().rjust(len(max_36), "0")), value
+
+
+def shared_nodes(reducible: {}) -> set:
+    """
+    Find the mappings and sequences of a merged dictionary which are reached from more than one path, as the YAML
+    aliases share the node of their anchor. Every subtree is walked once, even if it is reached again.
+
+    :param reducible: the merged dictionary
+
+    :return: a set with the identities of the shared subtrees
+    """
+    seen: set = {id(reducible)}
+    shared: set = set()
+    pending: [] = [reducible]
+    while pending:
+        node = pending.pop()
+        for value in node.values() if type(node) is dict else node:
+            if type(value) is FileMarkedValue:
+                value = value.contents
+            if type(value) is dict or type(value) is list:
+                if id(value) in seen:
+                    shared.add(id(value))
+                else:
+                    seen.add(id(value))
+                    pending.append(value)
+    return shared
+
+
+def ir_value(key: str, value):
+    """
+    Encode the value of a property for the IR. The values of the tags are stored by the name of their class and their
+    reduced value (and the bounds of the ranges), and the untagged scalars are stored as JSON values.
+
+    :param key: the key of the property
+    :param value: the value of the property
+
+    :return: the encoded value
+    """
+    if isinstance(value, Range):
+        return {"class": type(value).__name__, "value": value.reduced_value,
+                "range": [ir_value(key, bound) for bound in (value.start, value.end, value.range_type,
+                                                             value.description)]}
+    if isinstance(value, CType):
+        return {"class": type(value).__name__, "value": value.reduced_value}
+    if value is None or type(value) in (bool, int, float):
+        return {"json": value}
+    raise AssertionError(f"The value of the property can not be stored in the IR: '{value}'.\n\t"
+                         f"Offending key path: '{key.replace(flatten_separator, print_separator)}'")
+
+
+def ir_property_value(encoded: {}, classes: {}):
+    """
+    Decode the value of a property from the IR.
+
+    :param encoded: the encoded value
+    :param classes: the classes of the tags, by their name
+
+    :return: the value of the property
+    """
+    if "json" in encoded:
+        return encoded["json"]
+    value_class = classes[encoded["class"]]
+    if "range" in encoded:
+        return value_class(encoded["value"], *(ir_property_value(bound, classes) for bound in encoded["range"]))
+    return value_class(encoded["value"])
+
+
+def write_ir(path: str, properties: {}):
+    """
+    Write the flattened properties in the IR file: a header line with the version of the schema and the digests of
+    the YAML files, and a line for every property with its key and its encoded value.
+
+    :param path: the path to the IR file
+    :param properties: the flattened properties
+    """
+    inputs: {} = {}
+    for input_file in input_files:
+        inputs[input_file] = hashlib.sha256(Path(input_file).read_bytes()).hexdigest()
+    lines: [] = [json.dumps({"schema": ir_schema_version, "inputs": inputs})]
+    lines.extend(json.dumps([key, ir_value(key, value)]) for key, value in properties.items())
+    write_output(path, "\n".join(lines) + "\n")
+
+
+def load_ir(path: str) -> {}:
+    """
+    Read the flattened properties from an IR file. The IR file becomes the only input file of the generation, and a
+    warning is reported for every YAML file that changed since the IR was written.
+
+    :param path: the path to the IR file
+
+    :return: the flattened properties
+    """
+    classes: {} = {}
+    pending: [] = [CType]
+    while pending:
+        value_class = pending.pop()
+        classes[value_class.__name__] = value_class
+        pending.extend(value_class.__subclasses__())
+    properties: {} = {}
+    try:
+        with open(path) as ir_file:
+            header: {} = json.loads(ir_file.readline())
+            if header.get("schema") != ir_schema_version:
+                raise AssertionError(f"The IR file '{path}' has the schema version {header.get('schema')}, but "
+                                     f"version {ir_schema_version} is required.")
+            inputs: [] = list(header["inputs"].items())
+            for line in ir_file:
+                key, encoded = json.loads(line)
+                properties[key] = ir_property_value(encoded, classes)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise AssertionError(f"The IR file '{path}' is malformed.") from e
+    for input_file, input_digest in inputs:
+        try:
+            if hashlib.sha256(Path(input_file).read_bytes()).hexdigest() == input_digest:
+                continue
+        except OSError:
+            pass
+        program_logger.warning(f"The file '{input_file}' changed since the IR file '{path}' was written.")
+    input_files[:] = [str(Path(path).absolute())]
+    return properties
+
+
 def mask(value: int) -> int:
     """
     Mask a value to a given a number of relevant bits.
@@ -320,94 +887,129 @@ def mask(value: int) -> int:
     return result
 
 
-def truncate_mask(positions: int) -> int:
+def c_string_bytes(string: str) -> bytes:
+    """
+    Compute the bytes that the C compiler will store for a flatten key. The flatten separator is an escape sequence in
+    the C source code, so it must have to be replaced by the actual byte before hashing the key, otherwise the hash
+    computed here will not match the hash computed by the C program.
+
+    :param string: the flatten key, it must have to be an ASCII string
+
+    :return: the bytes of the key as seen by the C program
     """
-    Generate a mask that can be used to truncate numbers to a certain number of relevant bits.
+    return string.replace(flatten_separator, flatten_separator_byte).encode("ASCII")
 
-    :param positions: the bits that are relevant
 
-    :return: a mask that if it's and-ed will truncate the number
+def calculate_hash(string: str) -> int:
     """
-    truncate_masked: int = 0
-    for i in range(positions):
-        truncate_masked = truncate_masked << 1 | 1
-    return truncate_masked
+    Calculate the `Hash1` hash of a given input string, with the selected hash family.
 
+    :param string: the string which is the input, it must have to be an ASCII string
 
-def rotate_left(value: int, positions: int) -> int:
+    :return: the hash value for the input string
     """
-    Rotate a number to the left by considering only a number of relevant bits.
+    return hash_family.hash1(c_string_bytes(string), bits, pattern_64bit)
 
-    :param value: the number to rotate
-    :param positions: the number of relevant bits
 
-    :return: the rotated and masked number
+def calculate_hash2(string: str) -> int:
     """
-    truncate_masked: int = truncate_mask(positions)
-    left_shifted: int = value << positions
-    left_shifted &= ~truncate_masked
-    right_shifted: int = value >> (bits - positions)
-    right_shifted &= truncate_masked
-    rotated: int = right_shifted | left_shifted
-    rotated = mask(rotated)
-    return rotated
+    Calculate the `Hash2` hash of a given input string, with the selected hash family.
 
+    :param string: the string which is the input, it must have to be an ASCII string
 
-def rotate_right(value: int, positions: int) -> int:
+    :return: the hash value for the input string
     """
-    Rotate a number to the right by considering only a number of relevant bits.
+    return hash_family.hash2(c_string_bytes(string), bits, pattern_64bit)
 
-    :param value: the number to rotate
-    :param positions: the number of relevant bits
 
-    :return: the rotated and masked number
+def reduce_hash(value: int, length: int) -> int:
     """
-    truncate_masked: int = truncate_mask(bits - positions)
-    right_shifted: int = value >> positions
-    right_shifted &= truncate_masked
-    left_shifted: int = value << (bits - positions)
-    left_shifted &= ~truncate_masked
-    rotated: int = right_shifted | left_shifted
-    rotated = mask(rotated)
-    return rotated
+    Reduce a hash value to an index inside a table of the given length. When the table length is a power of 2, the
+    hash is already truncated to the number of bits and it's used as it is. Otherwise, the hash is mapped to the range
+    of the table by a multiplication and a shift (the same operation performed by the C program).
 
+    :param value: the hash value, truncated to the number of bits
+    :param length: the length of the table
 
-def calculate_hash(string: str) -> int:
+    :return: the index inside the table
+    """
+    if sizing_mode == "multiply-shift":
+        return (value * length) >> bits
+    return value
+
+
+def calculate_key_hash(string: str) -> int:
     """
-    Calculate the `Hash1` hash of a given input string.
+    Calculate the 32-bit multiply-xor hash of a given input string, which is the source of the fingerprint and of the
+    filter probes. It's computed by the C program in the same pass that computes the length of the string.
 
     :param string: the string which is the input, it must have to be an ASCII string
 
-    :return: the hash value for the input string
+    :return: the 32-bit hash of the input string
     """
-    value: int = rotate_left(pattern_64bit, 1)
-    ascii_bytes = string.encode("ASCII")
-    for character in ascii_bytes:
-        value = rotate_left(value, 1)
-        value ^= ~character * ~len(string)
-        value = rotate_left(value, 1)
-        value ^= character * ~len(string)
-    value = mask(value)
+    value: int = fingerprint_basis
+    for character in c_string_bytes(string):
+        value = ((value ^ character) * fingerprint_prime) & 0xFFFFFFFF
     return value
 
 
-def calculate_hash2(string: str) -> int:
+def calculate_fingerprint(string: str) -> int:
     """
-    Calculate the `Hash2` hash of a given input string.
+    Calculate the fingerprint of a given input string. The fingerprint is the 32-bit key hash of the string, folded to
+    the number of bits of the fingerprint.
 
     :param string: the string which is the input, it must have to be an ASCII string
 
-    :return: the hash value for the input string
+    :return: the fingerprint of the input string
     """
-    value: int = rotate_right(pattern_64bit, 1)
-    ascii_bytes = string.encode("ASCII")
-    for character in ascii_bytes:
-        value = rotate_right(value, 1)
-        value ^= character * ~len(string)
-        value = rotate_right(value, 1)
-        value ^= ~character * len(string)
-    value = mask(value)
-    return value
+    value: int = calculate_key_hash(string)
+    value ^= value >> 16
+    value ^= value >> 8
+    return value & truncate_mask(fingerprint_bits)
+
+
+def table_lengths(properties_count: int) -> range:
+    """
+    Compute the table lengths that will be tried, in order, to store the properties. The 'power-of-two' sizing mode
+    only tries a table of 2^bits entries. The 'multiply-shift' sizing mode starts with the smallest table that holds
+    the properties at the given load factor, and grows one entry at a time up to 2^bits entries.
+
+    :param properties_count: the number of properties to store in the table
+
+    :return: the range of table lengths
+    """
+    maximum_length: int = mask(max_64bit) + 1
+    if sizing_mode == "multiply-shift":
+        minimum_length: int = max(ceil(properties_count / load_factor), properties_count, 1)
+        if minimum_length > maximum_length:
+            program_logger.error(f"--= A table for {properties_count} properties at a load factor of {load_factor} "
+                                 f"requires {minimum_length} entries, but {bits} bits only address {maximum_length}")
+            raise SystemExit("Not enough bits to address the table.")
+        return range(minimum_length, maximum_length + 1)
+    return range(maximum_length, maximum_length + 1)
+
+
+def foresee_range(key_hash: int, direction: int, foresee: int, length: int) -> range:
+    """
+    Compute the indexes of the linear lookup around a given hash, in the order in which they are tried. The lookup
+    around `Hash1` goes downwards and the lookup around `Hash2` goes upwards, and both are clamped to the table.
+
+    :param key_hash: the calculated hash
+    :param direction: the direction to lookup around first
+    :param foresee: the number of indexes to lookup at each side of the hash
+    :param length: the length of the table
+
+    :return: the range of the indexes to try, including the index of the hash itself
+    """
+    max_index: int = length - 1
+    lowermost: int = key_hash - foresee
+    lowermost = 0 if (lowermost <= 0 or lowermost > max_index) else lowermost
+    uppermost: int = key_hash + foresee
+    uppermost = max_index if (uppermost < 0 or uppermost >= max_index) else uppermost
+    step: int = 1 if direction < 0 else -1
+    start: int = lowermost if step == 1 else uppermost
+    end: int = (uppermost if step == 1 else lowermost) + step
+    return range(start, end, step)
 
 
 def hash_foresee(key_hash: int, direction: int, name: str, hashmap: [], key: str, value: str) -> bool:
@@ -425,14 +1027,7 @@ def hash_foresee(key_hash: int, direction: int, name: str, hashmap: [], key: str
     """
     program_logger.info("Linear collision solving algorithm started...")
     collision_avoided: bool = False
-    lowermost: int = key_hash - collision_foresee
-    lowermost = 0 if (lowermost <= 0 or lowermost > mask(max_64bit)) else lowermost
-    uppermost: int = key_hash + collision_foresee
-    uppermost = mask(max_64bit) if (uppermost < 0 or uppermost >= mask(max_64bit)) else uppermost
-    direction: int = 1 if direction < 0 else -1
-    start: int = lowermost if direction == 1 else uppermost
-    end: int = (uppermost if direction == 1 else lowermost) + direction
-    iter_range = range(start, end, direction)
+    iter_range: range = foresee_range(key_hash, direction, collision_foresee, len(hashmap))
     program_logger.debug(f"Linear searching range: {list(iter_range)}")
     index: int
     for index in iter_range:
@@ -452,63 +1047,490 @@ def hash_foresee(key_hash: int, direction: int, name: str, hashmap: [], key: str
     return collision_avoided
 
 
-def create_hashmap(args: Namespace):
+def insert_property(hashmap: [], key: str, value) -> bool:
+    """
+    Insert a single property inside the hashmap, by trying the `Hash1` index, the linear lookup around it, the `Hash2`
+    index and the linear lookup around it, in that order.
+
+    :param hashmap: the hashmap where the key and value will be inserted
+    :param key: the key to the hashmap
+    :param value: the value corresponding to the key
+
+    :return: true if the property was inserted, false if the collision could not be resolved
+    """
+    printable_key: str = key.replace(flatten_separator, print_separator)
+    key_hash: int = reduce_hash(calculate_hash(key), len(hashmap))
+    key_hash2: int = reduce_hash(calculate_hash2(key), len(hashmap))
+    program_logger.info(f"Key: \"{printable_key}\", Value: \"{value}\"")
+    program_logger.info(f"Hash1: {hex(key_hash)}, Hash2: {hex(key_hash2)}")
+    in_map: () = hashmap[key_hash]
+    if in_map is None:
+        hashmap[key_hash] = (key, value)
+        program_logger.info(f"Key not found in the map, key added at index {key_hash}!")
+        return True
+    program_logger.warning(f"--! Index {hex(key_hash)} is currently used by '{in_map}'"
+                           .replace("\\" + flatten_separator, print_separator))
+    if hash_foresee(key_hash, 1, "Hash1", hashmap, key, value):
+        return True
+    in_map = hashmap[key_hash2]
+    program_logger.warning(f"--! Trying to use the alternative hash {hex(key_hash2)},\n\t"
+                           f"for hash{hex(key_hash)} (key: '{printable_key}')")
+    if in_map is None:
+        hashmap[key_hash2] = (key, value)
+        program_logger.warning(f"--+ Collision resolved by using the alternative hash {hex(key_hash2)}")
+        return True
+    program_logger.warning(f"--! Index {hex(key_hash2)} is currently used by '{in_map}'".
+                           replace("\\" + flatten_separator, print_separator))
+    if hash_foresee(key_hash2, -1, "Hash2", hashmap, key, value):
+        return True
+    program_logger.warning("--- Failed to solve the collision!")
+    return False
+
+
+def load_profile(profile: TextIOWrapper) -> {}:
+    """
+    Load a key-frequency profile. Every line of the profile holds the number of lookups of a key and the printable key
+    itself (using the print separator), separated by whitespace. Empty lines and lines starting with '#' are ignored.
+
+    :param profile: the profile file
+
+    :return: a dictionary whose keys are the flattened keys and whose values are the number of lookups
+    """
+    counts: {} = {}
+    with profile as profile_file:
+        for line_number, line in enumerate(profile_file, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields: [] = line.split(maxsplit=1)
+            if len(fields) != 2 or not fields[0].isdigit():
+                raise AssertionError(f"Malformed line in the profile '{profile_file.name}:{line_number}': '{line}'")
+            key: str = fields[1].replace(print_separator, flatten_separator)
+            counts[key] = counts.get(key, 0) + int(fields[0])
+    return counts
+
+
+def profiled_order(properties: {}, counts: {}) -> []:
+    """
+    Order the properties for insertion, the most frequent first. The order is stable, so the properties with the same
+    count (or without a count) keep the flatten order.
+
+    :param properties: the flattened properties
+    :param counts: the key-frequency profile
+
+    :return: a list with the key-value pairs of the properties, in insertion order
+    """
+    for key in counts.keys() - properties.keys():
+        program_logger.warning(f"The profiled key '{key.replace(flatten_separator, print_separator)}' "
+                               "is not a property")
+    return sorted(properties.items(), key=lambda item: counts.get(item[0], 0), reverse=True)
+
+
+def load_properties(args: Namespace) -> {}:
+    """
+    Load the flattened properties of the generation, from the IR file or from the YAML file.
+
+    :param args: the program's parsed arguments
+
+    :return: the flattened properties
+    """
+    return load_ir(args.from_ir) if args.from_ir else flatten_dictionary(args.yaml_file)
+
+
+def create_hashmap(args: Namespace, flatten_properties: {}):
     """
     Create the hashmap inside a Python array.
 
     :param args: the program's parsed arguments
+    :param flatten_properties: the flatten properties, from `load_properties()`
 
     :return: the generated hashmap
     """
-    flatten_properties: {} = flatten_dictionary(args.yaml_file)
-    hashmap: [] = [None] * (mask(max_64bit) + 1)
-    for key, value in flatten_properties.items():
-        printable_key: str = key.replace(flatten_separator, print_separator)
-        key_hash: int = calculate_hash(key)
-        key_hash2: int = calculate_hash2(key)
-        program_logger.info(f"Key: \"{printable_key}\", Value: \"{value}\"")
-        program_logger.info(f"Hash1: {hex(key_hash)}, Hash2: {hex(key_hash2)}")
-        in_map: () = hashmap[key_hash]
-        if in_map is None:
-            hashmap[key_hash] = (key, value)
-            program_logger.info(f"Key not found in the map, key added at index {key_hash}!")
-            continue
+    ordered_properties: [] = list(flatten_properties.items())
+    if args.profile:
+        ordered_properties = profiled_order(flatten_properties, load_profile(args.profile))
+    if backend == "decision-tree":
+        program_logger.info(f"Stored {len(flatten_properties)} properties for the decision tree")
+        return ordered_properties
+    hashmap: [] = []
+    key: str = ""
+    for length in table_lengths(len(flatten_properties)):
+        hashmap = [None] * length
+        for key, value in ordered_properties:
+            if not insert_property(hashmap, key, value):
+                program_logger.info(f"Can not store the properties in a table of length {length}")
+                break
         else:
-            in_use: () = hashmap[key_hash]
-            program_logger.warning(f"--! Index {hex(key_hash)} is currently used by '{in_use}'"
-                                   .replace("\\" + flatten_separator, print_separator))
-            collision_avoided = hash_foresee(key_hash, 1, "Hash1", hashmap, key, value)
-        if collision_avoided:
+            program_logger.info(f"Stored {len(flatten_properties)} properties in a table of length {length}")
+            return hashmap
+    printable_key: str = key.replace(flatten_separator, print_separator)
+    program_logger.error("--= Error: Unrecoverable collision detected...")
+    program_logger.error(f"--= Length of the map: '{len(hashmap)}'")
+    key_hash: int = reduce_hash(calculate_hash(key), len(hashmap))
+    key_hash2: int = reduce_hash(calculate_hash2(key), len(hashmap))
+    program_logger.error(f"--= Key to be inserted: '{printable_key}'")
+    program_logger.error(f"--= Key with the same hash: '{hashmap[key_hash]}'")
+    program_logger.error(f"--= Index that collided: '{hex(key_hash)}'")
+    program_logger.error(f"--= Alternative index that collided: '{hex(key_hash2)}'")
+    raise SystemExit("Unresolvable hash collision detected.")
+
+
+def packed_value(key: str, value) -> str:
+    """
+    Get the packed value of a property, as it will be written in the C source code.
+
+    :param key: the key of the property
+    :param value: the value of the property
+
+    :return: the packed value from the tag
+    """
+    printable_key: str = key.replace(flatten_separator, print_separator)
+    try:
+        packed: str = value.reduced_value
+        program_logger.info(f"Found packed value from tag for \"{printable_key}\": {packed}")
+        return packed
+    except AttributeError:
+        raise AssertionError(
+                "Due to the nature of the C language, all values must have to be tagged with their correct type, "
+                "including all integers. Only strings, mappings and sequences can be untagged.\n\t"
+                f"Offending key path: '{printable_key}'")
+
+
+def index_type(entries: int) -> (str, str):
+    """
+    Select the smallest unsigned C type that can index the given number of entries, while keeping its maximum value as
+    a marker for empty slots.
+
+    :param entries: the number of entries to index
+
+    :return: the name of the C type and the name of the constant that marks an empty slot
+    """
+    if entries < 0xFF:
+        return "uint8_t", "UINT8_MAX"
+    if entries < 0xFFFF:
+        return "uint16_t", "UINT16_MAX"
+    raise AssertionError(f"Too many properties for an indexed table: {entries}.")
+
+
+def length_type(longest: int) -> str:
+    """
+    Select the smallest unsigned C type that can hold the length of the longest key.
+
+    :param longest: the length of the longest key
+
+    :return: the name of the C type
+    """
+    if longest <= 0xFF:
+        return "uint8_t"
+    if longest <= 0xFFFF:
+        return "uint16_t"
+    return "size_t"
+
+
+def neighborhood_type(window: int) -> str:
+    """
+    Select the smallest unsigned C type that can hold a neighborhood bitmap of the given number of slots.
+
+    :param window: the number of slots of the neighborhood, which is 2 * foresee + 1
+
+    :return: the name of the C type
+    """
+    for width in (8, 16, 32, 64):
+        if window <= width:
+            return f"uint{width}_t"
+    raise AssertionError(f"The foresee is too big to store the neighborhoods as bitmaps: {collision_foresee}.")
+
+
+def compute_neighborhoods(hashmap: []) -> []:
+    """
+    Compute the Hopscotch neighborhood bitmap of every slot of the hashmap. The bit `i` of the bitmap of a home slot is
+    set when the slot at `home - foresee + i` holds a key whose `Hash1` or `Hash2` index is the home slot, so a lookup
+    only needs to compare the keys that can actually be there, and a miss is resolved by reading a zero bitmap.
+
+    :param hashmap: the hashmap
+
+    :return: a list with the bitmap of every slot
+    """
+    neighborhoods: [] = [0] * len(hashmap)
+    for index, value_at_index in enumerate(hashmap):
+        if value_at_index is None:
             continue
-        else:
-            in_map = hashmap[key_hash2]
-            program_logger.warning(f"--! Trying to use the alternative hash {hex(key_hash2)},\n\t"
-                                   f"for hash{hex(key_hash)} (key: '{printable_key}')")
-            if in_map is None:
-                hashmap[key_hash2] = (key, value)
-                program_logger.warning(f"--+ Collision resolved by using the alternative hash {hex(key_hash2)}")
-                continue
-            else:
-                in_use: {} = hashmap[key_hash2]
-                program_logger.warning(f"--! Index {hex(key_hash2)} is currently used by '{in_use}'".
-                                       replace("\\" + flatten_separator, print_separator))
-                collision_avoided = False
-        if collision_avoided:
+        key: str = value_at_index[0]
+        for home in {reduce_hash(calculate_hash(key), len(hashmap)), reduce_hash(calculate_hash2(key), len(hashmap))}:
+            if abs(index - home) <= collision_foresee:
+                neighborhoods[home] |= 1 << (index - home + collision_foresee)
+    return neighborhoods
+
+
+def filter_dimensions(keys_count: int) -> (int, int):
+    """
+    Compute the number of bits and the number of hashes of a Bloom filter that holds the given number of keys at the
+    configured false positive rate. The number of bits is rounded up to whole bytes.
+
+    :param keys_count: the number of keys that will be added to the filter
+
+    :return: a tuple with the number of bits and the number of hashes of the filter
+    """
+    filter_bits: int = ceil(-keys_count * log(filter_rate) / (log(2) ** 2))
+    filter_bits = max(8, ceil(filter_bits / 8) * 8)
+    filter_hashes: int = max(1, round(filter_bits / keys_count * log(2)))
+    return filter_bits, filter_hashes
+
+
+def filter_probes(string: str, filter_bits: int, filter_hashes: int) -> []:
+    """
+    Compute the bits of the Bloom filter that correspond to a given input string. The probes are derived from the key
+    hash by double hashing: the step is the key hash rotated by 16 bits (forced to be odd), added with 32-bit wrap.
+
+    :param string: the string which is the input, it must have to be an ASCII string
+    :param filter_bits: the number of bits of the filter
+    :param filter_hashes: the number of probes of every key
+
+    :return: a list with the bits of the filter for the input string
+    """
+    key_hash: int = calculate_key_hash(string)
+    step: int = ((key_hash >> 16) | (key_hash << 16)) & 0xFFFFFFFF | 1
+    return [((key_hash + probe * step) & 0xFFFFFFFF) % filter_bits for probe in range(filter_hashes)]
+
+
+def compute_filter(hashmap: []) -> (int, int, []):
+    """
+    Compute the Bloom filter of all the keys of the hashmap.
+
+    :param hashmap: the hashmap
+
+    :return: a tuple with the number of bits, the number of hashes and the bytes of the filter
+    """
+    keys: [] = [value_at_index[0] for value_at_index in hashmap if value_at_index is not None]
+    filter_bits, filter_hashes = filter_dimensions(len(keys))
+    filter_bytes: [] = [0] * (filter_bits // 8)
+    for key in keys:
+        for bit in filter_probes(key, filter_bits, filter_hashes):
+            filter_bytes[bit // 8] |= 1 << (bit % 8)
+    expected_rate: float = (1 - exp(-filter_hashes * len(keys) / filter_bits)) ** filter_hashes
+    program_logger.debug(f"Bloom filter of {filter_bits} bits and {filter_hashes} hashes, for {len(keys)} keys "
+                         f"(expected false positive rate: {expected_rate:.4f})")
+    return filter_bits, filter_hashes, filter_bytes
+
+
+def collect_ranges(hashmap: []) -> []:
+    """
+    Collect the ranges of the hashmap whose bounds are pointers, sorted by their start address, to build the interval
+    index of the address ranges. Overlapping ranges are an error, since an address must belong to a single range.
+
+    :param hashmap: the hashmap
+
+    :return: a sorted list of tuples with the start, the end, the key and the value of every range
+    """
+    ranges: [] = []
+    for value_at_index in hashmap:
+        if value_at_index is None:
             continue
-        else:
-            collision_avoided = hash_foresee(key_hash2, -1, "Hash2", hashmap, key, value)
-        if collision_avoided:
+        key, value = value_at_index
+        start = getattr(value, "start", None)
+        if getattr(start, "yaml_tag", None) != u'!pointer' or getattr(value.end, "yaml_tag", None) != u'!pointer':
             continue
-        else:
-            program_logger.warning("--- Failed to solve the collision!")
-            program_logger.error("--= Error: Unrecoverable collision detected...")
-            program_logger.error(f"--= Length of the map: '{len(hashmap)}'")
-            program_logger.error(f"--= Key to be inserted: '{printable_key}'")
-            program_logger.error(f"--= Key with the same hash: '{hashmap[key_hash]}'")
-            program_logger.error(f"--= Index that collided: '{hex(key_hash)}'")
-            program_logger.error(f"--= Alternative index that collided: '{hex(key_hash2)}'")
-            raise SystemExit("Unresolvable hash collision detected.")
-    return hashmap
+        printable_key: str = key.replace(flatten_separator, print_separator)
+        if start.integer > value.end.integer:
+            raise AssertionError(f"The start of the range is greater than its end.\n\tOffending key path: "
+                                 f"'{printable_key}'")
+        ranges.append((start.integer, value.end.integer, key, value))
+    ranges.sort(key=lambda address_range: address_range[0])
+    for previous, current in zip(ranges, ranges[1:]):
+        if current[0] <= previous[1]:
+            raise AssertionError("Overlapping address ranges detected.\n\t"
+                                 f"Offending key paths: '{previous[2].replace(flatten_separator, print_separator)}' "
+                                 f"and '{current[2].replace(flatten_separator, print_separator)}'")
+    return ranges
+
+
+def discriminating_position(candidates: []) -> int:
+    """
+    Select the byte position that best tells apart a group of keys of the same length. The best position is the one
+    whose largest group of keys sharing the same byte is the smallest, and then the one with most distinct bytes.
+
+    :param candidates: a list of tuples with the bytes of the keys and their entry in the table
+
+    :return: the selected byte position
+    """
+    best_position: int = 0
+    best_score: () = (len(candidates) + 1, 0)
+    for position in range(len(candidates[0][0])):
+        groups: {} = {}
+        for key_bytes, _ in candidates:
+            groups[key_bytes[position]] = groups.get(key_bytes[position], 0) + 1
+        score: () = (max(groups.values()), -len(groups))
+        if score < best_score:
+            best_position, best_score = position, score
+    return best_position
+
+
+def write_decision_switch(output: StringIO, candidates: [], depth: int):
+    """
+    Write the nested switch statements that select the only candidate entry of a group of keys of the same length,
+    by switching on their discriminating bytes until a single key is left.
+
+    :param output: the stream where the code will be written
+    :param candidates: a list of tuples with the bytes of the keys and their entry in the table
+    :param depth: the indentation depth of the code
+    """
+    tabs: str = "\t" * depth
+    if len(candidates) == 1:
+        output.write(f"\n{tabs}entry = {candidates[0][1]}U;")
+        return
+    position: int = discriminating_position(candidates)
+    groups: {} = {}
+    for candidate in candidates:
+        groups.setdefault(candidate[0][position], []).append(candidate)
+    output.write(f"\n{tabs}switch ((unsigned char) property[{position}U]) {{")
+    for byte in sorted(groups):
+        output.write(f"\n{tabs}case {hex(byte)}U:")
+        write_decision_switch(output, groups[byte], depth + 1)
+        output.write(f"\n{tabs}\tbreak;")
+    output.write(f"\n{tabs}}}")
+
+
+def write_decision_tree(output: StringIO, entries: []):
+    """
+    Write the decision tree lookup function, which switches on the length of the property and then on the
+    discriminating bytes of the keys of that length. The selected candidate is verified with a single comparison.
+
+    :param output: the stream where the code will be written
+    :param entries: the dense list of key-value pairs of the table
+    """
+    lengths: {} = {}
+    for entry, (key, _) in enumerate(entries):
+        key_bytes: bytes = c_string_bytes(key)
+        lengths.setdefault(len(key_bytes), []).append((key_bytes, entry))
+    output.write("\n\n// Start of the decision tree that selects the only candidate entry for a property...")
+    output.write("\nstatic size_t decisionTreeLookup(const char *property, const size_t propertyLength) {")
+    output.write("\n\tsize_t entry = SIZE_MAX;")
+    output.write("\n\tswitch (propertyLength) {")
+    for length in sorted(lengths):
+        output.write(f"\n\tcase {length}U:")
+        write_decision_switch(output, lengths[length], 2)
+        output.write("\n\t\tbreak;")
+    output.write("\n\t}")
+    output.write("\n\tif (entry == SIZE_MAX || !entryMatches(entry, property, propertyLength, 0x00)) {")
+    output.write("\n\t\treturn SIZE_MAX;")
+    output.write("\n\t}")
+    output.write("\n\treturn entry;")
+    output.write("\n}")
+
+
+def simulate_probe(hashmap: [], bitmaps: [], home: int, key: str) -> (int, bool):
+    """
+    Simulate a single pass of `tableLookup()` (either the `Hash1` or the `Hash2` pass), counting the entries whose key
+    is compared in the same order as the C code: the home slot and then the non-empty slots of the clamped window, or
+    only the slots whose bit is set in the neighborhood bitmap of the home slot.
+
+    :param hashmap: the hashmap
+    :param bitmaps: the neighborhood bitmaps of the hashmap, or None when the neighborhoods are not emitted
+    :param home: the home slot of the pass
+    :param key: the key that is looked up
+
+    :return: a tuple with the number of compared entries and the slot where the key was found (or None on a miss)
+    """
+    if bitmaps is not None:
+        slots: [] = [home - collision_foresee + bit for bit in range(2 * collision_foresee + 1)
+                     if bitmaps[home] >> bit & 0x01]
+    elif hashmap[home] is None:
+        return 0, None
+    else:
+        window: range = range(max(home - collision_foresee, 0), min(home + collision_foresee, len(hashmap) - 1) + 1)
+        slots: [] = [home] + [slot for slot in window if slot != home and hashmap[slot] is not None]
+    for compares, slot in enumerate(slots, start=1):
+        if hashmap[slot][0] == key:
+            return compares, slot
+    return len(slots), None
+
+
+def compute_stats(hashmap: [], pointer_size: int) -> {}:
+    """
+    Compute the placement quality of the hashmap, by simulating the lookup of every key exactly as `tableLookup()`
+    does it. The cost of a miss is computed over every slot as the home slot of both hashes (the hashes of an absent
+    key are assumed to be uniform), without the Bloom filter. The bytes of the table count the emitted arrays and the
+    string literals of the keys and values, but not the code.
+
+    :param hashmap: the hashmap (or the ordered properties, with the decision tree backend)
+    :param pointer_size: the size of a pointer and a 'size_t' on the target
+
+    :return: a dictionary with the report
+    """
+    entries: [] = [value_at_index for value_at_index in hashmap if value_at_index is not None]
+    placement: {} = {"home": 0, "window": 0, "hash2": 0, "hash2_window": 0}
+    histogram: {} = {}
+    # A miss runs both passes of the hash table, but a single compare of the decision tree
+    passes: int = 1 if backend == "decision-tree" else 2
+    if backend == "decision-tree":
+        # The decision tree selects a single candidate, which is compared against the property
+        placement["home"] = len(entries)
+        histogram[1] = len(entries)
+        miss_costs: [] = [1]
+    else:
+        bitmaps: [] = compute_neighborhoods(hashmap) if neighborhoods else None
+        for key, _ in entries:
+            home: int = reduce_hash(calculate_hash(key), len(hashmap))
+            compares, slot = simulate_probe(hashmap, bitmaps, home, key)
+            category: str = "home" if slot == home else "window"
+            if slot is None:
+                home = reduce_hash(calculate_hash2(key), len(hashmap))
+                compares2, slot = simulate_probe(hashmap, bitmaps, home, key)
+                compares += compares2
+                category = "hash2" if slot == home else "hash2_window"
+            if slot is None:
+                raise AssertionError(f"The key '{key.replace(flatten_separator, print_separator)}' is not found by "
+                                     "the lookup.")
+            placement[category] += 1
+            histogram[compares] = histogram.get(compares, 0) + 1
+        miss_costs: [] = [simulate_probe(hashmap, bitmaps, home, "")[0] for home in range(len(hashmap))]
+    hit_compares: int = sum(compares * count for compares, count in histogram.items())
+    sizes: {} = {"uint8_t": 1, "uint16_t": 2, "uint32_t": 4, "uint64_t": 8, "size_t": pointer_size}
+    table_bytes: {} = {}
+    if table_layout == "indexed" and backend != "decision-tree":
+        table_bytes["index"] = len(hashmap) * sizes[index_type(len(entries))[0]]
+    slots: int = len(entries) if table_layout == "indexed" or backend == "decision-tree" else len(hashmap)
+    if neighborhoods:
+        table_bytes["neighborhoods"] = len(hashmap) * sizes[neighborhood_type(2 * collision_foresee + 1)]
+    if filter_rate:
+        table_bytes["filter"] = filter_dimensions(len(entries))[0] // 8
+    if fingerprint_bits:
+        longest: int = max(len(c_string_bytes(key)) for key, _ in entries)
+        table_bytes["entries"] = slots * (2 * pointer_size + fingerprint_bits // 8 + sizes[length_type(longest)])
+    else:
+        table_bytes["entries"] = slots * 2 * pointer_size
+    table_bytes["ranges"] = len(collect_ranges(hashmap)) * 4 * pointer_size
+    table_bytes["strings"] = sum(len(c_string_bytes(key)) + len(codecs.decode(packed_value(key, value),
+                                                                               "unicode_escape")) + 2
+                                 for key, value in entries)
+    table_bytes["total"] = sum(table_bytes.values())
+    return {
+        "backend": backend,
+        "length": len(hashmap),
+        "keys": len(entries),
+        "load_factor": len(entries) / len(hashmap) if hashmap else 0.0,
+        "placement": placement,
+        "probe_histogram": {str(compares): histogram[compares] for compares in sorted(histogram)},
+        "hit_compares": {"expected": hit_compares / len(entries) if entries else 0.0,
+                         "worst": max(histogram, default=0)},
+        "miss_compares": {"expected": passes * sum(miss_costs) / len(miss_costs), "worst": passes * max(miss_costs)},
+        "table_bytes": table_bytes,
+    }
+
+
+def write_c_array(output: StringIO, declaration: str, rows: []):
+    """
+    Write a C array definition, with one row per element and a comment with the index of the element.
+
+    :param output: the stream where the array will be written
+    :param declaration: the declaration of the array, without the initializer
+    :param rows: the C expressions of the elements of the array
+    """
+    output.write(f"\n\n{declaration} = {{")
+    for index, row in enumerate(rows):
+        comma = ',' if index != len(rows) - 1 else ' '
+        output.write(f"\n\t{row}{comma}  // {index:0{places_decimal}d}, {index:0{places_hex}x}")
+    output.write("\n};")
 
 
 def print_to_source(args, hashmap: []):
@@ -520,43 +1542,104 @@ def print_to_source(args, hashmap: []):
     """
     api_struct = args.api_struct_name
     api_table = args.api_table_name
+    api_index = api_table + "Index"
+    api_range = api_table + "Range"
+    api_ranges = api_table + "Ranges"
+    ranges: [] = collect_ranges(hashmap)
     hashmap_length = len(hashmap)
-    hashmap_max_index = hashmap_length - 1
+    if table_layout == "indexed":
+        entries: [] = [value_at_index for value_at_index in hashmap if value_at_index is not None]
+        index_c_type, index_c_empty = index_type(len(entries))
+    else:
+        entries: [] = hashmap
+        index_c_type, index_c_empty = None, None
+    table_length = len(entries)
+    keys: [] = [None if entry is None else entry[0].replace(flatten_separator, f"\"{flatten_separator_api}\"")
+                for entry in entries]
+    values: [] = [None if entry is None else packed_value(*entry) for entry in entries]
+    declarations: [] = []
     if not args.header_template or not args.header or not args.source_template or not args.source:
         program_parser.error("Generating the source code requires the template and the output files.")
         raise SystemExit("Can not proceed without template or output files.")
     with args.source_template as template:
         with StringIO("") as source:
-            source.write("\n// Start of the array that holds the Hash Table of the key-value pairs...")
-            source.write(f"\n\nconst struct {api_struct} {api_table}[{hashmap_length}] = {{")
-            for index in range(len(hashmap)):
-                comma = ' '
-                if index != hashmap_max_index:
-                    comma = ','
-                value_at_index = hashmap[index]
-                if value_at_index is None:
-                    source.write(f"\n\t{{NULL, NULL}}{comma}")
+            if table_layout == "indexed":
+                declaration = f"const {index_c_type} {api_index}[{hashmap_length}]"
+                declarations.append(("The index of the Hash Table, which points to the key-value pairs.", declaration))
+                source.write("\n// Start of the array that holds the index of the Hash Table...")
+                rows: [] = []
+                entry_index: int = 0
+                for value_at_index in hashmap:
+                    if value_at_index is None:
+                        rows.append(index_c_empty)
+                    else:
+                        rows.append(f"{entry_index}U")
+                        entry_index += 1
+                write_c_array(source, declaration, rows)
+                source.write("\n\n")
+            if neighborhoods:
+                neighborhood_c_type = neighborhood_type(2 * collision_foresee + 1)
+                declaration = f"const {neighborhood_c_type} {api_table}Neighborhoods[{hashmap_length}]"
+                declarations.append(("The Hopscotch neighborhood bitmaps of the Hash Table.", declaration))
+                source.write("\n// Start of the array that holds the Hopscotch neighborhood bitmaps of the Hash "
+                             "Table...")
+                write_c_array(source, declaration, [f"{hex(bitmap)}U" for bitmap in compute_neighborhoods(hashmap)])
+                source.write("\n\n")
+            if filter_rate:
+                filter_bits, filter_hashes, filter_bytes = compute_filter(hashmap)
+                declaration = f"const uint8_t {api_table}Filter[{len(filter_bytes)}]"
+                declarations.append(("The Bloom filter of the keys of the Hash Table.", declaration))
+                source.write("\n// Start of the array that holds the Bloom filter of the keys of the Hash Table...")
+                write_c_array(source, declaration, [f"{hex(byte)}U" for byte in filter_bytes])
+                source.write("\n\n")
+            if fingerprint_bits:
+                fingerprint_c_type = f"uint{fingerprint_bits}_t"
+                lengths: [] = [None if entry is None else len(c_string_bytes(entry[0])) for entry in entries]
+                length_c_type = length_type(max(length for length in lengths if length is not None))
+                arrays: [] = [
+                    ("keys", f"const char *const {api_table}Keys[{table_length}]",
+                     ["NULL" if key is None else f"\"{key}\"" for key in keys]),
+                    ("values", f"const char *const {api_table}Values[{table_length}]",
+                     ["NULL" if value is None else f"\"{value}\"" for value in values]),
+                    ("fingerprints of the keys", f"const {fingerprint_c_type} {api_table}Fingerprints[{table_length}]",
+                     ["0x00U" if entry is None else f"{hex(calculate_fingerprint(entry[0]))}U" for entry in entries]),
+                    ("lengths of the keys", f"const {length_c_type} {api_table}Lengths[{table_length}]",
+                     ["0x00U" if length is None else f"{length}U" for length in lengths])]
+                for name, declaration, rows in arrays:
+                    declarations.append((f"The {name} of the Hash Table.", declaration))
+                    source.write(f"\n// Start of the array that holds the {name} of the Hash Table...")
+                    write_c_array(source, declaration, rows)
+                    source.write("\n\n")
+            else:
+                declaration = f"const struct {api_struct} {api_table}[{table_length}]"
+                declarations.append(("The internal representation of the Hash Table.", declaration))
+                if table_layout == "indexed":
+                    source.write("\n// Start of the array that holds the key-value pairs, in the order of the index...")
+                elif backend == "decision-tree":
+                    source.write("\n// Start of the array that holds the key-value pairs, selected by the decision "
+                                 "tree...")
                 else:
-                    key, val = value_at_index
-                    printable_key: str = key.replace(flatten_separator, print_separator)
-                    try:
-                        val = val.reduced_value
-                        program_logger.info(f"Found packed value from tag for \"{printable_key}\": {val}")
-                    except AttributeError:
-                        raise AssertionError(
-                                "Due to the nature of the C language, all values must have to be tagged with their "
-                                "correct type, including all integers. Only strings, mappings and sequences can be "
-                                "untagged.\n\t"
-                                f"Offending key path: '{printable_key}'")
-                    api_key = key.replace(flatten_separator, f"\"{flatten_separator_api}\"")
-                    source.write(f"\n\t{{\"{api_key}\",\n\t \"{val}\"}}{comma}")
-                source.write(f"  // {index:0{places_decimal}d}, {index:0{places_hex}x}")
-            source.write("\n};")
+                    source.write("\n// Start of the array that holds the Hash Table of the key-value pairs...")
+                rows: [] = []
+                for key, value in zip(keys, values):
+                    rows.append("{NULL, NULL}" if key is None else f"{{\"{key}\",\n\t \"{value}\"}}")
+                write_c_array(source, declaration, rows)
+            if backend == "decision-tree":
+                write_decision_tree(source, entries)
+            if ranges:
+                declaration = f"const struct {api_range} {api_ranges}[{len(ranges)}]"
+                declarations.append(("The interval index of the address ranges, sorted by their start.", declaration))
+                source.write("\n\n// Start of the array that holds the interval index of the address ranges...")
+                rows: [] = []
+                for start, end, key, value in ranges:
+                    rows.append(f"{{{hex(start)}U, {hex(end)}U,\n\t \"{value.range_type}\",\n\t "
+                                f"\"{value.description}\"}}")
+                write_c_array(source, declaration, rows)
             source.write("\n")
             source.seek(0)
-            with args.source as real_output:
-                real_output.write(template.read())
-                real_output.write(source.read())
+            write_output(args.source,
+                         template.read().replace(hash_family_placeholder, hash_family.c_source.strip("\n")) +
+                         source.read())
     with args.header_template as template:
         with StringIO("") as header:
             tpk = testing_property_key.replace(flatten_separator, f"\"{flatten_separator_api}\"")
@@ -568,46 +1651,299 @@ def print_to_source(args, hashmap: []):
             header.write(f"\n#define {constcase(api_table + 'TestValue')} \"{testing_property_value}\"")
             header.write("\n\n/// \\brief Use this pattern to seed the hashing algorithm.")
             header.write(f"\n#define {constcase(api_table + 'Pattern')} {hex(pattern_64bit)}")
-            header.write("\n\n/// \\brief Represents a key-value pair, which is used to store inside the Hash Table.")
-            header.write(f"\nstruct {api_struct} {{\n\tchar *key;\n\tchar *value;\n}};")
-            header.write("\n\n/// \\brief The internal representation of the Hash Table.")
-            header.write(f"\nconst struct {api_struct} {api_table}[{hashmap_length}];")
+            header.write("\n\n/// \\brief The number of entries in the Hash Table.")
+            header.write(f"\n#define {constcase(api_table + 'Length')} {hashmap_length}U")
+            if backend == "decision-tree":
+                header.write("\n\n/// \\brief Look up the properties with the decision tree, instead of the Hash "
+                             "Table.")
+                header.write(f"\n#define {constcase(api_table + 'DecisionTree')}")
+            if sizing_mode == "multiply-shift":
+                header.write("\n\n/// \\brief Reduce the hashes to the length of the table by a multiplication and a "
+                             "shift.")
+                header.write(f"\n#define {constcase(api_table + 'MultiplyShift')}")
+            if table_layout == "indexed":
+                header.write("\n\n/// \\brief The type of the entries in the index of the Hash Table.")
+                header.write(f"\n#define {constcase(api_index + 'Type')} {index_c_type}")
+                header.write("\n\n/// \\brief The value of the entries in the index of the Hash Table that are empty.")
+                header.write(f"\n#define {constcase(api_index + 'Empty')} {index_c_empty}")
+            if neighborhoods:
+                header.write("\n\n/// \\brief The type of the Hopscotch neighborhood bitmaps.")
+                header.write(f"\n#define {constcase(api_table + 'NeighborhoodType')} "
+                             f"{neighborhood_type(2 * collision_foresee + 1)}")
+            if filter_rate:
+                header.write("\n\n/// \\brief The number of bits of the Bloom filter of the keys.")
+                header.write(f"\n#define {constcase(api_table + 'FilterBits')} {filter_bits}U")
+                header.write("\n\n/// \\brief The number of bits of the Bloom filter that are tested for every key.")
+                header.write(f"\n#define {constcase(api_table + 'FilterHashes')} {filter_hashes}U")
+            if fingerprint_bits:
+                header.write("\n\n/// \\brief The type of the fingerprints of the keys.")
+                header.write(f"\n#define {constcase(api_table + 'FingerprintType')} uint{fingerprint_bits}_t")
+            if fingerprint_bits or filter_rate:
+                header.write("\n\n/// \\brief The starting value of the hash of a key, which feeds the fingerprint "
+                             "and the filter.")
+                header.write(f"\n#define {constcase(api_table + 'FingerprintBasis')} {hex(fingerprint_basis)}U")
+                header.write("\n\n/// \\brief The multiplier used to mix every character into the hash of a key.")
+                header.write(f"\n#define {constcase(api_table + 'FingerprintPrime')} {hex(fingerprint_prime)}U")
+            if not fingerprint_bits:
+                header.write("\n\n/// \\brief Represents a key-value pair, which is used to store inside the "
+                             "Hash Table.")
+                header.write(f"\nstruct {api_struct} {{\n\tchar *key;\n\tchar *value;\n}};")
+            header.write("\n\n/// \\brief The number of address ranges in the interval index.")
+            header.write(f"\n#define {constcase(api_ranges + 'Length')} {len(ranges)}U")
+            header.write("\n\n/// \\brief Represents an address range, which is used to store inside the interval "
+                         "index.")
+            header.write(f"\nstruct {api_range} {{\n\tuintptr_t start;\n\tuintptr_t end;\n\tconst char *type;"
+                         "\n\tconst char *description;\n};")
+            for brief, declaration in declarations:
+                header.write(f"\n\n/// \\brief {brief}")
+                header.write(f"\n{declaration};")
             header.write("\n")
             header.seek(0)
-            with args.header as real_output:
-                real_output.write(template.read())
-                real_output.write(header.read())
+            write_output(args.header, template.read() + header.read())
+
+
+def write_output(path: str, contents):
+    """
+    Write a generated file, unless it already holds the same contents. Leaving an unchanged file untouched keeps its
+    modification time, so the build system does not rebuild what depends on it.
+
+    :param path: the path to the generated file
+    :param contents: the contents of the generated file, as a string or as bytes
+    """
+    binary: str = "b" if isinstance(contents, bytes) else ""
+    try:
+        with open(path, "r" + binary) as existing:
+            if existing.read() == contents:
+                program_logger.info(f"The file '{path}' did not change")
+                return
+    except (OSError, UnicodeDecodeError):
+        pass
+    with open(path, "w" + binary, buffering=buffer_size) as output:
+        output.write(contents)
+
+
+def c_value_bytes(key: str, value) -> bytes:
+    """
+    Compute the bytes that the C compiler will store for the packed value of a property.
+
+    :param key: the key of the property
+    :param value: the value of the property
+
+    :return: the bytes of the value as seen by the C program
+    """
+    return codecs.decode(packed_value(key, value), "unicode_escape").encode("latin-1")
+
+
+def write_image(path: str, hashmap: []):
+    """
+    Write the binary image of the hashmap, with the layout defined by `DescriptorImage.py`.
+
+    :param path: the path to the image
+    :param hashmap: the hashmap
+    """
+    slots: [] = [None if value_at_index is None else
+                 (c_string_bytes(value_at_index[0]), c_value_bytes(*value_at_index), value_at_index[1])
+                 for value_at_index in hashmap]
+    bitmaps: [] = compute_neighborhoods(hashmap) if neighborhoods else None
+    write_output(path, build_image(slots, bitmaps, bits, collision_foresee, sizing_mode, hash_family, pattern_64bit))
+
+
+def dependency_files(args: Namespace) -> []:
+    """
+    Get the input files of the last generation: every YAML file that was included (in the order they were opened),
+    the templates and the profile.
+
+    :param args: the program's parsed arguments
+
+    :return: a list with the absolute paths to the input files
+    """
+    files: [] = list(input_files)
+    for input_file in (args.header_template, args.source_template, args.profile):
+        if input_file is not None:
+            files.append(str(Path(input_file.name).absolute()))
+    return files
+
+
+def inputs_digest(args: [], files: []) -> str:
+    """
+    Compute the digest of the options, the working directory (which resolves the relative paths), the modules of the
+    generator and the contents of the input files. A missing input file is part of the digest, so it's never equal to
+    the digest of a generation that read the file.
+
+    :param args: arguments from command line
+    :param files: the paths to the input files
+
+    :return: the hexadecimal digest
+    """
+    digest = hashlib.sha256()
+    for arg in [getcwd(), *args]:
+        digest.update(arg.encode() + b"\x00")
+    for file in [*generator_modules, *files]:
+        digest.update(str(file).encode() + b"\x00")
+        try:
+            digest.update(Path(file).read_bytes())
+        except OSError:
+            digest.update(b"\x00missing")
+    return digest.hexdigest()
+
+
+def outputs_up_to_date(args: Namespace, program_args: []) -> bool:
+    """
+    Check if the outputs of a previous generation are up to date, by comparing the digest file against the digest of
+    the input files that were recorded in it. Including a new file requires changing an input file, so the recorded
+    input files are enough to detect any change.
+
+    :param args: the program's parsed arguments
+    :param program_args: arguments from command line
+
+    :return: True if all the outputs exist and the digest did not change
+    """
+    if not args.digest:
+        return False
+    try:
+        with open(args.digest) as digest_file:
+            record: {} = json.load(digest_file)
+    except (OSError, ValueError):
+        return False
+    outputs: [] = [args.header, args.source, args.stats, args.emit_ir, args.image, args.depfile]
+    if not all(Path(output).exists() for output in outputs if output):
+        return False
+    return record.get("digest") == inputs_digest(program_args, record.get("inputs", []))
+
+
+def depfile_escape(path: str) -> str:
+    """
+    Escape a path to be written in a Make/Ninja depfile.
+
+    :param path: the path
+
+    :return: the escaped path
+    """
+    return path.replace("\\", "/").replace(" ", "\\ ").replace("#", "\\#").replace("$", "$$")
+
+
+def write_dependencies(args: Namespace, program_args: []):
+    """
+    Write the depfile and the digest file of the generation, when they were requested.
+
+    :param args: the program's parsed arguments
+    :param program_args: arguments from command line
+    """
+    files: [] = dependency_files(args)
+    if args.depfile:
+        targets: [] = [output for output in (args.source, args.header, args.stats, args.emit_ir, args.image,
+                                             args.digest) if output]
+        write_output(args.depfile, " ".join(depfile_escape(target) for target in targets) + ":" +
+                     "".join(f" \\\n {depfile_escape(file)}" for file in files) + "\n")
+    if args.digest:
+        write_output(args.digest, json.dumps({"digest": inputs_digest(program_args, files), "inputs": files},
+                                             indent=1) + "\n")
+        # The digest is the stamp of the build system, so it must be newer than the inputs even if it did not change
+        Path(args.digest).touch()
 
 
-def main(args: []):
+def apply_parse_options(parsed: Namespace):
+    """
+    Apply the options that control how the YAML files are loaded (the loader, the parse cache and the pool of
+    processes of the included files), before any file is flattened.
+
+    :param parsed: the program's parsed arguments
+    """
+    global cache_directory
+    global include_jobs
+    global yaml_loader
+    global yaml_parser
+    cache_directory = Path(parsed.cache) if parsed.cache else None
+    include_jobs = parsed.include_jobs
+    if include_jobs < 0:
+        program_parser.error("The number of processes that parse the included files can not be negative.")
+    if parsed.loader == "libyaml" and CParser is None:
+        program_parser.error("The 'libyaml' loader requires the C extension of ruamel.yaml (ruamel.yaml.clib).")
+    if parsed.loader != yaml_loader:
+        yaml_loader = parsed.loader
+        yaml_parser = create_yaml_parser(yaml_loader)
+
+
+def main(args: [], flatten_properties: {} = None):
     """
     Main program (entry point).
 
     :param args: arguments from command line
+    :param flatten_properties: the flatten properties, when they were already computed from the YAML file (the
+                               included files must have to be in `input_files`)
     """
     parsed = parse_args(args)
+    global backend
     global bits
     global collision_foresee
+    global filter_rate
+    global fingerprint_bits
+    global hash_family
+    global load_factor
+    global neighborhoods
     global places_binary
     global places_decimal
     global places_hex
     global places_octal
+    global precomputed_mask
     global program_logger
+    global sizing_mode
+    global table_layout
     rex = re.compile("(?P<n>\\d+)[Uu]?")
+    backend = parsed.backend
     bits = int(rex.match(parsed.bits).group("n"))
     collision_foresee = int(rex.match(parsed.foresee).group("n"))
+    filter_rate = parsed.filter_rate
+    fingerprint_bits = parsed.fingerprint_bits
+    hash_family = hash_families[parsed.hash_family]
     places_binary = bits
     places_decimal = ceil(bits / log2(10))
     places_hex = ceil(bits / 4)
     places_octal = ceil(bits / 3)
+    load_factor = parsed.load_factor
+    neighborhoods = parsed.neighborhoods
+    precomputed_mask = 0
+    sizing_mode = parsed.sizing
+    table_layout = parsed.layout
     if program_parser is None:
         raise SystemExit("Program argument parser not set or global argument set is None.")
     if parsed_arguments is None:
         raise SystemExit("Parsed program arguments is None.")
+    if not 0 < bits <= hash_family.max_bits:
+        program_parser.error(f"The '{hash_family.name}' hash family produces from 1 up to {hash_family.max_bits} bits.")
+    if bits > 32:
+        program_parser.error("The lookup code computes the hashes as 32-bit 'unsigned' values, so the hashes can not "
+                             "have more than 32 bits.")
+    if not 0 < load_factor <= 1:
+        program_parser.error("The load factor must have to be greater than 0 and less than or equal to 1.")
+    if not 0 <= filter_rate < 1:
+        program_parser.error("The false positive rate of the filter must have to be at least 0 and less than 1.")
+    if backend == "decision-tree" and (table_layout != "table" or fingerprint_bits or neighborhoods):
+        program_parser.error("The decision tree backend only supports the 'table' layout, without fingerprints or "
+                             "neighborhoods.")
+    if parsed.image and backend != "hashmap":
+        program_parser.error("The binary image requires the 'hashmap' backend.")
+    apply_parse_options(parsed)
+    if neighborhoods and 2 * collision_foresee + 1 > 64:
+        program_parser.error("The neighborhood bitmaps can not hold a foresee greater than 31.")
     if parsed.verbose:
         basicConfig(level=DEBUG)
-    hashmap = create_hashmap(parsed)
+    if outputs_up_to_date(parsed, args):
+        program_logger.info("The inputs and the options did not change, the outputs are up to date")
+        Path(parsed.digest).touch()
+        return
+    if flatten_properties is None:
+        flatten_properties = load_properties(parsed)
+    if parsed.emit_ir:
+        write_ir(parsed.emit_ir, flatten_properties)
+    hashmap = create_hashmap(parsed, flatten_properties)
+    evict_stale_cache()
     print_to_source(parsed, hashmap)
+    if parsed.image:
+        write_image(parsed.image, hashmap)
+    if parsed.stats:
+        write_output(parsed.stats, json.dumps(compute_stats(hashmap, parsed.pointer_size), indent=1) + "\n")
+    write_dependencies(parsed, args)
 
 
 if __name__ == "__main__":
@@ -25,115 +25,177 @@
 
 # noinspection PyUnresolvedReferences
 from YamlTags import CType, FileMarker
-from deepmerge import Merger
-from deepmerge.strategy.dict import DictStrategies
-from deepmerge.strategy.list import ListStrategies
 
 
 # ===--------------------------------------------------------------------------------------------------------------=== #
 
 # noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
 class FileMarkedValue:
-    def __init__(self, path: str, value):
-        self.marking = path
+    __slots__ = ("marking", "contents")
+
+    def __init__(self, marking: FileMarker, value):
+        self.marking = marking
         self.contents = value
 
     def __str__(self):
-        return f"{self.contents} from '{self.marking}'"
+        return f"{self.contents} from '{self.marking.marker}'"
 
     def __eq__(self, other):
         if isinstance(other, type(self)):
-            return self.marking.__eq__(other.marking) and self.contents.__eq__(other.contents)
+            return self.marking == other.marking and self.contents == other.contents
         if isinstance(other, CType):
-            return self.contents.__eq__(other)
+            return self.contents == other
         return NotImplemented
 
+    def __hash__(self):
+        # Marked values are equal to their unmarked C values, so the marking is not part of the hash
+        return hash(CanonicalForm(self.contents))
 
-# ===--------------------------------------------------------------------------------------------------------------=== #
 
-# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
-class YamlListStrategies(ListStrategies):
-    """
-    Contains the strategies provided for lists.
+# noinspection PyPep8Naming
+def CanonicalForm(value):
     """
-    NAME = "list"
+    Compute a hashable form of a value, which is the same for all the values that are equal (mappings and sequences
+    are converted to frozen sets and tuples, and the C values to their reduced value). Values that are not equal can
+    share the same form, so the form is only an index to the values that must be compared.
 
-    @staticmethod
-    def strategy_yaml_sequence(config, path: [], base: [], other: []):
-        """
-        Try to perform a merge strategy. Note that the YAML specification does not support sequence merging. This is an
-        add-on that does not follows the standard. This merger will always append lists with values from lists with the
-        same path from different documents. They will always appear in the order that they are processed.
+    :param value: the value
 
-        Note that items in a sequence that are the same path and value, *and* are part of the same path in the same
-        document will be merged into the first appearing key. Items with the same path and value within document or file
-        scopes will be always appended to the list.
+    :return: the hashable form of the value
+    """
+    if isinstance(value, FileMarkedValue):
+        return CanonicalForm(value.contents)
+    if isinstance(value, CType):
+        return value.reduced_value
+    if isinstance(value, dict):
+        return frozenset((CanonicalForm(key), CanonicalForm(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(CanonicalForm(item) for item in value)
+    try:
+        hash(value)
+    except TypeError:
+        return type(value)
+    return value
+
+
+# noinspection PyPep8Naming
+def ExtendUnique(merged: [], index: {}, values: []):
+    """
+    Append the values that are not in a sequence yet, in their order. The index maps the canonical forms to the items
+    of the sequence, so every value is only compared with the items that could be equal to it.
 
-        :param config: the current merging configuration
-        :param path: the path to the current merging conflict
-        :param base: the base (original) value
-        :param other: the other (to be merged) value
+    :param merged: the sequence to extend
+    :param index: the index of the sequence, from `CanonicalForm()` to the items with that form
+    :param values: the values to append
+    """
+    for value in values:
+        candidates: [] = index.setdefault(CanonicalForm(value), [])
+        if not any(item is value or item == value for item in candidates):
+            candidates.append(value)
+            merged.append(value)
 
-        :return: the merged list
-        """
-        base_file_mark = base.pop()
-        if type(base_file_mark) == FileMarker:
-            base = [FileMarkedValue(base_file_mark.marker, x) for x in base]
-        else:
-            base.append(base_file_mark)
-        other_file_mark = other.pop()
-        if type(other_file_mark) == FileMarker:
-            other = [FileMarkedValue(other_file_mark.marker, x) for x in other]
-        else:
-            other.append(other_file_mark)
-        merged = []
-        [merged.append(x) for x in base if x not in merged]
-        [merged.append(x) for x in other if x not in merged]
-        return merged
 
+# ===--------------------------------------------------------------------------------------------------------------=== #
 
-# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
-class YamlDictStrategies(DictStrategies):
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints
+class YamlLayers:
     """
-    Contains the strategies provided for dictionaries.
+    Collect the documents of the YAML files as ordered layers, and resolve them in a single traversal. The result is
+    the same as merging every document into an empty dictionary with the `deepmerge` merger that the generator used
+    before (which lives on in the tests, to check this class against it) and then merging the dictionary with itself
+    (which encapsulates the sequences that were found in a single document), but every path is visited once, instead
+    of once per document. The mappings and sequences which are shared by the YAML aliases are
+    resolved once, so they are also shared by the result.
+
+    Unlike that merger, the layers are never modified: an override of a path that is reached through an alias only
+    changes that path, while the merger changed the anchor in place (and so the anchor and all its other aliases).
     """
-    NAME = "dict"
 
-    @staticmethod
-    def strategy_yaml_mapping(config, path: {}, base: {}, other: {}):
+    def __init__(self):
+        self.layers: [] = []
+        self.resolved: {} = {}
+
+    def add(self, document):
+        """
+        Add a document as the topmost layer, so its values override the values of the previous layers.
+
+        :param document: the document to add
         """
-        Try to perform a merge strategy. Note that the YAML specification does not support merging of mappings. This is
-        an add-on that does not follows the standard. This merger will try to replace values with the same path with the
-        newest one, and will append non-existing values to the mapping path.
+        self.layers.append(document)
 
-        :param config: the current merging configuration
-        :param path: the path to the current merging conflict
-        :param base: the base (original) value
-        :param other: the other (to be merged) value
+    def resolve(self) -> {}:
+        """
+        Resolve the layers into a single dictionary. The layers are not modified.
 
         :return: the merged dictionary
         """
-        for k, v in other.items():
-            if k not in base:
-                base[k] = v
-            else:
-                base[k] = config.value_strategy(path + [k], base[k], v)
-        return base
+        try:
+            return self.resolve_path([], [{}] + self.layers)
+        finally:
+            self.resolved.clear()
 
+    def resolve_path(self, path: [], values: []):
+        """
+        Resolve the values of a path, from all the layers that define it. Mappings are resolved key by key (keys keep
+        the order of their first definition), sequences are concatenated and scalars are replaced by the latest value.
 
-# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
-class YamlMerger(Merger):
-    """
-    :param type_strategies, List[Tuple]: a list of (Type, Strategy) pairs that should be used against incoming types.
-    """
-    PROVIDED_TYPE_STRATEGIES = {
-        list: YamlListStrategies,
-        dict: YamlDictStrategies
-    }
+        :param path: the path to the values
+        :param values: the values of the path, in the order of the layers
 
+        :return: the resolved value
+        """
+        for base, other in zip(values, values[1:]):
+            if not (isinstance(base, type(other)) or isinstance(other, type(base))):
+                raise AssertionError(f"Found values of different types while merging the YAML documents.\n\t"
+                                     f"Offending key path: '{'::'.join(str(key) for key in path)}'")
+        latest = values[-1]
+        if not isinstance(latest, (dict, list)):
+            return latest
+        # The same values (by identity) have the same resolution, wherever the aliases place them
+        identities: () = tuple(id(value) for value in values)
+        if identities in self.resolved:
+            if self.resolved[identities] is None:
+                raise AssertionError("Recursive aliases are not allowed.\n\t"
+                                     f"Offending key path: '{'::'.join(str(key) for key in path)}'")
+            return self.resolved[identities]
+        self.resolved[identities] = None
+        if isinstance(latest, dict):
+            keys_values: {} = {}
+            for value in values:
+                for key, key_value in value.items():
+                    keys_values.setdefault(key, []).append(key_value)
+            resolved = {key: self.resolve_path(path + [key], key_values) for key, key_values in keys_values.items()}
+        else:
+            resolved = self.resolve_sequence(path, values)
+        self.resolved[identities] = resolved
+        return resolved
+
+    @staticmethod
+    def resolve_sequence(path: [], values: []) -> []:
+        """
+        Resolve the values of a sequence, as the sequence strategy of the `deepmerge` merger did: the items are marked
+        with the file and the position of their sequence, and repeated items (with the same marking) are dropped.
+
+        :param path: the path to the sequence
+        :param values: the sequences of the path, in the order of the layers
 
-# noinspection PyPep8Naming,PyMissingOrEmptyDocstring,PyMissingTypeHints
-def GetYamlMerger():
-    return YamlMerger([(list, "yaml_sequence"), (dict, "yaml_mapping")], ["override"], [])
+        :return: the resolved sequence
+        """
+        merged: [] = []
+        merged_index: {} = {}
+        for index, value in enumerate(values):
+            if value and type(value[-1]) == FileMarker:
+                value = [FileMarkedValue(value[-1], x) for x in value[:-1]]
+            ExtendUnique(merged, merged_index, value)
+            # An empty sequence can not be merged with the next one (nor with itself, if it is the only one)
+            if index == min(len(values), 2) - 1 and not merged:
+                raise AssertionError("Empty sequences are not allowed.\n\t"
+                                     f"Offending key path: '{'::'.join(str(key) for key in path)}'")
+        if len(values) == 1 and values[0] and type(values[0][-1]) == FileMarker:
+            # The items of a sequence from a single document that can not be compared with their marked values are
+            # kept unmarked, as the merge of the dictionary with itself does. The mappings are kept marked, so a
+            # sequence of mappings is accepted in a single document, as it is when it spans documents or files
+            ExtendUnique(merged, merged_index, [item for item in values[0][:-1] if not isinstance(item, dict)])
+        return merged
 
 # ===--------------------------------------------------------------------------------------------------------------=== #
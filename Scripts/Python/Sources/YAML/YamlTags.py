@@ -25,22 +25,72 @@
 
 import re
 from pathlib import Path
+from weakref import WeakValueDictionary
 
-from ruamel.yaml import SafeConstructor, yaml_object
+from ruamel.yaml import SafeConstructor
 
 rex_include_path = re.compile("<(?P<f>.*)>")
+rex_reduced_integer = re.compile(r"\\x02(?P<n>[+-]?0x[0-9a-f]+)\\x03")
 
 
 # ===--------------------------------------------------------------------------------------------------------------=== #
 
 # noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
 class FileMarker:
-    def __init__(self, path: Path, start: str, end: str):
-        self.marker = f"{path}:$:{start}:$:{end}"
+    """
+    Mark the file and the position of a sequence. The paths of the files are interned in a table, so a marker only
+    stores the index of its file and the integer positions; the text of the marker is only rendered when it's needed.
+    """
+    __slots__ = ("file", "start", "end")
+    file_ids: {} = {}
+    file_paths: [] = []
+
+    def __init__(self, path: str, start: (), end: ()):
+        self.file: int = FileMarker.file_id(path)
+        self.start: () = start
+        self.end: () = end
+
+    def __eq__(self, other):
+        if isinstance(other, FileMarker):
+            return (self.file, self.start, self.end) == (other.file, other.start, other.end)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.file, self.start, self.end))
+
+    def __reduce__(self):
+        # The indexes of the files are only valid in the process that interned them
+        return FileMarker, (FileMarker.file_paths[self.file], self.start, self.end)
 
     def __str__(self):
         return f"Mark for file: '{self.marker}'"
 
+    @staticmethod
+    def file_id(path: str) -> int:
+        """
+        Intern the path of a file.
+
+        :param path: the path to the file, as given to the parser
+
+        :return: the index of the absolute path in the table of files
+        """
+        file_id: int = FileMarker.file_ids.get(path, -1)
+        if file_id < 0:
+            absolute_path: str = str(Path(path).absolute())
+            file_id = FileMarker.file_ids.setdefault(absolute_path, len(FileMarker.file_paths))
+            if file_id == len(FileMarker.file_paths):
+                FileMarker.file_paths.append(absolute_path)
+            # Relative paths depend on the working directory, so only the absolute ones are kept
+            if Path(path).is_absolute():
+                FileMarker.file_ids[path] = file_id
+        return file_id
+
+    @property
+    def marker(self) -> str:
+        start: str = ":".join(str(position) for position in self.start)
+        end: str = ":".join(str(position) for position in self.end)
+        return f"{FileMarker.file_paths[self.file]}:$:{start}:$:{end}"
+
 
 # noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
 class CustomSafeConstructor(SafeConstructor):
@@ -52,10 +102,10 @@ class CustomSafeConstructor(SafeConstructor):
         data = self.yaml_base_list_type()
         yield data
         data.extend(self.construct_sequence(node))
-        file_path = Path(node.start_mark.name).absolute()
-        start_composite = f"{node.start_mark.line}:{node.start_mark.column}:{node.start_mark.index}"
-        end_composite = f"{node.end_mark.line}:{node.end_mark.column}:{node.end_mark.index}"
-        data.append(FileMarker(file_path, start_composite, end_composite))
+        start_mark = node.start_mark
+        end_mark = node.end_mark
+        data.append(FileMarker(start_mark.name, (start_mark.line, start_mark.column, start_mark.index),
+                               (end_mark.line, end_mark.column, end_mark.index)))
 
     def construct_yaml_str(self, node):
         value = self.construct_scalar(node)
@@ -98,43 +148,47 @@ class YamlInclude:
         return cls(extract_path(node.value, node.start_mark))
 
 
-# noinspection PyPep8Naming,PyMissingOrEmptyDocstring,PyMissingTypeHints
-def InitializeIncludeTags(yaml_parser):
-    # noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
-    @yaml_object(yaml_parser)
-    class AbsoluteInclude(YamlInclude):
-        """
-        This class represent a path to include a file, relative to the root path directory.
-        """
-        yaml_tag = u'!$+'
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
+class AbsoluteInclude(YamlInclude):
+    """
+    This class represent a path to include a file, relative to the root path directory.
+    """
+    yaml_tag = u'!$+'
 
-        def __init__(self, value: str):
-            super().__init__(value)
-            self.type: str = "abs"
+    def __init__(self, value: str):
+        super().__init__(value)
+        self.type: str = "abs"
 
-    # noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
-    @yaml_object(yaml_parser)
-    class RelativeInclude(YamlInclude):
-        """
-        This class represent a path to include a file, relative to the currently processed file.
-        """
-        yaml_tag = u'!$@'
 
-        def __init__(self, value: str):
-            super().__init__(value)
-            self.type: str = "rel"
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
+class RelativeInclude(YamlInclude):
+    """
+    This class represent a path to include a file, relative to the currently processed file.
+    """
+    yaml_tag = u'!$@'
 
-    # noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
-    @yaml_object(yaml_parser)
-    class WorkingDirectoryInclude(YamlInclude):
-        """
-        This class represent a path to include a file, relative to the current working directory.
-        """
-        yaml_tag = u'!$$'
+    def __init__(self, value: str):
+        super().__init__(value)
+        self.type: str = "rel"
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
+class WorkingDirectoryInclude(YamlInclude):
+    """
+    This class represent a path to include a file, relative to the current working directory.
+    """
+    yaml_tag = u'!$$'
+
+    def __init__(self, value: str):
+        super().__init__(value)
+        self.type: str = "cwd"
 
-        def __init__(self, value: str):
-            super().__init__(value)
-            self.type: str = "cwd"
+
+# noinspection PyPep8Naming,PyMissingOrEmptyDocstring,PyMissingTypeHints
+def InitializeIncludeTags(yaml_parser):
+    # The tag classes are defined at the module level, so the constructed documents can be pickled by the parse cache
+    for tag_class in (AbsoluteInclude, RelativeInclude, WorkingDirectoryInclude):
+        yaml_parser.register_class(tag_class)
 
 
 # ===--------------------------------------------------------------------------------------------------------------=== #
@@ -143,9 +197,22 @@ def InitializeIncludeTags(yaml_parser):
 class CType:
     """
     Represent all valid types of values for C.
+
+    The values are immutable and interned per class and reduced value, so the values that repeat across the YAML files
+    (and across the documents of the parse cache) share a single object, which is also never copied.
     """
+    __slots__ = ("reduced_value", "__weakref__")
+    interned_values: WeakValueDictionary = WeakValueDictionary()
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo: {}):
+        return self
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, type(self)):
             return self.reduced_value.__eq__(other.reduced_value)
         return NotImplemented
@@ -156,6 +223,16 @@ class CType:
     def __init__(self, value: str):
         self.reduced_value: str = value
 
+    def __new__(cls, value: str, *args, **kwargs):
+        interned_value = CType.interned_values.get((cls, value))
+        if interned_value is None:
+            interned_value = super().__new__(cls)
+            CType.interned_values[(cls, value)] = interned_value
+        return interned_value
+
+    def __reduce__(self):
+        return type(self), (self.reduced_value,)
+
     def __str__(self):
         return self.reduced_value
 
@@ -166,6 +243,7 @@ class UnsignedCType(CType):
     This class represent an unsigned value. Unsigned values can be any value, but they must have to be unsigned
     integers. The children classes will restrict the type of the value.
     """
+    __slots__ = ()
 
     @classmethod
     def from_yaml(cls, constructor, node):
@@ -195,6 +273,13 @@ class UnsignedCType(CType):
 
         return cls(format_unsigned(node.tag, node.value, node.start_mark))
 
+    @property
+    def integer(self) -> int:
+        """
+        The integer value of the tag, recovered from its reduced value.
+        """
+        return int(rex_reduced_integer.search(self.reduced_value).group("n"), 16)
+
 
 # noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
 class SignedCType(UnsignedCType):
@@ -202,6 +287,7 @@ class SignedCType(UnsignedCType):
     This class represent a signed value. Signed values can be any value, but they must have to be signed integers. The
     children classes will restrict the type of the value.
     """
+    __slots__ = ()
 
     @classmethod
     def from_yaml(cls, constructor, node):
@@ -237,113 +323,141 @@ class StringCType(CType):
     """
     Represents a C string. This type of string is checked to be ASCII string.
     """
+    __slots__ = ()
 
 
-# noinspection PyPep8Naming,PyMissingOrEmptyDocstring,PyMissingTypeHints
-def InitializeStronglyTypedTags(yaml_parser):
-    # noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
-    @yaml_object(yaml_parser)
-    class Offset(SignedCType):
-        """
-        This class represent a pointer difference, which also means an offset or an array index. They are always signed
-        integer constants.
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
+class Offset(SignedCType):
+    """
+    This class represent a pointer difference, which also means an offset or an array index. They are always signed
+    integer constants.
 
-        They are always of the machine's `ptrdiff_t` size.
-        """
-        yaml_tag = u'!offset'
+    They are always of the machine's `ptrdiff_t` size.
+    """
+    __slots__ = ()
+    yaml_tag = u'!offset'
 
-    # noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
-    @yaml_object(yaml_parser)
-    class Pointer(UnsignedCType):
-        """
-        This class represent a pointer. Pointers are always unsigned integer constants.
 
-        They are always of the machine's `uintptr_t` or `void *` size.
-        """
-        yaml_tag = u'!pointer'
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
+class Pointer(UnsignedCType):
+    """
+    This class represent a pointer. Pointers are always unsigned integer constants.
 
-    # noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
-    @yaml_object(yaml_parser)
-    class Range(CType):
-        """
-        This class represent a range. Ranges can contain any value inside them, but they must have to define a start, an
-        end and a name.
-        """
-        yaml_tag = u'!range'
-
-        @classmethod
-        def from_yaml(cls, constructor, node):
-            def reduce_range(tag: str, mapping_object: {}, mark) -> str:
-                """
-                Try to reduce the range tag to a string with a special format. Note that this is a generic range
-                function, which can reduce any range (given the rules for range reduction).
-
-                :param tag: the name of the tag
-                :param mapping_object: the value of the tag
-                :param mark: a mark to report the syntax error
-
-                :return: a composite string with the value appended to the tag name
-                """
-                try:
-                    description = mapping_object[StringCType("description")]
-                    end = mapping_object[StringCType("end")]
-                    start = mapping_object[StringCType("start")]
-                    range_type = mapping_object[StringCType("type")]
-                    # Raise an error if description is not a string
-                    if type(description) is not StringCType:
-                        raise SyntaxError(f"The 'description' property must have to be a string,\n{mark}")
-                    # Raise an error if start and end are not the same type
-                    if type(start) is not type(end):
-                        raise SyntaxError(f"The 'start' and 'end' properties must have to be the same type,\n{mark}")
-                    return f"\\x01{tag}\\x02{start}\\x1e{end}\\x1e" \
-                           f"\\x02{range_type}\\x03\\x1e\\x02{description}\\x03\\x03"
-                except KeyError as e:
-                    raise SyntaxError(
-                            f"The {tag} tag requires 4 properties: 'start', 'end', 'type' and 'description'.\n"
-                            f"{mark}") from e
-
-            mapping: {} = constructor.construct_mapping(node)
-            return cls(reduce_range(node.tag, mapping, node.start_mark))
-
-    # noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
-    @yaml_object(yaml_parser)
-    class SID(SignedCType):
-        """
-        This class represent a signed ID. Signed ID's are always signed integer constants.
+    They are always of the machine's `uintptr_t` or `void *` size.
+    """
+    __slots__ = ()
+    yaml_tag = u'!pointer'
 
-        They are always of the machine's `signed` size.
-        """
-        yaml_tag = u'!s-id'
 
-    # noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
-    @yaml_object(yaml_parser)
-    class Signed(SignedCType):
-        """
-        This class represent a signed value. Signed value are always signed integer constants.
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
+class Range(CType):
+    """
+    This class represent a range. Ranges can contain any value inside them, but they must have to define a start, an
+    end and a name.
 
-        They are always of the machine's `signed` size.
-        """
-        yaml_tag = u'!signed'
+    Besides the reduced value, ranges keep their 'start', 'end', 'range_type' and 'description' properties, so the
+    ranges can be indexed by the generator.
+    """
+    __slots__ = ("start", "end", "range_type", "description")
+    yaml_tag = u'!range'
 
-    # noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
-    @yaml_object(yaml_parser)
-    class UID(UnsignedCType):
-        """
-        This class represent an unsigned ID. Unsigned ID's are always unsigned integer constants.
+    def __init__(self, value: str, start=None, end=None, range_type=None, description=None):
+        super().__init__(value)
+        self.start = start
+        self.end = end
+        self.range_type = range_type
+        self.description = description
 
-        They are always of the machine's `unsigned` size.
-        """
-        yaml_tag = u'!u-id'
+    def __reduce__(self):
+        return Range, (self.reduced_value, self.start, self.end, self.range_type, self.description)
 
-    # noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
-    @yaml_object(yaml_parser)
-    class Unsigned(UnsignedCType):
-        """
-        This class represent an unsigned value. Unsigned values are always unsigned integer constants.
+    @classmethod
+    def from_yaml(cls, constructor, node):
+        def reduce_range(tag: str, mapping_object: {}, mark) -> str:
+            """
+            Try to reduce the range tag to a string with a special format. Note that this is a generic range
+            function, which can reduce any range (given the rules for range reduction).
 
-        They are always of the machine's `unsigned` size.
-        """
-        yaml_tag = u'!unsigned'
+            :param tag: the name of the tag
+            :param mapping_object: the value of the tag
+            :param mark: a mark to report the syntax error
+
+            :return: a composite string with the value appended to the tag name
+            """
+            try:
+                description = mapping_object[StringCType("description")]
+                end = mapping_object[StringCType("end")]
+                start = mapping_object[StringCType("start")]
+                range_type = mapping_object[StringCType("type")]
+                # Raise an error if description is not a string
+                if type(description) is not StringCType:
+                    raise SyntaxError(f"The 'description' property must have to be a string,\n{mark}")
+                # Raise an error if start and end are not the same type
+                if type(start) is not type(end):
+                    raise SyntaxError(f"The 'start' and 'end' properties must have to be the same type,\n{mark}")
+                return f"\\x01{tag}\\x02{start}\\x1e{end}\\x1e" \
+                       f"\\x02{range_type}\\x03\\x1e\\x02{description}\\x03\\x03"
+            except KeyError as e:
+                raise SyntaxError(
+                        f"The {tag} tag requires 4 properties: 'start', 'end', 'type' and 'description'.\n"
+                        f"{mark}") from e
+
+        mapping: {} = constructor.construct_mapping(node)
+        return cls(reduce_range(node.tag, mapping, node.start_mark),
+                   start=mapping[StringCType("start")],
+                   end=mapping[StringCType("end")],
+                   range_type=mapping[StringCType("type")],
+                   description=mapping[StringCType("description")])
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
+class SID(SignedCType):
+    """
+    This class represent a signed ID. Signed ID's are always signed integer constants.
+
+    They are always of the machine's `signed` size.
+    """
+    __slots__ = ()
+    yaml_tag = u'!s-id'
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
+class Signed(SignedCType):
+    """
+    This class represent a signed value. Signed value are always signed integer constants.
+
+    They are always of the machine's `signed` size.
+    """
+    __slots__ = ()
+    yaml_tag = u'!signed'
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
+class UID(UnsignedCType):
+    """
+    This class represent an unsigned ID. Unsigned ID's are always unsigned integer constants.
+
+    They are always of the machine's `unsigned` size.
+    """
+    __slots__ = ()
+    yaml_tag = u'!u-id'
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
+class Unsigned(UnsignedCType):
+    """
+    This class represent an unsigned value. Unsigned values are always unsigned integer constants.
+
+    They are always of the machine's `unsigned` size.
+    """
+    __slots__ = ()
+    yaml_tag = u'!unsigned'
+
+
+# noinspection PyPep8Naming,PyMissingOrEmptyDocstring,PyMissingTypeHints
+def InitializeStronglyTypedTags(yaml_parser):
+    for tag_class in (Offset, Pointer, Range, SID, Signed, UID, Unsigned):
+        yaml_parser.register_class(tag_class)
 
 
 # ===--------------------------------------------------------------------------------------------------------------=== #
@@ -0,0 +1,80 @@
+# ===-- TestBatchDescriptors.py - Test the Batch Generation of the Device Descriptors ----------------*- Python -*-=== #
+#
+# Copyright (c) 2020 Oever González
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file except in compliance with
+#  the License. You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+#  an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+#  specific language governing permissions and limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# ===--------------------------------------------------------------------------------------------------------------=== #
+# /
+# / \file
+# / This file will test the correctness of the BatchDescriptors.py script.
+# /
+# ===--------------------------------------------------------------------------------------------------------------=== #
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent.joinpath("Sources", "YAML")))
+
+# noinspection PyUnresolvedReferences
+from BatchDescriptors import *
+
+
+def descriptors_tree(tmpdir):
+    tmpdir.join("Arch", "Common", "Base.yaml").write('---\n'
+                                                      'machine:\n'
+                                                      '  type: !u-id 0x10\n'
+                                                      '...\n', ensure=True)
+    for board in ("First", "Second"):
+        tmpdir.join("Arch", f"{board}.yaml").write('---\n'
+                                                   '$INCLUDE:\n'
+                                                   '  - !$@ <Common/Base.yaml>\n'
+                                                   'machine:\n'
+                                                   f'  name: "{board} Board"\n'
+                                                   '...\n')
+    return tmpdir
+
+
+def test_board_files(tmpdir):
+    descriptors = descriptors_tree(tmpdir)
+    files = board_files(parse_args(['--directory', str(descriptors), '--output-directory', str(tmpdir),
+                                    str(descriptors.join("Arch", "First.yaml"))]))
+    assert [file.name for file in files] == ["First.yaml", "Second.yaml"]
+
+
+def test_batch_generation(tmpdir, monkeypatch):
+    monkeypatch.setattr(HashTableFromYaml, "parsed_documents", None)
+    descriptors = descriptors_tree(tmpdir.mkdir("descriptors"))
+    output = tmpdir.join("output")
+    main(['--directory', str(descriptors), '--output-directory', str(output), '--jobs', '2',
+          '--generator-args', '--bits 6U'])
+    assert len(HashTableFromYaml.parsed_documents) == 3
+    for board in ("First", "Second"):
+        source = output.join("Arch", board, "DeviceDescriptor.c").read()
+        assert f'"{board} Board"' in source
+        assert '"\\x01!u-id\\x020x10\\x03"' in source
+        assert output.join("Arch", board, "DeviceDescriptor.h").check()
+
+
+def test_batch_loading_options(tmpdir, monkeypatch):
+    monkeypatch.setattr(HashTableFromYaml, "parsed_documents", None)
+    monkeypatch.setattr(HashTableFromYaml, "cache_directory", None)
+    descriptors = descriptors_tree(tmpdir.mkdir("descriptors"))
+    output = tmpdir.join("output")
+    cache = tmpdir.join("cache")
+    main(['--directory', str(descriptors), '--output-directory', str(output), '--jobs', '1',
+          '--generator-args', f'--bits 6U --cache {cache}'])
+    assert cache.check(dir=True) and cache.listdir()
+    with pytest.raises(SystemExit):
+        main(['--directory', str(descriptors), '--output-directory', str(output),
+              '--generator-args', f'--from-ir {tmpdir.join("table.ir")}'])
@@ -0,0 +1,47 @@
+# ===-- TestDescriptorBenchmark.py - Test the Device Descriptor Benchmark ----------------------------*- Python -*-=== #
+#
+# Copyright (c) 2020 Oever González
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file except in compliance with
+#  the License. You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+#  an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+#  specific language governing permissions and limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# ===--------------------------------------------------------------------------------------------------------------=== #
+# /
+# / \file
+# / This file will test the correctness of the DescriptorBenchmark.py script.
+# /
+# ===--------------------------------------------------------------------------------------------------------------=== #
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.joinpath("Sources", "YAML")))
+
+# noinspection PyUnresolvedReferences
+from DescriptorBenchmark import *
+
+
+def test_c_literal():
+    assert c_literal(b"a\x1fb") == '"\\x61\\x1f\\x62"'
+
+
+def test_absent_keys():
+    keys = [b"machine\x1fname", b"machine\x1fnamd"]
+    absent = absent_keys(keys)
+    assert not set(absent) & set(keys)
+    assert b"absentmachine\x1fname" in absent
+    assert len(absent) == len(set(absent))
+
+
+def test_generator_args():
+    parsed = parse_args(["-y", "properties.yaml", "-b", "8U", "-x", "--neighborhoods", "--layout", "indexed"])
+    assert parsed.generator_args == ["--neighborhoods", "--layout", "indexed"]
+    assert parsed.bits == ["8U"]
+    assert parse_args(["-y", "properties.yaml"]).generator_args == []
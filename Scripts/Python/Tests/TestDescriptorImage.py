@@ -0,0 +1,115 @@
+# ===-- TestDescriptorImage.py - Test the Binary Image of the Device Descriptor ----------------------*- Python -*-=== #
+#
+# Copyright (c) 2020 Oever González
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file except in compliance with
+#  the License. You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+#  an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+#  specific language governing permissions and limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# ===--------------------------------------------------------------------------------------------------------------=== #
+# /
+# / \file
+# / This file will test the correctness of the DescriptorImage.py script.
+# /
+# ===--------------------------------------------------------------------------------------------------------------=== #
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent.joinpath("Sources", "YAML")))
+
+# noinspection PyUnresolvedReferences
+import HashTableFromYaml
+# noinspection PyUnresolvedReferences
+from DescriptorImage import *
+# noinspection PyUnresolvedReferences
+from YamlTags import Offset, Pointer
+
+templates_path = Path(__file__).parent.parent.parent.joinpath("CMake", "Templates")
+
+
+def generate_image(tmpdir, *extra):
+    properties = tmpdir.join("properties.yaml")
+    properties.write('---\n'
+                     'machine:\n'
+                     '  name: "Test Machine"\n'
+                     '  cores: !u-id 0x4\n'
+                     '  features: ["fpu", "mmu", "cache"]\n'
+                     '...\n')
+    image = str(tmpdir.join("descriptor.image"))
+    args = ['--yaml-file', str(properties),
+            '--header-template', str(templates_path.joinpath("DeviceDescriptor.in")),
+            '--header', str(tmpdir.join("DeviceDescriptor.h")),
+            '--source-template', str(templates_path.joinpath("DeviceDescriptor.c.in")),
+            '--source', str(tmpdir.join("DeviceDescriptor.c")),
+            '--image', image, *extra]
+    HashTableFromYaml.main(args)
+    parsed = HashTableFromYaml.parse_args(args)
+    return image, HashTableFromYaml.create_hashmap(parsed, HashTableFromYaml.load_properties(parsed))
+
+
+@pytest.mark.parametrize("extra", [['--bits', '6U'],
+                                   ['--bits', '6U', '--foresee', '3U', '--neighborhoods'],
+                                   ['--bits', '16U', '--sizing', 'multiply-shift', '--hash-family', 'fnv-1a']])
+def test_image_lookups(tmpdir, extra):
+    image_path, hashmap = generate_image(tmpdir, *extra)
+    with DescriptorImage(image_path) as image:
+        for value_at_index in hashmap:
+            if value_at_index is None:
+                continue
+            key = HashTableFromYaml.c_string_bytes(value_at_index[0])
+            assert key in image
+            assert bytes(image.lookup(key)) == HashTableFromYaml.c_value_bytes(*value_at_index)
+            assert image.entry(image.find(key))[2] == type(value_at_index[1]).__name__
+            integer = getattr(value_at_index[1], "integer", None)
+            assert image.integer(image.find(key)) == integer
+            assert b"absent" + key not in image
+        assert bytes(image.lookup("machine\x1fcores")) == b"\x01!u-id\x020x4\x03"
+        assert image.integer(image.find("machine\x1fcores")) == 4
+        assert image.integer(image.find("machine\x1fname")) is None
+        assert image.lookup("machine\x1fname\x1fabsent") is None
+
+
+def test_invalid_image(tmpdir):
+    tmpdir.join("invalid.image").write("This is not an image of a descriptor.")
+    with pytest.raises(AssertionError):
+        DescriptorImage(str(tmpdir.join("invalid.image")))
+
+
+def test_empty_image(tmpdir):
+    tmpdir.join("empty.image").write("")
+    with pytest.raises(AssertionError, match="not a valid descriptor image"):
+        DescriptorImage(str(tmpdir.join("empty.image")))
+
+
+def test_truncated_image(tmpdir):
+    image_path, _ = generate_image(tmpdir, '--bits', '6U')
+    with open(image_path, "rb") as image_file:
+        header = image_file.read(header_format.size)
+    tmpdir.join("truncated.image").write_binary(header)
+    with pytest.raises(AssertionError, match="not a valid descriptor image"):
+        DescriptorImage(str(tmpdir.join("truncated.image")))
+
+
+def test_signed_values(tmpdir):
+    slots = [(b"offset", b"", Offset("\\x01!offset\\x02-0x8\\x03")), None,
+             (b"pointer", b"", Pointer("\\x01!pointer\\x020xffff0000\\x03"))]
+    tmpdir.join("signed.image").write_binary(build_image(slots, None, 2, 1, "power-of-two",
+                                                         hash_families["rotate-xor"], 0))
+    with DescriptorImage(str(tmpdir.join("signed.image"))) as image:
+        assert [image.integer(index) for index in range(2)] == [-8, 0xFFFF0000]
+        assert [image.entry(index)[2] for index in range(2)] == ["Offset", "Pointer"]
+
+
+def test_image_requires_hashmap(tmpdir):
+    with pytest.raises(SystemExit) as e:
+        generate_image(tmpdir, '--backend', 'decision-tree')
+    assert e.value.code == 2
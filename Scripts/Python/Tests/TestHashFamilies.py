@@ -0,0 +1,74 @@
+# ===-- TestHashFamilies.py - Test the Hash Families of the Hash Table Generator ---------------------*- Python -*-=== #
+#
+# Copyright (c) 2020 Oever González
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file except in compliance with
+#  the License. You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+#  an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+#  specific language governing permissions and limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# ===--------------------------------------------------------------------------------------------------------------=== #
+# /
+# / \file
+# / This file will test the correctness of the HashFamilies.py script.
+# /
+# ===--------------------------------------------------------------------------------------------------------------=== #
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent.joinpath("Sources", "YAML")))
+
+# noinspection PyUnresolvedReferences
+from HashFamilies import *
+
+seed = 0x8192A3B4C5D6E7F8 ^ 0x5A5A5A5A5A5A5A5A
+
+
+def test_rotate_xor_values():
+    family = hash_families["rotate-xor"]
+    assert family.hash1(b"machine\x1fname", 6, seed) == 50
+    assert family.hash2(b"machine\x1fname", 6, seed) == 7
+    assert family.hash1(b"memory\x1fvector\x1fbase", 16, seed) == 58008
+    assert family.hash2(b"memory\x1fvector\x1fbase", 16, seed) == 22791
+
+
+def test_rotate():
+    assert rotate_left(0b100001, 1, 6) == 0b000011
+    assert rotate_right(0b100001, 1, 6) == 0b110000
+
+
+@pytest.mark.parametrize("name", list(hash_families))
+def test_family_range(name):
+    family = hash_families[name]
+    assert family.c_source.count("static inline unsigned calculateHash") == 2
+    for bits in (1, 6, 16, 32):
+        for key in (b"", b"a", b"machine\x1fname", bytes(range(1, 40))):
+            assert 0 <= family.hash1(key, bits, seed) < 1 << bits
+            assert 0 <= family.hash2(key, bits, seed) < 1 << bits
+
+
+@pytest.mark.parametrize("name", ["fnv-1a", "multiply-xorshift"])
+def test_family_spread(name):
+    family = hash_families[name]
+    keys = [f"group{index}\x1fname".encode("ASCII") for index in range(256)]
+    assert len({family.hash1(key, 16, seed) for key in keys}) > 250
+    assert sum(family.hash1(key, 16, seed) == family.hash2(key, 16, seed) for key in keys) < 4
+
+
+def test_top_bits():
+    assert top_bits(0xFFFFFFFF, 8) == 0xFF
+    with pytest.raises(AssertionError):
+        top_bits(0xFFFFFFFF, 33)
+
+
+def test_abstract_family():
+    with pytest.raises(TypeError):
+        HashFamily()
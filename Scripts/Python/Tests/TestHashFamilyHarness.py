@@ -0,0 +1,51 @@
+# ===-- TestHashFamilyHarness.py - Test the Hash Family Harness --------------------------------------*- Python -*-=== #
+#
+# Copyright (c) 2020 Oever González
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file except in compliance with
+#  the License. You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+#  an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+#  specific language governing permissions and limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# ===--------------------------------------------------------------------------------------------------------------=== #
+# /
+# / \file
+# / This file will test the correctness of the HashFamilyHarness.py script.
+# /
+# ===--------------------------------------------------------------------------------------------------------------=== #
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent.joinpath("Sources", "YAML")))
+
+# noinspection PyUnresolvedReferences
+from HashFamilyHarness import *
+
+keys = [f"key{index}".encode() for index in range(24)]
+
+
+@pytest.mark.parametrize("name", list(hash_families))
+def test_measure_distribution(name):
+    distribution = measure_distribution(hash_families[name], keys, 8, 0.8, 1)
+    assert distribution["length"] == 30
+    assert distribution["double_collisions"] <= min(distribution["hash1_collisions"], distribution["hash2_collisions"])
+    assert 1 <= distribution["mean_probes"] <= distribution["max_probes"] <= 6
+
+
+@pytest.mark.parametrize("name", list(hash_families))
+def test_measure_distribution_placement(name, monkeypatch):
+    monkeypatch.setattr(HashTableFromYaml, "bits", 8)
+    monkeypatch.setattr(HashTableFromYaml, "collision_foresee", 1)
+    monkeypatch.setattr(HashTableFromYaml, "hash_family", hash_families[name])
+    monkeypatch.setattr(HashTableFromYaml, "sizing_mode", "multiply-shift")
+    hashmap = [None] * len(keys)
+    unplaced = sum(not HashTableFromYaml.insert_property(hashmap, key.decode(), "value") for key in keys)
+    assert measure_distribution(hash_families[name], keys, 8, 1, 1)["unplaced"] == unplaced
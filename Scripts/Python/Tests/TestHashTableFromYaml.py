@@ -0,0 +1,878 @@
+# ===-- TestHashTableFromYaml.py - Test the Hash Table Generator for YAML Files ----------------------*- Python -*-=== #
+#
+# Copyright (c) 2020 Oever González
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file except in compliance with
+#  the License. You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+#  an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+#  specific language governing permissions and limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# ===--------------------------------------------------------------------------------------------------------------=== #
+# /
+# / \file
+# / This file will test the correctness of the HashTableFromYaml.py script.
+# /
+# ===--------------------------------------------------------------------------------------------------------------=== #
+import copy
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from deepmerge import Merger
+from deepmerge.strategy.dict import DictStrategies
+from deepmerge.strategy.list import ListStrategies
+
+sys.path.append(str(Path(__file__).parent.parent.joinpath("Sources", "YAML")))
+
+# noinspection PyUnresolvedReferences
+from HashTableFromYaml import *
+# noinspection PyUnresolvedReferences
+from YamlMerging import ExtendUnique, FileMarkedValue
+
+
+# The merger that the generator used before the layered merge, kept as the oracle of the layered merge tests
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
+class YamlListStrategies(ListStrategies):
+    """
+    Contains the strategies provided for lists.
+    """
+    NAME = "list"
+
+    @staticmethod
+    def strategy_yaml_sequence(config, path: [], base: [], other: []):
+        """
+        Try to perform a merge strategy. Note that the YAML specification does not support sequence merging. This is an
+        add-on that does not follows the standard. This merger will always append lists with values from lists with the
+        same path from different documents. They will always appear in the order that they are processed.
+
+        Note that items in a sequence that are the same path and value, *and* are part of the same path in the same
+        document will be merged into the first appearing key. Items with the same path and value within document or file
+        scopes will be always appended to the list.
+
+        :param config: the current merging configuration
+        :param path: the path to the current merging conflict
+        :param base: the base (original) value
+        :param other: the other (to be merged) value
+
+        :return: the merged list
+        """
+        base_file_mark = base.pop()
+        if type(base_file_mark) == FileMarker:
+            base = [FileMarkedValue(base_file_mark, x) for x in base]
+        else:
+            base.append(base_file_mark)
+        other_file_mark = other.pop()
+        if type(other_file_mark) == FileMarker:
+            other = [FileMarkedValue(other_file_mark, x) for x in other]
+        else:
+            other.append(other_file_mark)
+        merged = []
+        index = {}
+        ExtendUnique(merged, index, base)
+        ExtendUnique(merged, index, other)
+        return merged
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
+class YamlDictStrategies(DictStrategies):
+    """
+    Contains the strategies provided for dictionaries.
+    """
+    NAME = "dict"
+
+    @staticmethod
+    def strategy_yaml_mapping(config, path: {}, base: {}, other: {}):
+        """
+        Try to perform a merge strategy. Note that the YAML specification does not support merging of mappings. This is
+        an add-on that does not follows the standard. This merger will try to replace values with the same path with the
+        newest one, and will append non-existing values to the mapping path.
+
+        :param config: the current merging configuration
+        :param path: the path to the current merging conflict
+        :param base: the base (original) value
+        :param other: the other (to be merged) value
+
+        :return: the merged dictionary
+        """
+        for k, v in other.items():
+            if k not in base:
+                base[k] = v
+            else:
+                base[k] = config.value_strategy(path + [k], base[k], v)
+        return base
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints,PyUnusedLocal
+class YamlMerger(Merger):
+    """
+    :param type_strategies, List[Tuple]: a list of (Type, Strategy) pairs that should be used against incoming types.
+    """
+    PROVIDED_TYPE_STRATEGIES = {
+        list: YamlListStrategies,
+        dict: YamlDictStrategies
+    }
+
+
+# noinspection PyPep8Naming,PyMissingOrEmptyDocstring,PyMissingTypeHints
+def GetYamlMerger():
+    return YamlMerger([(list, "yaml_sequence"), (dict, "yaml_mapping")], ["override"], [])
+
+
+@pytest.fixture(scope="session")
+def yaml_file(tmpdir_factory):
+    fn = tmpdir_factory.mktemp("yaml").join("properties.yaml")
+    ff = open(fn, mode="w")
+    ff.write('---\n'
+             'machine:\n'
+             '  codename: test\n'
+             '  name: "Test Machine"\n'
+             '  type: !u-id 0x10\n'
+             'memory:\n'
+             '  vector:\n'
+             '    base: !pointer 0xFFFF0000\n'
+             '    name: "Vector Table"\n'
+             '...\n')
+    ff.close()
+    return str(fn)
+
+
+@pytest.fixture(scope="session")
+def header_template(tmpdir_factory):
+    fn = tmpdir_factory.mktemp("templates").join("template.h")
+    ff = open(fn, mode="w")
+    ff.write('//////')
+    ff.close()
+    return str(fn)
+
+
+@pytest.fixture(scope="session")
+def source_template(tmpdir_factory):
+    fn = tmpdir_factory.mktemp("templates").join("template.c")
+    ff = open(fn, mode="w")
+    ff.write('//////')
+    ff.close()
+    return str(fn)
+
+
+@pytest.fixture()
+def output_dir(tmpdir):
+    return tmpdir
+
+
+def generate(yaml_path, header_path, source_path, output, *extra):
+    args = ['--yaml-file', yaml_path,
+            '--header-template', header_path,
+            '--header', str(output.join("table.h")),
+            '--source-template', source_path,
+            '--source', str(output.join("table.c")),
+            *extra]
+    main(args)
+    with open(output.join("table.h")) as header, open(output.join("table.c")) as source:
+        return header.read(), source.read()
+
+
+def generate_from_ir(ir_path, header_path, source_path, output):
+    main(['--from-ir', ir_path,
+          '--header-template', header_path,
+          '--header', str(output.join("table.h")),
+          '--source-template', source_path,
+          '--source', str(output.join("table.c"))])
+    with open(output.join("table.h")) as header, open(output.join("table.c")) as source:
+        return header.read(), source.read()
+
+
+def test_h_arg():
+    with pytest.raises(SystemExit) as exception:
+        args = ['-h']
+        main(args)
+    assert exception.type == SystemExit
+    assert exception.value.code == 0
+
+
+def test_invalid_sizing():
+    with pytest.raises(SystemExit) as exception:
+        args = ['--sizing', 'INVALID']
+        main(args)
+    assert exception.type == SystemExit
+    assert exception.value.code == 2
+
+
+def test_invalid_load_factor(yaml_file, header_template, source_template, output_dir):
+    with pytest.raises(SystemExit) as exception:
+        generate(yaml_file, header_template, source_template, output_dir, '--load-factor', '1.5')
+    assert exception.type == SystemExit
+    assert exception.value.code == 2
+
+
+def test_invalid_bits(yaml_file, header_template, source_template, output_dir):
+    with pytest.raises(SystemExit) as exception:
+        generate(yaml_file, header_template, source_template, output_dir, '--bits', '33U', '--sizing',
+                 'multiply-shift')
+    assert exception.value.code == 2
+    generate(yaml_file, header_template, source_template, output_dir, '--bits', '32U', '--sizing', 'multiply-shift')
+
+
+@pytest.mark.parametrize("bits", ["0U", "33U"])
+def test_invalid_family_bits(yaml_file, header_template, source_template, output_dir, bits):
+    with pytest.raises(SystemExit) as exception:
+        generate(yaml_file, header_template, source_template, output_dir, '--bits', bits, '--hash-family', 'fnv-1a')
+    assert exception.value.code == 2
+
+
+def test_c_string_bytes():
+    assert c_string_bytes("memory" + flatten_separator + "base") == b"memory\x1fbase"
+
+
+def test_power_of_two_table(yaml_file, header_template, source_template, output_dir):
+    header, source = generate(yaml_file, header_template, source_template, output_dir, '--bits', '6U')
+    assert '#define YAML_PROPERTIES_HASHMAP_LENGTH 64U' in header
+    assert 'YAML_PROPERTIES_HASHMAP_MULTIPLY_SHIFT' not in header
+    assert source.count('{NULL, NULL}') == 64 - 6
+
+
+def test_multiply_shift_table(yaml_file, header_template, source_template, output_dir):
+    header, source = generate(yaml_file, header_template, source_template, output_dir,
+                              '--bits', '16U', '--sizing', 'multiply-shift', '--load-factor', '0.5')
+    assert '#define YAML_PROPERTIES_HASHMAP_MULTIPLY_SHIFT' in header
+    length = int(re.search(r'YAML_PROPERTIES_HASHMAP_LENGTH (\d+)U', header).group(1))
+    assert 12 <= length < 64
+    assert source.count('{NULL, NULL}') == length - 6
+
+
+def test_multiply_shift_reduction(monkeypatch):
+    monkeypatch.setattr(sys.modules["HashTableFromYaml"], "bits", 16)
+    monkeypatch.setattr(sys.modules["HashTableFromYaml"], "sizing_mode", "multiply-shift")
+    for length in (1, 7, 100, 65535):
+        for value in (0x0000, 0x7FFF, 0xFFFF):
+            assert 0 <= reduce_hash(value, length) < length
+
+
+def test_indexed_table(yaml_file, header_template, source_template, output_dir):
+    header, source = generate(yaml_file, header_template, source_template, output_dir,
+                              '--bits', '6U', '--layout', 'indexed')
+    assert '#define YAML_PROPERTIES_HASHMAP_INDEX_TYPE uint8_t' in header
+    assert '#define YAML_PROPERTIES_HASHMAP_INDEX_EMPTY UINT8_MAX' in header
+    assert 'const uint8_t yamlPropertiesHashmapIndex[64];' in header
+    assert 'const struct yamlPropertyValue yamlPropertiesHashmap[6];' in header
+    assert source.count('UINT8_MAX,') + source.count('UINT8_MAX ') == 64 - 6
+    assert '{NULL, NULL}' not in source
+
+
+def test_index_type():
+    assert index_type(17) == ("uint8_t", "UINT8_MAX")
+    assert index_type(255) == ("uint16_t", "UINT16_MAX")
+    with pytest.raises(AssertionError):
+        index_type(0xFFFF)
+
+
+def test_struct_of_arrays_table(yaml_file, header_template, source_template, output_dir):
+    header, source = generate(yaml_file, header_template, source_template, output_dir,
+                              '--bits', '6U', '--fingerprint-bits', '16')
+    assert '#define YAML_PROPERTIES_HASHMAP_FINGERPRINT_TYPE uint16_t' in header
+    assert 'const char *const yamlPropertiesHashmapKeys[64];' in header
+    assert 'const uint16_t yamlPropertiesHashmapFingerprints[64];' in header
+    assert 'const uint8_t yamlPropertiesHashmapLengths[64];' in header
+    assert 'struct yamlPropertyValue' not in header
+    lengths = re.search(r'yamlPropertiesHashmapLengths\[64\] = \{(.*?)\n\};', source, re.S).group(1)
+    assert '16U' in lengths  # "machine" PS "codename"
+
+
+def test_invalid_fingerprint_bits():
+    with pytest.raises(SystemExit) as exception:
+        args = ['--fingerprint-bits', '12']
+        main(args)
+    assert exception.type == SystemExit
+    assert exception.value.code == 2
+
+
+def test_fingerprint_width(monkeypatch):
+    monkeypatch.setattr(sys.modules["HashTableFromYaml"], "fingerprint_bits", 8)
+    assert 0 <= calculate_fingerprint("machine" + flatten_separator + "name") <= 0xFF
+    monkeypatch.setattr(sys.modules["HashTableFromYaml"], "fingerprint_bits", 16)
+    assert 0 <= calculate_fingerprint("machine" + flatten_separator + "name") <= 0xFFFF
+
+
+def test_neighborhood_type():
+    assert neighborhood_type(7) == "uint8_t"
+    assert neighborhood_type(9) == "uint16_t"
+    assert neighborhood_type(33) == "uint64_t"
+
+
+def test_neighborhoods_table(yaml_file, header_template, source_template, output_dir):
+    header, source = generate(yaml_file, header_template, source_template, output_dir,
+                              '--bits', '6U', '--foresee', '3U', '--neighborhoods')
+    assert '#define YAML_PROPERTIES_HASHMAP_NEIGHBORHOOD_TYPE uint8_t' in header
+    assert 'const uint8_t yamlPropertiesHashmapNeighborhoods[64];' in header
+    body = re.search(r'yamlPropertiesHashmapNeighborhoods\[64\] = \{(.*?)\n\};', source, re.S).group(1)
+    bitmaps = [int(re.sub(r'U,?\s*// .*$|U,?$', '', row.strip()), 16) for row in body.strip().split('\n')]
+    assert len(bitmaps) == 64
+    # Every key sets at least one bit in the bitmap of its home slot
+    assert 6 <= sum(bin(bitmap).count("1") for bitmap in bitmaps) <= 12
+    assert all(bitmap < 1 << 7 for bitmap in bitmaps)
+
+
+def test_invalid_neighborhoods(yaml_file, header_template, source_template, output_dir):
+    with pytest.raises(SystemExit) as exception:
+        generate(yaml_file, header_template, source_template, output_dir, '--foresee', '32U', '--neighborhoods')
+    assert exception.type == SystemExit
+    assert exception.value.code == 2
+
+
+def test_filter_dimensions(monkeypatch):
+    monkeypatch.setattr(sys.modules["HashTableFromYaml"], "filter_rate", 0.01)
+    filter_bits, filter_hashes = filter_dimensions(100)
+    assert filter_bits % 8 == 0
+    assert 958 <= filter_bits < 966
+    assert filter_hashes == 7
+
+
+def test_filter_rejects_absent_keys(monkeypatch):
+    monkeypatch.setattr(sys.modules["HashTableFromYaml"], "filter_rate", 0.05)
+    keys = [f"group{index}" + flatten_separator + "name" for index in range(50)]
+    filter_bits, filter_hashes, filter_bytes = compute_filter([(key, None) for key in keys] + [None])
+
+    def may_contain(key):
+        return all(filter_bytes[bit // 8] & (1 << (bit % 8)) for bit in filter_probes(key, filter_bits, filter_hashes))
+
+    assert all(may_contain(key) for key in keys)
+    false_positives = sum(may_contain(f"absent{index}" + flatten_separator + "name") for index in range(1000))
+    assert false_positives < 100
+
+
+def test_filter_table(yaml_file, header_template, source_template, output_dir):
+    header, source = generate(yaml_file, header_template, source_template, output_dir,
+                              '--bits', '6U', '--filter-rate', '0.01')
+    assert '#define YAML_PROPERTIES_HASHMAP_FILTER_BITS 64U' in header
+    assert '#define YAML_PROPERTIES_HASHMAP_FILTER_HASHES 7U' in header
+    assert '#define YAML_PROPERTIES_HASHMAP_FINGERPRINT_BASIS' in header
+    assert 'const uint8_t yamlPropertiesHashmapFilter[8];' in header
+    assert 'struct yamlPropertyValue {' in header
+
+
+def test_invalid_filter_rate(yaml_file, header_template, source_template, output_dir):
+    with pytest.raises(SystemExit) as exception:
+        generate(yaml_file, header_template, source_template, output_dir, '--filter-rate', '1')
+    assert exception.type == SystemExit
+    assert exception.value.code == 2
+
+
+def test_load_profile(tmpdir):
+    profile = tmpdir.join("profile.txt")
+    profile.write("# count key\n"
+                  "10 machine::name\n"
+                  "\n"
+                  "3 memory::vector::base\n"
+                  "2 machine::name\n")
+    counts = load_profile(open(profile))
+    assert counts == {"machine" + flatten_separator + "name": 12,
+                      "memory" + flatten_separator + "vector" + flatten_separator + "base": 3}
+    profile.write("machine::name 10\n")
+    with pytest.raises(AssertionError):
+        load_profile(open(profile))
+
+
+def test_profiled_placement(monkeypatch):
+    monkeypatch.setattr(sys.modules["HashTableFromYaml"], "bits", 4)
+    monkeypatch.setattr(sys.modules["HashTableFromYaml"], "sizing_mode", "power-of-two")
+    monkeypatch.setattr(sys.modules["HashTableFromYaml"], "precomputed_mask", 0)
+    keys = [f"key{index}" for index in range(64)]
+    cold, hot = next((first, second) for first in keys for second in keys
+                     if first < second and calculate_hash(first) == calculate_hash(second))
+    properties = {cold: "cold", hot: "hot"}
+    for order, home_key in ((list(properties.items()), cold), (profiled_order(properties, {hot: 5}), hot)):
+        hashmap = [None] * 16
+        for key, value in order:
+            assert insert_property(hashmap, key, value)
+        assert hashmap[calculate_hash(home_key)][0] == home_key
+
+
+def ranges_yaml(tmpdir, second_start):
+    fn = tmpdir.join("ranges.yaml")
+    fn.write('---\n'
+             'memory:\n'
+             '  ranges:\n'
+             '    - !range\n'
+             f'      start: !pointer {second_start}\n'
+             '      end: !pointer   0x00001FFF\n'
+             '      type: conventional\n'
+             '      description: "Second"\n'
+             '    - !range\n'
+             '      start: !pointer 0x00000000\n'
+             '      end: !pointer   0x00000FFF\n'
+             '      type: reserved\n'
+             '      description: "First"\n'
+             '    - !range\n'
+             '      start: !u-id 0x00\n'
+             '      end: !u-id   0x10\n'
+             '      type: identifiers\n'
+             '      description: "Not an address range"\n'
+             '...\n')
+    return str(fn)
+
+
+def test_interval_index(tmpdir, header_template, source_template, output_dir):
+    header, source = generate(ranges_yaml(tmpdir, '0x00001000'), header_template, source_template, output_dir,
+                              '--bits', '6U')
+    assert '#define YAML_PROPERTIES_HASHMAP_RANGES_LENGTH 2U' in header
+    assert 'const struct yamlPropertiesHashmapRange yamlPropertiesHashmapRanges[2];' in header
+    ranges = re.search(r'yamlPropertiesHashmapRanges\[2\] = \{(.*?)\n\};', source, re.S).group(1)
+    assert ranges.index('"First"') < ranges.index('"Second"')
+    assert '{0x1000U, 0x1fffU,' in ranges
+
+
+def test_overlapping_ranges(tmpdir, header_template, source_template, output_dir):
+    with pytest.raises(AssertionError):
+        generate(ranges_yaml(tmpdir, '0x00000FFF'), header_template, source_template, output_dir, '--bits', '6U')
+
+
+def test_discriminating_position():
+    candidates = [(b"abcd", 0), (b"abce", 1), (b"abdf", 2)]
+    assert discriminating_position(candidates) == 3
+
+
+def test_decision_tree(yaml_file, header_template, source_template, output_dir):
+    header, source = generate(yaml_file, header_template, source_template, output_dir, '--backend', 'decision-tree')
+    assert '#define YAML_PROPERTIES_HASHMAP_DECISION_TREE' in header
+    assert 'const struct yamlPropertyValue yamlPropertiesHashmap[6];' in header
+    assert '{NULL, NULL}' not in source
+    assert 'static size_t decisionTreeLookup(const char *property, const size_t propertyLength) {' in source
+    assert source.count('entry = ') == 1 + 6
+    assert 'case 16U:' in source  # "machine" PS "codename"
+
+
+def test_invalid_decision_tree(yaml_file, header_template, source_template, output_dir):
+    with pytest.raises(SystemExit) as exception:
+        generate(yaml_file, header_template, source_template, output_dir,
+                 '--backend', 'decision-tree', '--layout', 'indexed')
+    assert exception.type == SystemExit
+    assert exception.value.code == 2
+
+
+def test_hash_family_source(yaml_file, header_template, tmpdir, output_dir):
+    template = tmpdir.join("family.c")
+    template.write("//////\n@HASH_FAMILY@\n")
+    header, source = generate(yaml_file, header_template, str(template), output_dir,
+                              '--bits', '6U', '--hash-family', 'fnv-1a')
+    assert '@HASH_FAMILY@' not in source
+    assert 'static inline uint32_t fnv1a(' in source
+    assert source.count('{NULL, NULL}') == 64 - 6
+
+
+def test_stats_report(yaml_file, header_template, source_template, output_dir):
+    stats_path = output_dir.join("stats.json")
+    generate(yaml_file, header_template, source_template, output_dir,
+             '--bits', '6U', '--stats', str(stats_path), '--pointer-size', '8')
+    with open(stats_path) as stats_file:
+        stats = json.load(stats_file)
+    assert stats["length"] == 64
+    assert stats["keys"] == 6
+    assert stats["load_factor"] == 6 / 64
+    assert sum(stats["placement"].values()) == 6
+    assert sum(stats["probe_histogram"].values()) == 6
+    assert 1 <= stats["hit_compares"]["expected"] <= stats["hit_compares"]["worst"]
+    assert stats["table_bytes"]["entries"] == 64 * 2 * 8
+    assert stats["table_bytes"]["total"] == sum(value for key, value in stats["table_bytes"].items() if key != "total")
+
+
+def test_stats_displaced_keys(monkeypatch):
+    monkeypatch.setattr(sys.modules["HashTableFromYaml"], "bits", 4)
+    monkeypatch.setattr(sys.modules["HashTableFromYaml"], "collision_foresee", 1)
+    monkeypatch.setattr(sys.modules["HashTableFromYaml"], "sizing_mode", "power-of-two")
+    monkeypatch.setattr(sys.modules["HashTableFromYaml"], "precomputed_mask", 0)
+    monkeypatch.setattr(sys.modules["HashTableFromYaml"], "neighborhoods", False)
+    monkeypatch.setattr(sys.modules["HashTableFromYaml"], "table_layout", "table")
+    keys = [f"key{index}" for index in range(64)]
+    first, second = next((first, second) for first in keys for second in keys
+                         if first < second and calculate_hash(first) == calculate_hash(second))
+    hashmap = [None] * 16
+    for key in (first, second):
+        assert insert_property(hashmap, key, StringCType(key))
+    stats = compute_stats(hashmap, 4)
+    assert stats["placement"]["home"] == 1
+    assert stats["probe_histogram"]["1"] == 1
+    # The displaced key is found after comparing the key in its home slot
+    assert stats["hit_compares"]["worst"] >= 2
+    assert stats["miss_compares"]["worst"] >= 2
+
+
+def test_depfile(yaml_file, header_template, source_template, output_dir):
+    depfile = output_dir.join("table.d")
+    generate(yaml_file, header_template, source_template, output_dir, '--bits', '6U', '--depfile', str(depfile))
+    targets, dependencies = depfile.read().split(":", 1)
+    assert targets.split() == [str(output_dir.join("table.c")), str(output_dir.join("table.h"))]
+    assert dependencies.split() == ["\\", yaml_file, "\\", header_template, "\\", source_template]
+
+
+def test_digest_skips_unchanged_inputs(tmpdir, header_template, source_template, output_dir):
+    yaml_path = ranges_yaml(tmpdir, '0x00001000')
+    digest = str(output_dir.join("table.digest"))
+    generate(yaml_path, header_template, source_template, output_dir, '--bits', '6U', '--digest', digest)
+    output_dir.join("table.c").write("stale")
+    os.utime(digest, (0, 0))
+    header, source = generate(yaml_path, header_template, source_template, output_dir, '--bits', '6U',
+                              '--digest', digest)
+    assert source == "stale"
+    # The digest is touched even when the generation is skipped, as it's the stamp of the build system
+    assert os.path.getmtime(digest) > 0
+    header, source = generate(yaml_path, header_template, source_template, output_dir, '--bits', '7U',
+                              '--digest', digest)
+    assert source != "stale"
+    output_dir.join("table.c").write("stale")
+    with open(yaml_path, "a") as yaml_file:
+        yaml_file.write('---\n'
+                        'machine:\n'
+                        '  codename: changed\n'
+                        '...\n')
+    header, source = generate(yaml_path, header_template, source_template, output_dir, '--bits', '7U',
+                              '--digest', digest)
+    assert source != "stale"
+    assert '"changed"' in source
+
+
+def test_parse_cache(tmpdir, header_template, source_template, output_dir, monkeypatch):
+    yaml_path = ranges_yaml(tmpdir, '0x00001000')
+    cache = tmpdir.join("cache")
+    header, source = generate(yaml_path, header_template, source_template, output_dir, '--bits', '6U',
+                              '--cache', str(cache))
+    assert len(cache.listdir()) == 1
+
+    def no_parsing(stream):
+        raise AssertionError("The file was parsed instead of loaded from the cache.")
+
+    monkeypatch.setattr(yaml_parser, "load_all", no_parsing)
+    cached_header, cached_source = generate(yaml_path, header_template, source_template, output_dir, '--bits', '6U',
+                                            '--cache', str(cache))
+    assert (cached_header, cached_source) == (header, source)
+    with open(yaml_path, "a") as yaml_file:
+        yaml_file.write('---\n'
+                        'machine:\n'
+                        '  codename: changed\n'
+                        '...\n')
+    with pytest.raises(AssertionError):
+        generate(yaml_path, header_template, source_template, output_dir, '--bits', '6U', '--cache', str(cache))
+
+
+def test_parse_cache_failed_write(tmpdir, header_template, source_template, output_dir, monkeypatch):
+    yaml_path = ranges_yaml(tmpdir, '0x00001000')
+    cache = tmpdir.join("cache")
+
+    def failing_dump(value, stream, protocol=None):
+        stream.write(b"partial")
+        raise OSError("The disk is full.")
+
+    monkeypatch.setattr(pickle, "dump", failing_dump)
+    with pytest.raises(OSError):
+        generate(yaml_path, header_template, source_template, output_dir, '--bits', '6U', '--cache', str(cache))
+    assert cache.listdir() == []
+
+
+def test_include_jobs(tmpdir, header_template, source_template, output_dir):
+    for index in range(3):
+        tmpdir.join("Common", f"Part{index}.yaml").write('---\n'
+                                                         'machine:\n'
+                                                         f'  name: "Part {index}"\n'
+                                                         f'  part{index}: !u-id {index}\n'
+                                                         '...\n', ensure=True)
+    root = tmpdir.join("root.yaml")
+    root.write('---\n'
+               '$INCLUDE:\n'
+               '  - !$@ <Common/Part0.yaml>\n'
+               '  - !$@ <Common/Part2.yaml>\n'
+               '  - !$@ <Common/Part1.yaml>\n'
+               'memory:\n'
+               '  size: !u-id 0x10\n'
+               '...\n')
+    serial = generate(str(root), header_template, source_template, output_dir, '--bits', '6U')
+    assert '"Part 1"' in serial[1]
+    assert serial == generate(str(root), header_template, source_template, output_dir, '--bits', '6U',
+                              '--include-jobs', '2')
+
+
+def test_spawned_include_jobs(tmpdir, header_template, source_template, output_dir, monkeypatch):
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+    from multiprocessing import get_context
+    tmpdir.join("Common", "Part.yaml").write('---\n'
+                                             'machine:\n'
+                                             '  name: "Part"\n'
+                                             '...\n', ensure=True)
+    root = tmpdir.join("root.yaml")
+    root.write('---\n'
+               '$INCLUDE:\n'
+               '  - !$@ <Common/Part.yaml>\n'
+               'memory:\n'
+               '  size: !u-id 0x10\n'
+               '...\n')
+    cache = tmpdir.join("cache")
+    # The spawned processes do not inherit the globals, so the loader and the cache must reach them explicitly
+    monkeypatch.setattr(sys.modules["HashTableFromYaml"], "ProcessPoolExecutor",
+                        partial(ProcessPoolExecutor, mp_context=get_context("spawn")))
+    header, source = generate(str(root), header_template, source_template, output_dir, '--bits', '6U',
+                              '--include-jobs', '1', '--cache', str(cache), '--loader', 'python')
+    assert '"Part"' in source
+    assert len(cache.listdir()) == 2
+
+
+def test_include_graph(tmpdir, header_template, source_template, output_dir, monkeypatch, caplog):
+    tmpdir.join("Common", "Base.yaml").write('---\n'
+                                             '$INCLUDE:\n'
+                                             '  - !$@ <../root.yaml>\n'
+                                             'machine:\n'
+                                             '  name: "Base"\n'
+                                             '...\n', ensure=True)
+    root = tmpdir.join("root.yaml")
+    root.write('---\n'
+               '$INCLUDE:\n'
+               '  - !$@ <Common/Base.yaml>\n'
+               'memory:\n'
+               '  size: !u-id 0x10\n'
+               '...\n'
+               '---\n'
+               '$INCLUDE:\n'
+               '  - !$@ <Common/../Common/Base.yaml>\n'
+               'machine:\n'
+               '  codename: "root"\n'
+               '...\n')
+    parsed_files = []
+    real_loader = sys.modules["HashTableFromYaml"].load_cached_documents
+
+    def counting_loader(path):
+        parsed_files.append(path)
+        return real_loader(path)
+
+    monkeypatch.setattr(sys.modules["HashTableFromYaml"], "load_cached_documents", counting_loader)
+    header, source = generate(str(root), header_template, source_template, output_dir, '--bits', '6U')
+    # Every file is parsed once, even when it's included from several documents and through several paths
+    base = tmpdir.join("Common", "Base.yaml")
+    assert sorted(parsed_files) == sorted({str(Path(root).resolve()), str(Path(base).resolve())})
+    assert '"Base"' in source and '"root"' in source
+    assert "Found an include cycle" in caplog.text
+
+
+def test_sequence_of_mappings(tmpdir, header_template, source_template, output_dir):
+    tmpdir.join("Common", "Base.yaml").write('---\n'
+                                             'ranges:\n'
+                                             '  - low: !u-id 0x1\n'
+                                             '...\n', ensure=True)
+    spanning = tmpdir.join("spanning.yaml")
+    spanning.write('---\n'
+                   '$INCLUDE:\n'
+                   '  - !$@ <Common/Base.yaml>\n'
+                   'ranges:\n'
+                   '  - high: !u-id 0x2\n'
+                   '...\n')
+    single = tmpdir.join("single.yaml")
+    single.write('---\n'
+                 'ranges:\n'
+                 '  - low: !u-id 0x1\n'
+                 '  - high: !u-id 0x2\n'
+                 '...\n')
+    # A sequence of mappings is accepted the same way in a single document and across files
+    header, source = generate(str(single), header_template, source_template, output_dir, '--bits', '6U')
+    assert generate(str(spanning), header_template, source_template, output_dir, '--bits', '6U') == (header, source)
+    assert '"ranges"PS"0000000000000"PS"low"' in source and '"ranges"PS"0000000000000"PS"high"' in source
+
+
+def test_layered_merge():
+    documents = list(yaml_parser.load_all('---\n'
+                                          'machine:\n'
+                                          '  codename: "first"\n'
+                                          '  cores: [!u-id 0x1, !u-id 0x2, !u-id 0x1]\n'
+                                          '  memory:\n'
+                                          '    - start: !u-id 0x0\n'
+                                          '...\n'
+                                          '---\n'
+                                          'machine:\n'
+                                          '  codename: "second"\n'
+                                          '  cores: [!u-id 0x2, !u-id 0x3]\n'
+                                          '  memory:\n'
+                                          '    - start: !u-id 0x0\n'
+                                          '  name: "Test"\n'
+                                          '...\n'))
+    merger = GetYamlMerger()
+    expected = {}
+    for document in copy.deepcopy(documents):
+        merger.merge(expected, document)
+    merger.merge(expected, expected)
+    layers = YamlLayers()
+    for document in documents:
+        layers.add(document)
+    machine = StringCType("machine")
+    resolved = layers.resolve()
+    assert list(resolved[machine]) == list(expected[machine])
+    assert resolved[machine][StringCType("codename")] == expected[machine][StringCType("codename")]
+    for key in (StringCType("cores"), StringCType("memory")):
+        assert [(value.marking, value.contents) for value in resolved[machine][key]] == \
+               [(value.marking, value.contents) for value in expected[machine][key]]
+    # Values of different types can not be merged
+    layers.add({machine: StringCType("scalar")})
+    with pytest.raises(AssertionError):
+        layers.resolve()
+
+
+def test_aliased_override(tmpdir, header_template, source_template, output_dir):
+    tmpdir.join("Common", "Base.yaml").write('---\n'
+                                             'cpu: &cpu\n'
+                                             '  id: !u-id 0x1\n'
+                                             'cores:\n'
+                                             '  first: *cpu\n'
+                                             '  second: *cpu\n'
+                                             '...\n', ensure=True)
+    root = tmpdir.join("root.yaml")
+    root.write('---\n'
+               '$INCLUDE:\n'
+               '  - !$@ <Common/Base.yaml>\n'
+               'cores:\n'
+               '  first:\n'
+               '    id: !u-id 0x2\n'
+               '...\n')
+    header, source = generate(str(root), header_template, source_template, output_dir, '--bits', '6U')
+    # An override only changes the path that it names, not the anchor nor the other aliases of the anchor (the merge
+    # with deepmerge changed the shared anchor in place, so all of them were 0x2)
+    assert '{"cores"PS"first"PS"id",\n\t "\\x01!u-id\\x020x2\\x03"}' in source
+    assert '{"cores"PS"second"PS"id",\n\t "\\x01!u-id\\x020x1\\x03"}' in source
+    assert '{"cpu"PS"id",\n\t "\\x01!u-id\\x020x1\\x03"}' in source
+
+
+def test_sequence_dedup():
+    from YamlMerging import ExtendUnique
+    first_marker = FileMarker("/tmp/first.yaml", (1, 2, 3), (4, 5, 6))
+    second_marker = FileMarker("/tmp/second.yaml", (1, 2, 3), (4, 5, 6))
+    first = FileMarkedValue(first_marker, StringCType("value"))
+    second = FileMarkedValue(second_marker, StringCType("value"))
+    mapping = FileMarkedValue(first_marker, {StringCType("start"): StringCType("0x0")})
+    assert first == StringCType("value") and hash(first) == hash(StringCType("value"))
+    assert first != second and first != mapping
+    assert str(second) == "value from '/tmp/second.yaml:$:1:2:3:$:4:5:6'"
+    merged = []
+    index = {}
+    ExtendUnique(merged, index, [first, mapping, FileMarkedValue(first_marker, StringCType("value")), second])
+    ExtendUnique(merged, index, [FileMarkedValue(first_marker, {StringCType("start"): StringCType("0x0")}),
+                                 StringCType("value"), {StringCType("start"): StringCType("0x0")}])
+    assert merged[:3] == [first, mapping, second] and len(merged) == 4
+
+
+def test_file_marker():
+    marker = FileMarker("/tmp/file.yaml", (1, 2, 3), (4, 5, 6))
+    same_file = FileMarker("/tmp/file.yaml", (7, 8, 9), (10, 11, 12))
+    assert marker.file == same_file.file and marker != same_file
+    assert marker.marker == "/tmp/file.yaml:$:1:2:3:$:4:5:6"
+    copied = pickle.loads(pickle.dumps(marker))
+    assert copied == marker and hash(copied) == hash(marker)
+    with pytest.raises(AttributeError):
+        marker.path = "/tmp/other.yaml"
+
+
+def test_interned_c_values():
+    value = StringCType("interned")
+    assert StringCType("interned") is value
+    assert copy.deepcopy({"key": value})["key"] is value
+    assert pickle.loads(pickle.dumps(value)) is value
+    document = yaml_parser.load('range: !range\n'
+                                '  start: !pointer 0x0\n'
+                                '  end: !pointer 0x10\n'
+                                '  type: "memory"\n'
+                                '  description: "interned"\n')
+    memory_range = document[StringCType("range")]
+    assert memory_range.description is value
+    assert pickle.loads(pickle.dumps(memory_range)).start is memory_range.start
+    with pytest.raises(AttributeError):
+        value.other = "other"
+
+
+def test_yaml_loaders(yaml_file, header_template, source_template, output_dir, monkeypatch):
+    python_outputs = generate(yaml_file, header_template, source_template, output_dir, '--loader', 'python')
+    assert generate(yaml_file, header_template, source_template, output_dir, '--loader', 'auto') == python_outputs
+    monkeypatch.setattr(sys.modules["HashTableFromYaml"], "CParser", None)
+    with pytest.raises(SystemExit) as e:
+        generate(yaml_file, header_template, source_template, output_dir, '--loader', 'libyaml')
+    assert e.value.code == 2
+
+
+def test_descriptor_ir(tmpdir, header_template, source_template, output_dir, caplog):
+    properties = tmpdir.join("properties.yaml")
+    properties.write('---\n'
+                     'machine:\n'
+                     '  name: "Test Machine"\n'
+                     '  cores: !u-id 0x4\n'
+                     'memory:\n'
+                     '  ram: !range\n'
+                     '    start: !pointer 0x0\n'
+                     '    end: !pointer 0xFFFF\n'
+                     '    type: "memory"\n'
+                     '    description: "RAM"\n'
+                     '...\n')
+    ir = str(tmpdir.join("properties.ir"))
+    expected = generate(str(properties), header_template, source_template, output_dir, '--emit-ir', ir)
+    with open(ir) as ir_file:
+        assert json.loads(ir_file.readline())["schema"] == ir_schema_version
+    assert generate_from_ir(ir, header_template, source_template, output_dir) == expected
+    ram = load_ir(ir)["memory\\x1fram"]
+    assert type(ram) is Range and ram.end.integer == 0xFFFF
+    properties.write('---\n'
+                     'machine:\n'
+                     '  name: "Changed Machine"\n'
+                     '...\n')
+    assert generate_from_ir(ir, header_template, source_template, output_dir) == expected
+    assert "changed since the IR file" in caplog.text
+    tmpdir.join("properties.ir").write('{"schema": 0, "inputs": {}}\n')
+    with pytest.raises(AssertionError):
+        generate_from_ir(ir, header_template, source_template, output_dir)
+    tmpdir.join("properties.ir").write('{"schema": 1}\n')
+    with pytest.raises(AssertionError, match="malformed"):
+        load_ir(ir)
+
+
+def test_flatten_items():
+    marker = FileMarker("/tmp/file.yaml", (1, 2, 3), (4, 5, 6))
+    sequence = [FileMarkedValue(marker, value) for value in
+                (StringCType("first"), {StringCType("name"): StringCType("one")}, StringCType("second"),
+                 {StringCType("name"): StringCType("two")})]
+    items = list(flatten_items({StringCType("list"): sequence, StringCType("scalar"): StringCType("value")}))
+    assert [key for key, _ in items] == ["list\\x1f0000000000000", "list\\x1f0000000000000\\x1fname",
+                                         "list\\x1f0000000000001", "list\\x1f0000000000001\\x1fname", "scalar"]
+    # The traversal is iterative, so it's not limited by the depth of the recursion
+    deep = StringCType("leaf")
+    for _ in range(sys.getrecursionlimit() * 2):
+        deep = {StringCType("level"): deep}
+    (key, value), = flatten_items(deep)
+    assert key.count(flatten_separator) == sys.getrecursionlimit() * 2 - 1 and value == StringCType("leaf")
+    with pytest.raises(AssertionError):
+        list(flatten_items({StringCType("list"): [FileMarkedValue(marker, {})]}))
+
+
+def test_aliased_subtrees():
+    document = yaml_parser.load('cpu: &cpu\n'
+                                '  features: &features [sse, avx]\n'
+                                '  id: !u-id 0x1\n'
+                                'cores:\n'
+                                '  first: *cpu\n'
+                                '  second: *cpu\n'
+                                'extensions: *features\n')
+    layers = YamlLayers()
+    layers.add(document)
+    resolved = layers.resolve()
+    cores = resolved[StringCType("cores")]
+    # The aliases are resolved once, so the merged subtrees are still shared
+    assert cores[StringCType("first")] is cores[StringCType("second")] is resolved[StringCType("cpu")]
+    items = dict(flatten_items(resolved))
+    for prefix in ("cpu", "cores\\x1ffirst", "cores\\x1fsecond"):
+        assert items[prefix + "\\x1fid"] is resolved[StringCType("cpu")][StringCType("id")]
+        assert [items[f"{prefix}\\x1ffeatures\\x1f000000000000{index}"] for index in range(2)] == \
+               [StringCType("sse"), StringCType("avx")]
+    assert len(items) == 11
+    recursive = yaml_parser.load('cpu: &cpu\n'
+                                 '  next: *cpu\n')
+    with pytest.raises(AssertionError, match="Recursive aliases"):
+        list(flatten_items(recursive))
+    layers = YamlLayers()
+    layers.add(recursive)
+    with pytest.raises(AssertionError, match="Recursive aliases"):
+        layers.resolve()
@@ -97,12 +97,19 @@ SET(TREE_SCRIPTS_PYTHON3_ENV_PATH "${TREE_SCRIPTS_PYTHON_PATH}/Environments/3")
 # Important and fixed path files
 SET(PYTHON_GENERATE_PY "${TREE_SCRIPTS_PYTHON_ENV_PATH}/generate.py")
 ## JSON Properties: Export JSON properties to a C Hash Table
+SET(DEVICE_DESCRIPTOR_BATCH_HELPER "${TREE_SCRIPTS_PYTHON_SRC_PATH}/YAML/BatchDescriptors.py")
+SET(DEVICE_DESCRIPTOR_BENCHMARK_HELPER "${TREE_SCRIPTS_PYTHON_SRC_PATH}/YAML/DescriptorBenchmark.py")
+SET(DEVICE_DESCRIPTOR_CACHE "${TREE_BIN_IMPORTANT_PATH}/DeviceDescriptor.cache")
 SET(DEVICE_DESCRIPTOR_DATABASE "${TREE_DEVICE_DESCRIPTOR_X_PATH}/${MACHINE_NAME}.yaml")
+SET(DEVICE_DESCRIPTOR_DEPFILE "${TREE_BIN_IMPORTANT_PATH}/DeviceDescriptor.d")
+SET(DEVICE_DESCRIPTOR_DIGEST "${TREE_BIN_IMPORTANT_PATH}/DeviceDescriptor.digest.json")
 SET(DEVICE_DESCRIPTOR_HEADER_TEMPLATE "${TREE_SCRIPTS_CMAKE_TEMPLATES_PATH}/DeviceDescriptor.in")
 SET(DEVICE_DESCRIPTOR_HEADER "${TREE_BIN_IMPORTANT_INCLUDE_PATH}/DeviceDescriptor.h")
+SET(DEVICE_DESCRIPTOR_MATRIX_PATH "${TREE_BIN_IMPORTANT_PATH}/DeviceDescriptors")
 SET(DEVICE_DESCRIPTOR_PYTHON_HELPER "${TREE_SCRIPTS_PYTHON_SRC_PATH}/YAML/HashTableFromYaml.py")
 SET(DEVICE_DESCRIPTOR_SOURCE_TEMPLATE "${TREE_SCRIPTS_CMAKE_TEMPLATES_PATH}/DeviceDescriptor.c.in")
 SET(DEVICE_DESCRIPTOR_SOURCE "${TREE_BIN_IMPORTANT_PATH}/DeviceDescriptor.c")
+SET(DEVICE_DESCRIPTOR_STATS "${TREE_BIN_IMPORTANT_PATH}/DeviceDescriptor.stats.json")
 ## SAE: Set and Export extension for CMake
 SET(SET_AND_EXPORT_OUTPUT_FILE "${TREE_BIN_IMPORTANT_PATH}/Current Config.cfg.cmake")
 SET(SET_AND_EXPORT_OUTPUT_HEADER "${TREE_BIN_IMPORTANT_PATH}/config.in.h")